@@ -0,0 +1,382 @@
+/*
+ * Callbacks du mode clientside (voir src/Clientside.py).
+ *
+ * Le cube des données (département × fait × année × mois) et les tables pré-agrégées des régions et de la
+ * France métropolitaine sont téléchargés une seule fois depuis /cube.bin, puis les figures du camembert, de
+ * l'histogramme et de l'évolution par années sont calculées ici, avec les mêmes règles que Dataset.agreger
+ * et les mêmes figures que plotly express côté serveur.
+ *
+ * Auteur : Léon E.
+ */
+(function () {
+    var AXES = ['departement', 'fait', 'annee', 'mois'];
+    var chargements = {};
+
+    // Télécharge le cube et les tables pré-agrégées une seule fois par url
+    // (le navigateur décompresse la réponse gzip)
+    function chargerCube(meta) {
+        if (!chargements[meta.url]) {
+            chargements[meta.url] = fetch(meta.url).then(function (reponse) {
+                if (!reponse.ok) {
+                    delete chargements[meta.url];
+                    throw new Error('Le cube des données n\'a pas pu être chargé (' + reponse.status + ')');
+                }
+                return reponse.arrayBuffer();
+            }).then(function (buffer) {
+                return meta.dtype === 'int16' ? new Int16Array(buffer) : new Int32Array(buffer);
+            });
+        }
+        return chargements[meta.url];
+    }
+
+    // Traduit un filtre du dashboard en positions sur un axe du cube (null pour "Tout")
+    function selection(meta, axe, valeur) {
+        if (valeur === null || valeur === undefined || valeur === 'Tout') {
+            return null;
+        }
+        var valeurs = Array.isArray(valeur) ? valeur : [valeur];
+        if (axe === 'departement') {
+            // Une région est remplacée par ses départements
+            valeurs = [].concat.apply([], valeurs.map(function (v) { return meta.regions[v] || [v]; }));
+        }
+        var taille = meta.shape[AXES.indexOf(axe)];
+        var positions = valeurs.map(function (v) {
+            if (axe === 'departement') {
+                return meta.departements.indexOf(v);
+            }
+            if (axe === 'fait') {
+                return meta.faits.indexOf(v);
+            }
+            if (!/^\d+$/.test(String(v))) {
+                return -1;
+            }
+            return axe === 'annee' ? parseInt(v, 10) - meta.annee_min : parseInt(v, 10) - 1;
+        }).filter(function (p) {
+            return p >= 0 && p < taille;
+        });
+        return Array.from(new Set(positions)).sort(function (a, b) { return a - b; });
+    }
+
+    function intervalle(taille) {
+        return Array.from({length: taille}, function (_, i) { return i; });
+    }
+
+    // Choisit la table lue par une requête, comme Dataset._agreger_rollup: quand les départements ne sont pas
+    // conservés, la table nationale pour tous les départements et celle des régions pour des régions entières
+    // (le premier axe est alors celui des régions), le cube sinon
+    function table(donnees, meta, par, departements) {
+        var choix = null;
+        if (par.indexOf('departement') === -1) {
+            if (departements === null) {
+                choix = {nom: 'national', departements: [0]};
+            } else {
+                var regions = Array.from(new Set(departements.map(function (d) {
+                    return meta.region_departement[d];
+                }))).sort(function (a, b) { return a - b; });
+                var taille = 0;
+                regions.forEach(function (r) {
+                    taille += meta.region_departement.filter(function (code) { return code === r; }).length;
+                });
+                if (regions.length && regions[0] >= 0 && taille === departements.length) {
+                    choix = {nom: 'regions', departements: regions};
+                }
+            }
+        }
+        if (choix === null) {
+            return {valeurs: donnees.subarray(0, meta.shape.reduce(function (a, b) { return a * b; })),
+                    shape: meta.shape, departements: departements};
+        }
+        var description = meta.tables[choix.nom];
+        var fin = description.offset + description.shape.reduce(function (a, b) { return a * b; });
+        return {valeurs: donnees.subarray(description.offset, fin), shape: description.shape,
+                departements: choix.departements};
+    }
+
+    // Somme les nombres sur les axes non conservés, comme Dataset.agreger:
+    // retourne les combinaisons présentes des axes conservés, dans l'ordre des positions
+    function agreger(donnees, meta, par, filtres) {
+        var selections = AXES.map(function (axe) { return selection(meta, axe, filtres[axe]); });
+        var source = table(donnees, meta, par, selections[0]);
+        var cube = source.valeurs, shape = source.shape;
+        selections[0] = source.departements;
+        selections = selections.map(function (positions, axis) {
+            return positions === null ? intervalle(shape[axis]) : positions;
+        });
+        var gardes = AXES.map(function (axe) { return par.indexOf(axe) !== -1; });
+
+        // Contribution de chaque position à l'indice du résultat (0 pour un axe non conservé)
+        var pas = 1;
+        var contributions = [[], [], [], []];
+        for (var axis = AXES.length - 1; axis >= 0; axis--) {
+            contributions[axis] = selections[axis].map(function (p) { return gardes[axis] ? p * pas : 0; });
+            if (gardes[axis]) {
+                pas *= shape[axis];
+            }
+        }
+        var nombres = new Float64Array(pas);
+        var presents = new Uint8Array(pas);
+
+        var s0 = shape[1] * shape[2] * shape[3], s1 = shape[2] * shape[3], s2 = shape[3];
+        var sd = selections[0], sf = selections[1], sa = selections[2], sm = selections[3];
+        var cd = contributions[0], cf = contributions[1], ca = contributions[2], cm = contributions[3];
+        for (var i = 0; i < sd.length; i++) {
+            for (var j = 0; j < sf.length; j++) {
+                for (var k = 0; k < sa.length; k++) {
+                    var base = sd[i] * s0 + sf[j] * s1 + sa[k] * s2;
+                    var cle = cd[i] + cf[j] + ca[k];
+                    for (var l = 0; l < sm.length; l++) {
+                        var valeur = cube[base + sm[l]];
+                        if (valeur >= 0) {
+                            nombres[cle + cm[l]] += valeur;
+                            presents[cle + cm[l]] = 1;
+                        }
+                    }
+                }
+            }
+        }
+
+        var tailles = AXES.map(function (_, axis) { return gardes[axis] ? shape[axis] : 1; });
+        var lignes = [];
+        for (var indice = 0; indice < pas; indice++) {
+            if (!presents[indice]) {
+                continue;
+            }
+            var positions = {}, reste = indice;
+            for (var a = AXES.length - 1; a >= 0; a--) {
+                if (gardes[a]) {
+                    positions[AXES[a]] = reste % tailles[a];
+                    reste = Math.floor(reste / tailles[a]);
+                }
+            }
+            lignes.push({positions: positions, nombre: nombres[indice]});
+        }
+        return lignes;
+    }
+
+    // Valeurs d'un filtre à choix multiple, sans doublon et dans l'ordre de sélection (aucune: "Tout")
+    function liste(valeur) {
+        if (valeur === null || valeur === undefined) {
+            return ['Tout'];
+        }
+        var valeurs = Array.from(new Set(Array.isArray(valeur) ? valeur : [valeur]));
+        return valeurs.length ? valeurs : ['Tout'];
+    }
+
+    function axes(titreX, titreY) {
+        return {
+            xaxis: {anchor: 'y', domain: [0.0, 1.0], title: {text: titreX}},
+            yaxis: {anchor: 'x', domain: [0.0, 1.0], title: {text: titreY}}
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        cube: {
+            // Lance le téléchargement du cube dès l'affichage de la page
+            precharger: function (meta) {
+                if (meta) {
+                    chargerCube(meta);
+                }
+                return '';
+            },
+
+            // Équivalent de CamembertFaits.get_common_crimes_pie_graph
+            camembert: async function (mois, annee, departement, tri, limite, meta) {
+                var cube = await chargerCube(meta);
+                var ascending = tri === 'Ascendant';
+                var lignes = agreger(cube, meta, ['fait'], {departement: departement, annee: annee, mois: mois});
+                lignes.sort(function (a, b) { return ascending ? a.nombre - b.nombre : b.nombre - a.nombre; });
+                lignes = lignes.slice(0, limite);
+                return {
+                    data: [{
+                        domain: {x: [0.0, 1.0], y: [0.0, 1.0]},
+                        hovertemplate: 'fait=%{label}<br>nombre=%{value}<extra></extra>',
+                        labels: lignes.map(function (l) { return meta.faits[l.positions.fait]; }),
+                        legendgroup: '',
+                        name: '',
+                        showlegend: true,
+                        values: lignes.map(function (l) { return l.nombre; }),
+                        type: 'pie'
+                    }],
+                    layout: {
+                        template: meta.template,
+                        legend: {tracegroupgap: 0},
+                        title: {text: 'Camembert de la répartition des ' + limite + ' faits les '
+                            + (ascending ? 'moins' : 'plus') + ' communs'}
+                    }
+                };
+            },
+
+            // Équivalent de HistogrammeParMois.get_histogramme_graph
+            histogramme: async function (annee, departements, fait, meta) {
+                var cube = await chargerCube(meta);
+                if (!departements || departements.length === 0 || departements === 'Tout'
+                    || (Array.isArray(departements) && departements.length === 1 && departements[0] === 'Tout')) {
+                    departements = 'Tout';
+                }
+                var lignes = agreger(cube, meta, ['departement', 'mois'],
+                                     {departement: departements, annee: annee, fait: fait});
+                var couleurs = meta.template.layout.colorway;
+                var traces = [];
+                lignes.forEach(function (ligne) {
+                    var num = meta.departements[ligne.positions.departement];
+                    var trace = traces.length ? traces[traces.length - 1] : null;
+                    if (!trace || trace.name !== num) {
+                        trace = {
+                            bingroup: 'x',
+                            histfunc: 'sum',
+                            hovertemplate: 'num_departement=' + num
+                                + '<br>mois=%{x}<br>sum of Nombre de délits=%{y}<extra></extra>',
+                            legendgroup: num,
+                            marker: {color: couleurs[traces.length % couleurs.length], pattern: {shape: ''}},
+                            name: num,
+                            orientation: 'v',
+                            showlegend: true,
+                            x: [],
+                            xaxis: 'x',
+                            y: [],
+                            yaxis: 'y',
+                            type: 'histogram'
+                        };
+                        traces.push(trace);
+                    }
+                    trace.x.push(meta.mois[ligne.positions.mois]);
+                    trace.y.push(ligne.nombre);
+                });
+                return {
+                    data: traces,
+                    layout: Object.assign(axes('Mois', 'Nombre de délits'), {
+                        template: meta.template,
+                        legend: {title: {text: 'num_departement'}, tracegroupgap: 0},
+                        title: {text: 'Histogramme du nombre de délits par mois et par département'},
+                        barmode: 'relative',
+                        bargap: 0
+                    })
+                };
+            },
+
+            // Équivalent de DelitsCrimesParAnnees.get_delits_crimes_annees_graph: une courbe par département
+            // (ou région) et par fait, calculées à partir d'une seule requête groupée et de la table nationale
+            annees: async function (faits, departements, meta) {
+                var cube = await chargerCube(meta);
+                faits = liste(faits);
+                departements = liste(departements);
+                // Avec "Tout", la requête porte sur tous les faits: les faits choisis en sont extraits
+                var filtreFait = faits.indexOf('Tout') !== -1 ? 'Tout' : faits;
+                var detailles = faits.filter(function (f) { return f !== 'Tout'; });
+
+                // Séries de chaque département (une région: ses départements), un département pouvant
+                // appartenir à plusieurs séries (choisi seul et dans sa région)
+                var seriesDepartement = {};
+                departements.forEach(function (serie) {
+                    if (serie !== 'Tout') {
+                        (meta.regions[serie] || [serie]).forEach(function (num) {
+                            (seriesDepartement[num] = seriesDepartement[num] || []).push(serie);
+                        });
+                    }
+                });
+
+                // Nombres de chaque série par position de l'année, indexés par département puis par fait
+                var sommes = {};
+                function ajouter(series, ligne) {
+                    var fait = meta.faits[ligne.positions.fait];
+                    var cibles = detailles.indexOf(fait) !== -1 ? [fait] : [];
+                    if (filtreFait === 'Tout') {
+                        cibles.push('Tout');
+                    }
+                    series.forEach(function (serie) {
+                        cibles.forEach(function (cible) {
+                            var cle = JSON.stringify([serie, cible]);
+                            var annees = sommes[cle] = sommes[cle] || {};
+                            annees[ligne.positions.annee] = (annees[ligne.positions.annee] || 0) + ligne.nombre;
+                        });
+                    });
+                }
+                // Une requête groupée par (département, fait, année), et la table nationale pour "Tout"
+                var numeros = Object.keys(seriesDepartement);
+                if (numeros.length) {
+                    agreger(cube, meta, ['departement', 'fait', 'annee'],
+                            {departement: numeros, fait: filtreFait}).forEach(function (l) {
+                        ajouter(seriesDepartement[meta.departements[l.positions.departement]], l);
+                    });
+                }
+                if (departements.indexOf('Tout') !== -1) {
+                    agreger(cube, meta, ['fait', 'annee'], {departement: 'Tout', fait: filtreFait})
+                        .forEach(function (l) { ajouter(['Tout'], l); });
+                }
+                var series = {};
+                Object.keys(sommes).forEach(function (cle) {
+                    series[cle] = Object.keys(sommes[cle]).map(Number).sort(function (a, b) { return a - b; })
+                        .map(function (p) { return {annee: meta.annees[p], nombre: sommes[cle][p]}; });
+                });
+
+                if (faits.length === 1 && departements.length === 1) {
+                    var departement = departements[0];
+                    var lignes = series[JSON.stringify([departement, faits[0]])] || [];
+                    var precision = departement === 'Tout' ? 'de tous les départements en fonction des années'
+                        : meta.regions[departement] ? 'dans la région ' + departement : 'dans le ' + departement;
+                    return {
+                        data: [{
+                            hovertemplate: 'annee=%{x}<br>nombre=%{y}<extra></extra>',
+                            legendgroup: '',
+                            line: {color: meta.template.layout.colorway[0], dash: 'solid'},
+                            marker: {symbol: 'circle'},
+                            mode: 'lines',
+                            name: '',
+                            orientation: 'v',
+                            showlegend: false,
+                            x: lignes.map(function (l) { return l.annee; }),
+                            xaxis: 'x',
+                            y: lignes.map(function (l) { return l.nombre; }),
+                            yaxis: 'y',
+                            type: 'scatter'
+                        }],
+                        layout: Object.assign(axes('annee', 'nombre'), {
+                            template: meta.template,
+                            legend: {tracegroupgap: 0},
+                            title: {text: 'Évolution du nombre de délits et crimes ' + precision}
+                        })
+                    };
+                }
+
+                // Légende: ce qui varie d'une série à l'autre
+                var legende = faits.length === 1 ? 'departement'
+                    : departements.length === 1 ? 'fait' : 'departement, fait';
+                var couleurs = meta.template.layout.colorway;
+                var traces = [];
+                departements.forEach(function (departement) {
+                    faits.forEach(function (fait) {
+                        var lignes = series[JSON.stringify([departement, fait])];
+                        if (!lignes) {
+                            return;
+                        }
+                        var nom = faits.length === 1 ? departement
+                            : departements.length === 1 ? fait : departement + ' - ' + fait;
+                        traces.push({
+                            hovertemplate: legende + '=' + nom + '<br>annee=%{x}<br>nombre=%{y}<extra></extra>',
+                            legendgroup: nom,
+                            line: {color: couleurs[traces.length % couleurs.length], dash: 'solid'},
+                            marker: {symbol: 'circle'},
+                            mode: 'lines',
+                            name: nom,
+                            orientation: 'v',
+                            showlegend: true,
+                            x: lignes.map(function (l) { return l.annee; }),
+                            xaxis: 'x',
+                            y: lignes.map(function (l) { return l.nombre; }),
+                            yaxis: 'y',
+                            type: 'scatter'
+                        });
+                    });
+                });
+                return {
+                    data: traces,
+                    layout: Object.assign(axes('annee', 'nombre'), {
+                        template: meta.template,
+                        legend: {title: {text: legende}, tracegroupgap: 0},
+                        title: {text: 'Évolution du nombre de délits et crimes en fonction des années'}
+                    })
+                };
+            }
+        }
+    });
+})();
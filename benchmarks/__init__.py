@@ -0,0 +1,18 @@
+"""
+Package benchmarks
+----------
+Mesure les performances du traitement des données et de chaque graphique du dashboard
+sur des données synthétiques de la même forme que les données réelles (sans accès réseau).
+
+Auteur
+---------
+Léon E.
+
+Modules
+---------
+- synthetique
+    Génère les classeurs, DataFrames et GeoJSON synthétiques.
+
+- __main__
+    Lance les mesures et écrit le rapport JSON (python -m benchmarks).
+"""
@@ -0,0 +1,268 @@
+"""
+Module __main__.py
+----------
+Mesure le temps du traitement des données, de leur chargement et de chaque graphique du dashboard
+sur des données synthétiques, puis écrit un rapport JSON comparable à un rapport de référence.
+
+Exemples:
+    python -m benchmarks --output benchmark.json
+    python -m benchmarks --echelle 10 --sans-ingestion --baseline benchmark.json
+
+Les graphiques sont mesurés avec chacun des moteurs de requêtes disponibles (voir src/Requetes.py), dont les
+figures doivent être identiques à celles du moteur par défaut.
+
+Les fichiers générés sont écrits dans un dossier temporaire: le dossier data/ n'est jamais modifié.
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- run(echelle=1, repetitions=5, ingestion=True, workers=1) -> dict
+    Lance toutes les mesures et retourne le rapport.
+
+- compare(rapport, reference, tolerance=0.2) -> bool
+    Affiche la comparaison de deux rapports et indique si aucune mesure n'a régressé.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+import get_data
+import src.Geometrie as Geometrie
+import src.Graphs.CamembertFaits as CamembertFaits
+import src.Graphs.Carte as Carte
+import src.Graphs.DelitsCrimesParAnnees as DelitsCrimesParAnnees
+import src.Graphs.HistogrammeParMois as HistogrammeParMois
+import src.Requetes as Requetes
+from benchmarks import synthetique
+
+FAIT = 'Fait synthétique 0042'
+"""
+    Fait utilisé par les scénarios filtrés (présent à toutes les échelles)
+"""
+
+MOTEURS = ('pandas', 'duckdb')
+"""
+    Moteurs de requêtes comparés au moteur par défaut (cube) sur les scénarios des graphiques
+"""
+
+SCENARIOS = {
+    'carte.tout': lambda dataset: Carte.get_map_graph(dataset, 'Tout', 'Tout', 'Tout', -1),
+    'carte.pour_mille': lambda dataset: Carte.get_map_graph(dataset, '2020', 'Tout', 'Tout', 1000),
+    'carte.fait_mois': lambda dataset: Carte.get_map_graph(dataset, '2021', '06', FAIT, 100),
+    'carte.valeurs': lambda dataset: Carte.get_map_valeurs(dataset, '2021', '06', FAIT, 100),
+    'camembert.tout': lambda dataset: CamembertFaits.get_common_crimes_pie_graph(dataset, 'Tout', 'Tout', 'Tout'),
+    'camembert.departement': lambda dataset: CamembertFaits.get_common_crimes_pie_graph(dataset, '2019', 'Tout', '93'),
+    'camembert.region': lambda dataset: CamembertFaits.get_common_crimes_pie_graph(dataset, '2019', 'Tout', 'Bretagne'),
+    'histogramme.tout': lambda dataset: HistogrammeParMois.get_histogramme_graph(dataset, 'Tout', 'Tout', 'Tout'),
+    'histogramme.departement': lambda dataset: HistogrammeParMois.get_histogramme_graph(dataset, '2018', ['93'], 'Tout'),
+    'histogramme.multi_departements': lambda dataset: HistogrammeParMois.get_histogramme_graph(
+        dataset, 'Tout', ['75', '92', '93', '94'], FAIT),
+    'annees.tout': lambda dataset: DelitsCrimesParAnnees.get_delits_crimes_annees_graph(dataset, 'Tout', 'Tout'),
+    'annees.departement': lambda dataset: DelitsCrimesParAnnees.get_delits_crimes_annees_graph(dataset, FAIT, '13'),
+    'annees.region': lambda dataset: DelitsCrimesParAnnees.get_delits_crimes_annees_graph(dataset, FAIT, 'Occitanie'),
+    'annees.multi_series': lambda dataset: DelitsCrimesParAnnees.get_delits_crimes_annees_graph(
+        dataset, [FAIT, 'Tout'], ['13', '75', '93', 'Bretagne', 'Tout']),
+}
+"""
+    Scénarios mesurés pour chaque graphique: fonction prenant le Dataset et construisant la figure
+"""
+
+
+def _mesurer(fonction, repetitions):
+    """
+    Exécute la fonction plusieurs fois et retourne ses temps d'exécution.
+
+    Returns
+    -------
+    tuple
+        Le dictionnaire des temps (médiane, minimum et maximum en millisecondes) et le résultat du dernier appel.
+    """
+    temps = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        temps.append((time.perf_counter() - debut) * 1000)
+    return {'median_ms': round(statistics.median(temps), 3), 'min_ms': round(min(temps), 3),
+            'max_ms': round(max(temps), 3), 'repetitions': repetitions}, resultat
+
+
+@contextlib.contextmanager
+def _dossier_donnees(dossier):
+    """
+    Redirige les chemins des données (CSV, caches Parquet, totaux nationaux, GeoJSON) vers un dossier temporaire
+    le temps des mesures.
+    """
+    chemins = (get_data.EXPORT_PATH, get_data.CACHE_PATH, dict(Geometrie.GEOJSON), Geometrie.SIMPLIFIE_PATH,
+               get_data.NATIONAL_EXPORT_PATH, get_data.NATIONAL_CACHE_PATH)
+    get_data.EXPORT_PATH = os.path.join(dossier, 'output.csv')
+    get_data.CACHE_PATH = os.path.join(dossier, 'output.parquet')
+    get_data.NATIONAL_EXPORT_PATH = os.path.join(dossier, 'output_national.csv')
+    get_data.NATIONAL_CACHE_PATH = os.path.join(dossier, 'output_national.parquet')
+    for nom, (url, path) in chemins[2].items():
+        Geometrie.GEOJSON[nom] = (url, os.path.join(dossier, os.path.basename(path)))
+    Geometrie.SIMPLIFIE_PATH = os.path.join(dossier, os.path.basename(chemins[3]))
+    Geometrie.get_geojson.cache_clear()
+    try:
+        yield
+    finally:
+        get_data.EXPORT_PATH, get_data.CACHE_PATH = chemins[:2]
+        get_data.NATIONAL_EXPORT_PATH, get_data.NATIONAL_CACHE_PATH = chemins[4:]
+        Geometrie.GEOJSON.update(chemins[2])
+        Geometrie.SIMPLIFIE_PATH = chemins[3]
+        Geometrie.get_geojson.cache_clear()
+
+
+def run(echelle=1, repetitions=5, ingestion=True, workers=1):
+    """
+    Lance toutes les mesures sur des données synthétiques.
+
+    Parameters
+    ----------
+    echelle : float, optional
+        Taille des données par rapport aux données réelles (de 0.1 à 10, par défaut 1).
+    repetitions : int, optional
+        Nombre d'exécutions de chaque mesure de chargement et de graphique (par défaut 5).
+    ingestion : bool, optional
+        False pour ne pas générer de classeur ni mesurer son traitement (par défaut True).
+    workers : int, optional
+        Nombre de processus utilisés pour le traitement du classeur (par défaut 1).
+
+    Returns
+    -------
+    dict
+        Le rapport: 'meta' (contexte de la mesure) et 'mesures' (temps par nom de mesure).
+    """
+    mesures = {}
+    with tempfile.TemporaryDirectory() as dossier, _dossier_donnees(dossier):
+        if ingestion:
+            print('Génération du classeur synthétique ...')
+            path, population_path = os.path.join(dossier, 'delits.xlsx'), os.path.join(dossier, 'population.xlsx')
+            synthetique.generate_workbook(path, population_path, echelle=echelle)
+
+            # Le traitement d'un classeur est long: il n'est mesuré qu'une seule fois
+            def ingerer():
+                population_data = get_data._read_population(population_path)
+                sheets = get_data._parse_sheets(path, population_data, workers=workers)
+                return get_data._assemble([data for _, data in sheets])
+            mesures['ingestion.classeur'], dataframe = _mesurer(ingerer, 1)
+        else:
+            dataframe = synthetique.generate_dataframe(echelle=echelle)
+
+        dataframe.to_csv(get_data.EXPORT_PATH, sep=';', index=False)
+        mesures['chargement.csv'], _ = _mesurer(
+            lambda: pd.read_csv(get_data.EXPORT_PATH, sep=';', dtype=get_data.TYPES), repetitions)
+        if get_data.pq is not None:
+            get_data.write_cache(dataframe, 'benchmark')
+            mesures['chargement.parquet'], _ = _mesurer(get_data.get_global_dataframe, repetitions)
+        mesures['chargement.dataset_index'], _ = _mesurer(lambda: get_data.get_dataset(cube=False), repetitions)
+        mesures['chargement.dataset_cube'], dataset = _mesurer(get_data.get_dataset, repetitions)
+
+        synthetique.generate_geojson(Geometrie.GEOJSON['france'][1])
+        mesures['geometrie.simplification'], _ = _mesurer(Geometrie.preparer_geojson, repetitions)
+        # Lecture des GeoJSON en dehors des mesures, comme après le premier affichage de la carte
+        Geometrie.get_geojson('france')
+        Geometrie.get_geojson('idf')
+        figures = {}
+        for nom, scenario in SCENARIOS.items():
+            mesures[f'graphique.{nom}'], figures[nom] = _mesurer(lambda: scenario(dataset), repetitions)
+
+        for moteur in MOTEURS:
+            if moteur == 'duckdb' and Requetes.duckdb is None:
+                continue
+            dataset.utiliser(moteur)
+            for nom, scenario in SCENARIOS.items():
+                mesures[f'graphique.{moteur}.{nom}'], figure = _mesurer(lambda: scenario(dataset), repetitions)
+                if to_json_plotly(figure) != to_json_plotly(figures[nom]):
+                    raise AssertionError(f"Le moteur {moteur} ne donne pas le même résultat pour {nom}")
+
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'echelle': echelle,
+            'lignes': len(dataframe),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'mesures': mesures,
+    }
+
+
+def compare(rapport, reference, tolerance=0.2):
+    """
+    Affiche la comparaison des médianes de deux rapports.
+
+    Parameters
+    ----------
+    rapport : dict
+        Le rapport courant.
+    reference : dict
+        Le rapport de référence.
+    tolerance : float, optional
+        Augmentation relative de la médiane au-delà de laquelle une mesure est considérée comme une régression
+        (par défaut 0.2, soit 20%).
+
+    Returns
+    -------
+    bool
+        True si aucune mesure n'a régressé.
+    """
+    if rapport['meta']['echelle'] != reference['meta']['echelle']:
+        print(f"Attention: échelles différentes ({rapport['meta']['echelle']} contre {reference['meta']['echelle']})")
+    sans_regression = True
+    for nom, mesure in rapport['mesures'].items():
+        if nom not in reference['mesures']:
+            print(f'{nom:50} {mesure["median_ms"]:>12.1f} ms   (nouvelle mesure)')
+            continue
+        ratio = mesure['median_ms'] / max(reference['mesures'][nom]['median_ms'], 1e-9)
+        regression = ratio > 1 + tolerance
+        sans_regression &= not regression
+        print(f'{nom:50} {mesure["median_ms"]:>12.1f} ms   x{ratio:.2f}{"   RÉGRESSION" if regression else ""}')
+    return sans_regression
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mesure les performances du dashboard sur des données synthétiques.")
+    parser.add_argument('--echelle', type=float, default=1,
+                        help="Taille des données par rapport aux données réelles, jusqu'à 10 (par défaut 1)")
+    parser.add_argument('--repetitions', type=int, default=5,
+                        help="Nombre d'exécutions de chaque mesure (par défaut 5)")
+    parser.add_argument('--sans-ingestion', action='store_true',
+                        help="Ne génère pas de classeur et ne mesure pas son traitement")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Nombre de processus utilisés pour le traitement du classeur (par défaut 1)")
+    parser.add_argument('--output', default='benchmark.json', help="Chemin du rapport JSON (par défaut benchmark.json)")
+    parser.add_argument('--baseline', help="Rapport JSON de référence avec lequel comparer les résultats")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Augmentation relative tolérée avant de signaler une régression (par défaut 0.2)")
+    args = parser.parse_args()
+
+    if not 0 < args.echelle <= 10:
+        parser.error("l'échelle doit être comprise entre 0 et 10")
+
+    rapport = run(echelle=args.echelle, repetitions=args.repetitions, ingestion=not args.sans_ingestion,
+                  workers=args.workers)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(rapport, file, indent=2, ensure_ascii=False)
+    print(f'Rapport écrit dans {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            sys.exit(0 if compare(rapport, json.load(file), tolerance=args.tolerance) else 1)
+    for nom, mesure in rapport['mesures'].items():
+        print(f'{nom:50} {mesure["median_ms"]:>12.1f} ms')
@@ -0,0 +1,163 @@
+"""
+Module synthetique.py
+----------
+Génère des données synthétiques ayant la même forme que les données réelles: 96 départements
+métropolitains, 107 faits et un mois par colonne de janvier 1996 à mars 2022.
+Le paramètre echelle multiplie le nombre de faits (jusqu'à 10 fois la taille réelle).
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- generate_workbook(path, population_path, echelle=1, seed=0)
+    Écrit un classeur principal et un classeur de population au format des fichiers sources.
+
+- generate_dataframe(echelle=1, seed=0) -> DataFrame
+    Retourne directement un DataFrame global (format de get_data.get_global_dataframe()).
+
+- generate_geojson(france_path)
+    Écrit un GeoJSON des départements (un polygone par département).
+"""
+
+import json
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+DEPARTEMENTS = [f'{numero:02d}' for numero in range(1, 20)] + ['2A', '2B'] + [f'{numero:02d}' for numero in range(21, 96)]
+"""
+    Numéros des départements métropolitains (noms des feuilles du fichier principal)
+"""
+
+NB_FAITS = 107
+"""
+    Nombre de faits (lignes de chaque feuille) des données réelles
+"""
+
+COLONNES = [f'_{annee}_{mois:02d}' for annee in range(2022, 1995, -1) for mois in range(12, 0, -1)
+            if annee < 2022 or mois <= 3]
+"""
+    Colonnes des mois, de la plus récente à la plus ancienne comme dans le fichier source
+"""
+
+
+def _faits(echelle):
+    """
+    Retourne les libellés des faits pour une échelle donnée.
+    """
+    return [f'Fait synthétique {numero:04d}' for numero in range(1, int(NB_FAITS * echelle) + 1)]
+
+
+def _populations(rng):
+    """
+    Retourne une population aléatoire par département.
+    """
+    return dict(zip(DEPARTEMENTS, rng.integers(70_000, 2_700_000, len(DEPARTEMENTS)).tolist()))
+
+
+def generate_workbook(path, population_path, echelle=1, seed=0):
+    """
+    Écrit un classeur principal et un classeur de population au format des fichiers sources.
+
+    Parameters
+    ----------
+    path : str
+        Chemin du classeur principal (une feuille par département, une feuille d'outre-mer ignorée par le
+        traitement, et les feuilles nationales: France_Métro est la somme des départements métropolitains,
+        France_Entière y ajoute l'outre-mer).
+    population_path : str
+        Chemin du classeur de la population (feuille 'Départements').
+    echelle : float, optional
+        Multiplicateur du nombre de faits (par défaut 1).
+    seed : int, optional
+        Graine du générateur aléatoire (par défaut 0).
+    """
+    rng = np.random.default_rng(seed)
+    faits = _faits(echelle)
+
+    # Mode écriture seule d'openpyxl: les lignes sont écrites au fil de l'eau
+    feuilles = {sheet_name: rng.integers(0, 500, (len(faits), len(COLONNES))) for sheet_name in DEPARTEMENTS + ['971']}
+    metropole = sum(feuilles[sheet_name] for sheet_name in DEPARTEMENTS)
+    feuilles = {'France_Entière': metropole + feuilles['971'], 'France_Métro': metropole, **feuilles}
+
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_name, nombres in feuilles.items():
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(['Code index', 'libellé index'] + COLONNES)
+        for numero, (fait, ligne) in enumerate(zip(faits, nombres.tolist()), start=1):
+            sheet.append([numero, fait] + ligne)
+    workbook.save(path)
+
+    # Le fichier de la population est lu avec skiprows=7 et les colonnes C, D et I
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Départements')
+    for _ in range(7):
+        sheet.append(['Données synthétiques'])
+    sheet.append(['', '', 'Code département', 'Nom du département', '', '', '', '', 'Population totale'])
+    for num_departement, population in _populations(rng).items():
+        sheet.append(['', '', num_departement, f'Département {num_departement}', '', '', '', '', population])
+    workbook.save(population_path)
+
+
+def generate_dataframe(echelle=1, seed=0):
+    """
+    Retourne un DataFrame global synthétique, sans passer par un classeur.
+
+    Parameters
+    ----------
+    echelle : float, optional
+        Multiplicateur du nombre de faits (par défaut 1).
+    seed : int, optional
+        Graine du générateur aléatoire (par défaut 0).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Une ligne par (département, fait, mois), avec les colonnes et les types de get_data.TYPES.
+    """
+    rng = np.random.default_rng(seed)
+    faits = _faits(echelle)
+    populations = _populations(rng)
+    nb_lignes = len(DEPARTEMENTS) * len(faits) * len(COLONNES)
+    _, annees, mois = zip(*(colonne.split('_') for colonne in COLONNES))
+
+    # Même ordre de lignes que le traitement des feuilles: département, puis fait, puis mois
+    departements = np.repeat(np.arange(len(DEPARTEMENTS)), len(faits) * len(COLONNES))
+    dataframe = pd.DataFrame({
+        'num_departement': pd.Categorical.from_codes(departements, DEPARTEMENTS),
+        'mois': pd.Categorical(np.tile(mois, nb_lignes // len(COLONNES))),
+        'annee': pd.Categorical(np.tile(annees, nb_lignes // len(COLONNES))),
+        'fait': pd.Categorical.from_codes(np.tile(np.repeat(np.arange(len(faits)), len(COLONNES)), len(DEPARTEMENTS)), faits),
+        'nombre': rng.integers(0, 500, nb_lignes, dtype=np.int32),
+        'population': np.array([populations[num] for num in DEPARTEMENTS], dtype=np.int32)[departements],
+        'nom_departement': pd.Categorical.from_codes(departements, [f'Département {num}' for num in DEPARTEMENTS]),
+    })
+    return dataframe
+
+
+def generate_geojson(france_path):
+    """
+    Écrit un GeoJSON synthétique des départements: un polygone de 400 points par département, disposés en grille
+    (la carte de l'Île-de-France en est extraite par Geometrie).
+
+    Parameters
+    ----------
+    france_path : str
+        Chemin du GeoJSON de la France.
+    """
+    angles = np.linspace(0, 2 * np.pi, 400, endpoint=False)
+    features = []
+    for position, num_departement in enumerate(DEPARTEMENTS):
+        x, y = -4 + (position % 10) * 1.2, 42 + (position // 10) * 0.9
+        anneau = np.column_stack([x + 0.5 * np.cos(angles), y + 0.4 * np.sin(angles)]).round(6).tolist()
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Polygon', 'coordinates': [anneau + anneau[:1]]},
+            'properties': {'code': num_departement, 'nom': f'Département {num_departement}'},
+        })
+
+    with open(france_path, 'w', encoding='utf-8') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file)
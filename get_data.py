@@ -15,19 +15,69 @@ Fonctions
 - get_data_population() -> bool
     Télécharge le fichier excel de la population 
 
-- parse_datas(to_csv=False)
-    Parse le fichier récupéré sur data.gouv.fr et le sauvegarde dans un fichier CSV si to_csv est True.
+- parse_datas(to_csv=False, workers=1)
+    Parse le fichier récupéré sur data.gouv.fr et le sauvegarde dans un fichier CSV (et dans le cache Parquet) si to_csv est True.
 
 - get_global_dataframe()
     Retourne le DataFrame global contenant les données de tous les départements.
+
+- get_national_dataframe() -> DataFrame
+    Retourne les totaux nationaux (feuilles France_Métro et France_Entière), None s'ils n'ont pas été extraits.
+
+- parse_sheet(df, num_departement, population, nom_departement) -> DataFrame
+    Transforme la feuille d'un département en table longue (traitement vectorisé).
+
+- check_parity() -> bool
+    Vérifie que parse_sheet produit les mêmes données que l'ancien traitement ligne par ligne.
+
+- refresh_datas(workers=1)
+    Met à jour les données de façon incrémentale (seules les feuilles modifiées sont traitées à nouveau).
+
+- get_dataset(cube=True, mmap=False, moteur=None) -> Dataset
+    Retourne les données sous forme de modèle en étoile (table de mesures et dimensions).
+
+- write_cache(dataframe, version, path=None, types=TYPES)
+    Sauvegarde le DataFrame global (ou les totaux nationaux) au format Parquet (colonnes typées et catégorielles).
+
+- get_data_version() -> str
+    Retourne la version (empreinte des fichiers sources) des données en cache.
+
+- build_figures()
+    Construit et sérialise les figures par défaut du dashboard (data/figures.json).
 """
 
 
-import pandas as pd
-import requests
+import argparse
+import contextlib
+import hashlib
+import json
 import os
+import re
+import time
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
 from alive_progress import alive_bar
 
+import src.Geometrie as Geometrie
+from src.Dataset import Dataset
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    # Sans pyarrow on se contente du fichier CSV
+    pq = None
+
+try:
+    import fcntl
+except ModuleNotFoundError:
+    # Windows: pas de verrou entre processus
+    fcntl = None
+
 # Constantes
 DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 
@@ -42,32 +92,166 @@ DATA_URL2 = 'https://www.insee.fr/fr/statistiques/fichier/7739582/ensemble.xlsx'
 """
 EXPORT_PATH = os.path.join(DATA_FOLDER, 'output.csv')
 
+SOURCE_PATHS = {
+    DATA_URL: os.path.join(DATA_FOLDER, 'source_delits.xlsx'),
+    DATA_URL2: os.path.join(DATA_FOLDER, 'source_population.xlsx'),
+}
+"""
+    Chemins locaux des fichiers sources téléchargés
+"""
+
+MANIFEST_PATH = os.path.join(DATA_FOLDER, 'sources.json')
+"""
+    Manifeste des fichiers sources (ETag, Last-Modified, empreintes du fichier et de chaque feuille)
+    utilisé par refresh_datas
+"""
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+"""
+    Taille des morceaux lors du téléchargement des fichiers sources
+"""
+
+CACHE_PATH = os.path.join(DATA_FOLDER, 'output.parquet')
+"""
+    Cache binaire du DataFrame global, lu en priorité par get_global_dataframe
+"""
+
+DATASET_PATH = os.path.join(DATA_FOLDER, 'dataset')
+"""
+    Dossier des tableaux du modèle en étoile, projetés en mémoire par get_dataset(mmap=True)
+"""
 
+LOCK_PATH = os.path.join(DATA_FOLDER, '.lock')
+"""
+    Fichier de verrou pris pendant la préparation des données par get_dataset(mmap=True)
+"""
 
-import io
+CACHE_FORMAT = '1'
+"""
+    Version du format du cache, à incrémenter à chaque changement de schéma
+"""
 
-def get_main_data() -> pd.DataFrame:
+TYPES = {'num_departement': 'category', 'mois': 'category', 'annee': 'category', 'fait': 'category',
+         'nombre': 'int32', 'population': 'int32', 'nom_departement': 'category'}
+"""
+    Types des colonnes du DataFrame global une fois chargé
+"""
+
+COLUMNS = ['num_departement', 'mois', 'annee', 'fait', 'nombre', 'population', 'nom_departement']
+"""
+    Colonnes de la table longue produite par parse_datas (schéma de output.csv)
+"""
+
+NATIONAL_SHEETS = ('France_Métro', 'France_Entière')
+"""
+    Feuilles des totaux nationaux du fichier principal, extraites à part des feuilles des départements
+"""
+
+METROPOLE = 'France_Métro'
+"""
+    Périmètre des totaux nationaux correspondant aux départements du dashboard
+"""
+
+NATIONAL_EXPORT_PATH = os.path.join(DATA_FOLDER, 'output_national.csv')
+NATIONAL_CACHE_PATH = os.path.join(DATA_FOLDER, 'output_national.parquet')
+"""
+    Totaux nationaux (CSV et cache Parquet), écrits en même temps que output.csv et output.parquet
+"""
+
+NATIONAL_TYPES = {'perimetre': 'category', 'mois': 'category', 'annee': 'category', 'fait': 'category',
+                  'nombre': 'int32'}
+"""
+    Types des colonnes des totaux nationaux (perimetre: nom de la feuille)
+"""
+
+
+_source_hashes = {}
+"""
+    Empreintes SHA-256 des fichiers sources téléchargés, par url
+"""
+
+_source_headers = {}
+"""
+    En-têtes ETag et Last-Modified des fichiers sources téléchargés, par url
+"""
+
+_CELLULE_TEXTE = re.compile(rb'(<c\b[^>]*\bt="s"[^>]*>)\s*<v>(\d+)</v>')
+"""
+    Cellule d'une feuille contenant un texte partagé (indice dans sharedStrings.xml)
+"""
+
+
+def _download(url, nom, manifest=None) -> str:
     """
-    get_main_data() -> DataFrame
+    _download(url, nom, manifest=None) -> str
+    -----
+    Télécharge un fichier source par morceaux dans le dossier data/ et retient son empreinte:
+    le fichier n'est jamais entièrement chargé en mémoire.
+    Args:
     -----
-    Télécharge le fichier principal et le retourne sous forme de DataFrame.
+        - url (str): l'url du fichier.
+        - nom (str): le nom du fichier pour les messages ('principal', 'de la population').
+        - manifest (dict, optional): le manifeste du dernier téléchargement. S'il est fourni et que le fichier
+          est encore présent dans data/, la requête est conditionnelle (If-None-Match / If-Modified-Since).
     Returns
     -----
-        - DataFrame: le fichier principal sous forme de DataFrame.
+        - str: le chemin du fichier téléchargé, None si le serveur indique qu'il n'a pas changé.
+    Raises
+    -----
+        - Exception: si le fichier n'a pas été téléchargé.
+    """
+    print(f'Obtention du fichier {nom} ...')
+    path = SOURCE_PATHS[url]
+    precedent = (manifest or {}).get('urls', {}).get(url)
+    headers = {}
+    # Sans l'empreinte du précédent téléchargement (manifeste ancien ou modifié), une réponse 304 ne
+    # permettrait pas de retrouver la version des données: le fichier est alors retéléchargé
+    if precedent and precedent.get('sha256') and os.path.isfile(path):
+        if precedent.get('etag'):
+            headers['If-None-Match'] = precedent['etag']
+        if precedent.get('last_modified'):
+            headers['If-Modified-Since'] = precedent['last_modified']
+
+    # Import différé: le dashboard n'en a pas besoin quand les données sont déjà préparées
+    import requests
+
+    empreinte = hashlib.sha256()
+    with requests.get(url, stream=True, headers=headers) as r:
+        if r.status_code == 304:
+            print(f"Le fichier {nom} n'a pas changé")
+            _source_hashes[url] = precedent['sha256']
+            _source_headers[url] = {'etag': precedent.get('etag'), 'last_modified': precedent.get('last_modified')}
+            return None
+        if r.status_code != 200:
+            raise Exception(f'La requête pour télécharger le fichier a échoué \n Code erreur: {r.status_code}')
+
+        # Écriture dans un fichier temporaire pour ne jamais laisser un fichier incomplet
+        with open(path + '.tmp', 'wb') as file:
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                empreinte.update(chunk)
+                file.write(chunk)
+    os.replace(path + '.tmp', path)
+
+    _source_hashes[url] = empreinte.hexdigest()
+    _source_headers[url] = {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
+    print(f'Le fichier {nom} a été obtenu avec succès')
+    return path
+
+def get_main_data() -> pd.ExcelFile:
+    """
+    get_main_data() -> ExcelFile
+    -----
+    Télécharge le fichier principal et le retourne sous forme d'ExcelFile.
+    Returns
+    -----
+        - ExcelFile: le fichier principal.
         
     Raises
     -----
         - IOError: si le fichier n'a pas été téléchargé.
     """
 
-    print('Obtention du fichier principal ...')
-    r = requests.get(DATA_URL)
-    if r.status_code != 200:
-        raise Exception(f'La requête pour télécharger le fichier a échoué \n Code erreur: {r.status_code}')
-
-    content_buffer = io.BytesIO(r.content)
-    file = pd.ExcelFile(content_buffer)
-    print('Le fichier principal a été obtenu avec succès')
+    file = pd.ExcelFile(_download(DATA_URL, 'principal'))
     return file
 
 def get_data_population() -> pd.DataFrame:
@@ -83,41 +267,329 @@ def get_data_population() -> pd.DataFrame:
     -----
         - IOError: si le fichier n'a pas été téléchargé.
     """
-    print('Obtention du fichier de la population ...')
-    r = requests.get(DATA_URL2)
-    if r.status_code != 200:
-        raise Exception(f'La requête pour télécharger le fichier a échoué \n Code erreur: {r.status_code}')
+    return _read_population(_download(DATA_URL2, 'de la population'))
 
-    content_buffer = io.BytesIO(r.content)
-    file = pd.ExcelFile(content_buffer)
-    print('Le fichier de la population a été obtenu avec succès')
-    return pd.read_excel(file, 'Départements', skiprows=7, usecols='C,D,I', names=['Code département','Nom du département', 'Population totale'])
+def _read_population(path) -> pd.DataFrame:
+    """
+    _read_population(path) -> DataFrame
+    -----
+    Lit le fichier de la population déjà téléchargé.
+    """
+    return pd.read_excel(path, 'Départements', skiprows=7, usecols='C,D,I', names=['Code département','Nom du département', 'Population totale'])
 
 def get_global_dataframe() -> pd.DataFrame:
     """
     get_global_dataframe() -> DataFrame
     -----
     Retourne le DataFrame global contenant les données de tous les départements.
+    Le cache Parquet est lu en priorité, le fichier CSV n'est utilisé que s'il n'existe pas
+    (il est alors converti pour les prochains chargements).
     Returns
     -----
         - DataFrame: le fichier principal sous forme de DataFrame.
 
     """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    types = {'num_departement': str, 'mois': str, 'annee': str, 'fait': str, 'nombre': int, 'population': int, 'nom_departement': str}
-    
+    if _is_cache_valid():
+        return pd.read_parquet(CACHE_PATH)
+
     # check if file exists
-    if not os.path.isfile(current_dir + '/data/output.csv'):
+    if not os.path.isfile(EXPORT_PATH):
         print("Le fichier CSV n'existe pas, il va être créé...")
-        parse_datas(to_csv=True)
-    
-    df = pd.read_csv(current_dir + '/data/output.csv', sep=';', dtype=types)
+        return parse_datas(to_csv=True)
+
+    df = pd.read_csv(EXPORT_PATH, sep=';', dtype=TYPES)
+    if pq is not None:
+        if os.path.isfile(NATIONAL_EXPORT_PATH):
+            write_cache(pd.read_csv(NATIONAL_EXPORT_PATH, sep=';', dtype=NATIONAL_TYPES), 'csv',
+                        NATIONAL_CACHE_PATH, NATIONAL_TYPES)
+        write_cache(df, 'csv')
 
     return df
 
-def parse_datas(to_csv=False):
+def get_dataset(cube=True, mmap=False, moteur=None) -> Dataset:
+    """
+    get_dataset(cube=True, mmap=False, moteur=None) -> Dataset
+    -----
+    Retourne les données sous forme de modèle en étoile: une table de mesures de codes entiers,
+    triée et indexée par (fait, département, année, mois), et les dimensions des départements et des faits.
+    La table nationale du modèle est construite à partir des totaux de la France métropolitaine quand ils
+    sont disponibles (voir get_national_dataframe()).
+    Args:
+    -----
+        - cube (bool, optional): False pour ne pas pré-agréger le cube (les requêtes utilisent alors l'index trié).
+        - mmap (bool, optional): True pour projeter en mémoire les tableaux sauvegardés dans data/dataset/
+          (ils sont construits et sauvegardés s'ils n'existent pas ou ne sont plus à jour). Tous les processus
+          partagent alors une seule copie des données, en lecture seule.
+        - moteur (str, optional): le moteur de requêtes du modèle, parmi 'cube', 'pandas' et 'duckdb'
+          (par défaut 'cube', ou 'pandas' sans cube). Voir src/Requetes.py.
+    Returns
+    -----
+        - Dataset: les données du dashboard.
+    """
+    if not mmap:
+        dataframe = get_global_dataframe()
+        return Dataset.from_dataframe(dataframe, cube=cube, moteur=moteur, national=_metropole(get_national_dataframe()))
+
+    # Les workers chargent les données en même temps au démarrage: un seul les prépare, les autres attendent
+    with _verrou_donnees():
+        version = get_data_version()
+        if version is not None and Dataset.stored_version(DATASET_PATH) == version:
+            return Dataset.load(DATASET_PATH, cube=cube, moteur=moteur)
+
+        dataframe = get_global_dataframe()
+        dataset = Dataset.from_dataframe(dataframe, cube=cube, moteur=moteur,
+                                         national=_metropole(get_national_dataframe()))
+        # La version n'est connue qu'avec le cache Parquet: sans pyarrow le modèle reste en mémoire
+        version = get_data_version()
+        if version is None:
+            return dataset
+        dataset.save(DATASET_PATH, version)
+    return Dataset.load(DATASET_PATH, cube=cube, moteur=moteur)
+
+@contextlib.contextmanager
+def _verrou_donnees():
+    """
+    _verrou_donnees()
+    -----
+    Verrou exclusif entre processus sur la préparation des données (sans effet si fcntl n'est pas disponible).
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(LOCK_PATH, 'w') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+def build_figures():
+    """
+    build_figures()
+    -----
+    Construit les figures par défaut du dashboard et les sérialise dans data/figures.json avec la version
+    des données: le layout les lit ensuite sans aucune agrégation.
+    """
+    # Import différé: les modules des graphiques importent plotly
+    import src.Figures as Figures
+
+    print("Construction des figures par défaut ...")
+    Figures.sauvegarder_figures(Figures.construire_figures(get_dataset(mmap=True)), get_data_version())
+
+def get_national_dataframe() -> pd.DataFrame:
+    """
+    get_national_dataframe() -> DataFrame
+    -----
+    Retourne les totaux nationaux extraits des feuilles France_Métro et France_Entière du fichier principal.
+    Returns
+    -----
+        - DataFrame: une ligne par (perimetre, fait, mois), avec les colonnes de NATIONAL_TYPES.
+          None si les totaux n'ont pas été extraits pour la version des données en cache.
+    """
+    if pq is None:
+        if not os.path.isfile(NATIONAL_EXPORT_PATH):
+            return None
+        return pd.read_csv(NATIONAL_EXPORT_PATH, sep=';', dtype=NATIONAL_TYPES)
+
+    version = get_data_version()
+    if version is None or not os.path.isfile(NATIONAL_CACHE_PATH):
+        return None
+    metadata = pq.read_schema(NATIONAL_CACHE_PATH).metadata or {}
+    if metadata.get(b'data_version') != version.encode():
+        return None
+    return pd.read_parquet(NATIONAL_CACHE_PATH)
+
+def _metropole(national):
+    """
+    _metropole(national) -> DataFrame
+    -----
+    Retourne les totaux de la France métropolitaine (None sans totaux nationaux).
+    """
+    return None if national is None else national[national['perimetre'] == METROPOLE]
+
+def _is_cache_valid() -> bool:
+    """
+    _is_cache_valid() -> bool
+    -----
+    Indique si le cache Parquet existe et a été écrit dans le format courant.
+    """
+    if pq is None or not os.path.isfile(CACHE_PATH):
+        return False
+    metadata = pq.read_schema(CACHE_PATH).metadata or {}
+    return metadata.get(b'cache_format') == CACHE_FORMAT.encode()
+
+def get_data_version() -> str:
     """
-    parse_datas(to_csv=False)
+    get_data_version() -> str
+    -----
+    Retourne la version des données en cache, calculée à partir des empreintes des fichiers sources.
+    Returns
+    -----
+        - str: la version des données, 'csv' si le cache provient d'un ancien fichier CSV,
+          None si aucun cache n'est disponible.
+    """
+    if not _is_cache_valid():
+        return None
+    return pq.read_schema(CACHE_PATH).metadata[b'data_version'].decode()
+
+def write_cache(dataframe, version, path=None, types=TYPES):
+    """
+    write_cache(dataframe, version, path=None, types=TYPES)
+    -----
+    Sauvegarde le DataFrame global au format Parquet: les dimensions sont stockées
+    sous forme de dictionnaires (catégories) et les nombres en entiers 32 bits.
+    Args:
+    -----
+        - dataframe (DataFrame): le DataFrame global.
+        - version (str): la version des données (empreinte des fichiers sources).
+        - path (str, optional): le fichier écrit (par défaut CACHE_PATH, le cache du DataFrame global).
+        - types (dict, optional): les types des colonnes (par défaut ceux du DataFrame global).
+    """
+    path = path or CACHE_PATH
+    table = pa.Table.from_pandas(dataframe.astype(types), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({b'cache_format': CACHE_FORMAT.encode(), b'data_version': version.encode()})
+    # Écriture dans un fichier temporaire: le dashboard peut lire le cache pendant une mise à jour
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+
+def _departement_sheets(sheet_names, population_data):
+    """
+    _departement_sheets(sheet_names, population_data)
+    ------
+    Sélectionne les feuilles des départements métropolitains du fichier principal.
+    Args:
+    ------
+        - sheet_names (list): les noms des feuilles du fichier principal.
+        - population_data (DataFrame): le fichier de la population.
+
+    Returns:
+    ------
+        - list: des tuples (sheet_name, num_departement, population, nom_departement), dans l'ordre du fichier.
+    """
+    sheets = []
+    for sheet_name in sheet_names:
+        # Seulement les départements métropolitains: les totaux nationaux sont lus par _parse_national
+        if(sheet_name in NATIONAL_SHEETS or sheet_name > '95'):
+            continue
+
+        num_departement = sheet_name
+        population = population_data[population_data['Code département'] == num_departement]['Population totale'].values[0]
+        nom_departement = population_data[population_data['Code département'] == num_departement]['Nom du département'].values[0]
+        sheets.append((sheet_name, num_departement, population, nom_departement))
+    return sheets
+
+def parse_sheet(df, num_departement, population, nom_departement) -> pd.DataFrame:
+    """
+    parse_sheet(df, num_departement, population, nom_departement) -> DataFrame
+    ------
+    Transforme une feuille d'un département (une ligne par fait, une colonne par mois)
+    en table longue, sans boucle Python sur les cellules.
+    Args:
+    ------
+        - df (DataFrame): la feuille du département.
+        - num_departement (str): le numéro du département.
+        - population (int): la population du département.
+        - nom_departement (str): le nom du département.
+
+    Returns:
+    ------
+        - DataFrame: une ligne par (fait, mois), dans le même ordre que l'ancien parcours ligne par ligne.
+    """
+    return _reshape(df.columns[2:], df['libellé index'], df.iloc[:, 2:].to_numpy(),
+                    num_departement, population, nom_departement)
+
+def parse_sheet_rows(rows, num_departement, population, nom_departement) -> pd.DataFrame:
+    """
+    parse_sheet_rows(rows, num_departement, population, nom_departement) -> DataFrame
+    ------
+    Équivalent de parse_sheet à partir des lignes brutes d'une feuille (la première étant l'en-tête),
+    telles que fournies par un lecteur XLSX en flux: la feuille n'est jamais chargée dans un DataFrame.
+    Args:
+    ------
+        - rows (iterable): les lignes de la feuille, sous forme de tuples de valeurs.
+        - num_departement (str): le numéro du département.
+        - population (int): la population du département.
+        - nom_departement (str): le nom du département.
+
+    Returns:
+    ------
+        - DataFrame: une ligne par (fait, mois), comme parse_sheet.
+    """
+    rows = iter(rows)
+    header = next(rows)
+    colonne_fait = header.index('libellé index')
+    faits, valeurs = [], []
+    for row in rows:
+        # Les lignes vides en fin de feuille sont ignorées, comme le fait pd.read_excel
+        if all(value is None for value in row):
+            continue
+        faits.append(row[colonne_fait])
+        valeurs.append(row[2:])
+
+    nombres = pd.DataFrame(valeurs).to_numpy() if valeurs else np.empty((0, len(header) - 2))
+    return _reshape(header[2:], faits, nombres, num_departement, population, nom_departement)
+
+def _reshape(colonnes, faits, nombres, num_departement, population, nom_departement) -> pd.DataFrame:
+    """
+    _reshape(colonnes, faits, nombres, num_departement, population, nom_departement) -> DataFrame
+    ------
+    Met à plat le tableau (fait × mois) d'un département en table longue.
+    Args:
+    ------
+        - colonnes (list): les noms des colonnes des mois, sous la forme '_annee_mois'.
+        - faits (list): le libellé de chaque ligne.
+        - nombres (ndarray): les nombres, une ligne par fait et une colonne par mois.
+    """
+    # Le découpage '_annee_mois' est fait une seule fois sur l'index des colonnes
+    _, annees, mois = zip(*(col_name.split('_') for col_name in colonnes))
+    nb_faits, nb_colonnes = nombres.shape
+
+    # Les dimensions répétées sont construites sous forme de catégories (codes entiers)
+    # plutôt que de recopier une chaîne Python par cellule
+    return pd.DataFrame({
+        'num_departement': num_departement,
+        'mois': _repeat_categorical(mois, nb_faits, tile=True),
+        'annee': _repeat_categorical(annees, nb_faits, tile=True),
+        'fait': _repeat_categorical(faits, nb_colonnes, tile=False),
+        'nombre': nombres.ravel(),
+        'population': population,
+        'nom_departement': nom_departement,
+    }, columns=COLUMNS)
+
+def _repeat_categorical(valeurs, repetitions, tile) -> pd.Categorical:
+    """
+    _repeat_categorical(valeurs, repetitions, tile) -> Categorical
+    ------
+    Répète des valeurs (à la suite avec tile=True, élément par élément sinon)
+    en ne manipulant que leurs codes entiers.
+    """
+    codes, categories = pd.factorize(np.asarray(valeurs, dtype=object))
+    codes = np.tile(codes, repetitions) if tile else np.repeat(codes, repetitions)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def _parse_sheet_iterrows(df, num_departement, population, nom_departement) -> pd.DataFrame:
+    """
+    _parse_sheet_iterrows(df, num_departement, population, nom_departement) -> DataFrame
+    ------
+    Ancienne implémentation (cellule par cellule) de parse_sheet, conservée comme référence
+    pour check_parity().
+    """
+    datas = []
+    for index, row in df.iterrows():
+        # On extrait le mois et l'année à partir des noms de colonnes
+        for col_name in df.columns[2:]:
+            _,annee, mois = col_name.split('_') # Le mois et l'année sont sous forme '_annee_mois'
+            fait = row['libellé index']
+            nombre = row[col_name]
+
+            datas.append([num_departement, mois, annee, fait, nombre, population, nom_departement])
+    return pd.DataFrame(datas, columns=COLUMNS)
+
+def parse_datas(to_csv=False, workers=1):
+    """
+    parse_datas(to_csv=False, workers=1)
     ------
     Parse le fichier récupéré sur data.gouv.fr
     Args:
@@ -125,59 +597,396 @@ def parse_datas(to_csv=False):
     
         - to_csv (bool, optional):
             Si True, sauvegarde le fichier dans un fichier CSV. Sinon, retourne le DataFrame.
+        - workers (int, optional):
+            Nombre de processus utilisés pour lire les feuilles en parallèle (1 pour tout lire dans le processus courant).
         
     Returns:
     ------
         - DataFrame si to_csv est False.
         - None si to_csv est True.
     """
-    xls =  get_main_data()
+    path = _download(DATA_URL, 'principal')
     population_data = get_data_population()
+    output_data = _assemble([data for _, data in _parse_sheets(path, population_data, workers)])
+
+    if to_csv:
+        _save(output_data, _sheet_hashes(path), _parse_national(path))
+    
+    return output_data
+
+def refresh_datas(workers=1):
+    """
+    refresh_datas(workers=1)
+    ------
+    Met à jour les données de façon incrémentale. Les fichiers sources ne sont téléchargés que s'ils ont changé
+    (ETag / Last-Modified, puis empreinte du contenu) et, si seul le fichier principal a changé, seules les feuilles
+    dont le contenu diffère sont traitées à nouveau puis fusionnées avec le cache existant.
+    Args:
+    ------
+        - workers (int, optional):
+            Nombre de processus utilisés pour lire les feuilles en parallèle.
+
+    Returns:
+    ------
+        - DataFrame: les nouvelles données, None si elles étaient déjà à jour.
+    """
+    manifest = _read_manifest()
+    urls = manifest.get('urls', {})
+    _download(DATA_URL, 'principal', manifest)
+    _download(DATA_URL2, 'de la population', manifest)
+    principal_modifie = _source_hashes[DATA_URL] != urls.get(DATA_URL, {}).get('sha256')
+    population_modifiee = _source_hashes[DATA_URL2] != urls.get(DATA_URL2, {}).get('sha256')
+
+    if not principal_modifie and not population_modifiee and _is_cache_valid():
+        print("Les données sont déjà à jour")
+        _write_manifest(manifest.get('sheets', {}))
+        return None
+
+    path = SOURCE_PATHS[DATA_URL]
+    population_data = _read_population(SOURCE_PATHS[DATA_URL2])
+    sheet_hashes = _sheet_hashes(path)
+    precedents = manifest.get('sheets', {})
+    if population_modifiee or not _is_cache_valid() or not precedents:
+        # La population concerne toutes les lignes: tout est traité à nouveau
+        return _save(_assemble([data for _, data in _parse_sheets(path, population_data, workers)]), sheet_hashes,
+                     _parse_national(path))
+
+    modifiees = {sheet_name for sheet_name, empreinte in sheet_hashes.items() if precedents.get(sheet_name) != empreinte}
+    print(f"{len(modifiees)} feuille(s) modifiée(s)")
+    nouvelles = dict(_parse_sheets(path, population_data, workers, only=modifiees))
+
+    existantes = pd.read_parquet(CACHE_PATH)
     datas = []
+    for sheet_name, num_departement, _, _ in _departement_sheets(sheet_hashes.keys(), population_data):
+        if sheet_name in nouvelles:
+            datas.append(nouvelles[sheet_name])
+        else:
+            datas.append(existantes[existantes['num_departement'] == num_departement])
+    # Les feuilles nationales sont peu nombreuses: elles sont toujours relues
+    return _save(_assemble(datas), sheet_hashes, _parse_national(path))
+
+def _parse_sheets(path, population_data, workers=1, only=None) -> list:
+    """
+    _parse_sheets(path, population_data, workers=1, only=None) -> list
+    ------
+    Lit et transforme les feuilles des départements du fichier principal.
+    Args:
+    ------
+        - path (str): le chemin du fichier principal.
+        - population_data (DataFrame): le fichier de la population.
+        - workers (int, optional): nombre de processus utilisés pour lire les feuilles en parallèle.
+        - only (set, optional): si fourni, seules ces feuilles sont traitées.
+
+    Returns:
+    ------
+        - list: des tuples (sheet_name, DataFrame), dans l'ordre du fichier.
+    """
     print("Début du traitement des données...")
-    # Pour chaque feuille ... 
-    with alive_bar(96) as bar:
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name)
+    # Lecture en flux: les lignes de chaque feuille vont directement au traitement, sans charger le classeur
+    workbook = _open_workbook(path)
+    try:
+        sheets = _departement_sheets(workbook.sheetnames, population_data)
+        if only is not None:
+            sheets = [sheet for sheet in sheets if sheet[0] in only]
+        # Pour chaque feuille ... 
+        with alive_bar(len(sheets)) as bar:
+            if workers > 1:
+                datas = _parse_sheets_parallel(path, sheets, workers, bar)
+            else:
+                datas = []
+                for sheet_name, *departement in sheets:
+                    datas.append(parse_sheet_rows(workbook[sheet_name].iter_rows(values_only=True), *departement))
+                    bar()
+    finally:
+        workbook.close()
+    return [(sheet[0], data) for sheet, data in zip(sheets, datas)]
+
+def _parse_national(path) -> pd.DataFrame:
+    """
+    _parse_national(path) -> DataFrame
+    ------
+    Lit les feuilles des totaux nationaux (NATIONAL_SHEETS) du fichier principal, comme celles des départements.
+    Args:
+    ------
+        - path (str): le chemin du fichier principal.
+
+    Returns:
+    ------
+        - DataFrame: une ligne par (perimetre, fait, mois), avec les colonnes de NATIONAL_TYPES.
+          None si le fichier ne contient aucune des feuilles nationales.
+    """
+    workbook = _open_workbook(path)
+    try:
+        datas = [parse_sheet_rows(workbook[sheet_name].iter_rows(values_only=True), sheet_name, 0, sheet_name)
+                 for sheet_name in NATIONAL_SHEETS if sheet_name in workbook.sheetnames]
+    finally:
+        workbook.close()
+    if not datas:
+        return None
+    national = pd.concat(datas, ignore_index=True).rename(columns={'num_departement': 'perimetre'})
+    return national[list(NATIONAL_TYPES)].astype(NATIONAL_TYPES)
+
+def _check_national(output_data, national):
+    """
+    _check_national(output_data, national)
+    ------
+    Affiche le nombre de (fait, mois) pour lesquels le total de la France métropolitaine diffère de la somme
+    des départements: c'est ce total que le dashboard affiche pour "Tout".
+    """
+    cles = ['fait', 'annee', 'mois']
+    sommes = output_data.groupby(cles, observed=True)['nombre'].sum()
+    totaux = _metropole(national).groupby(cles, observed=True)['nombre'].sum()
+    for serie in (sommes, totaux):
+        serie.index = pd.MultiIndex.from_frame(serie.index.to_frame().astype(str))
+    comparaison = pd.concat([sommes, totaux], axis=1, keys=['departements', 'metropole']).fillna(-1)
+    ecarts = int((comparaison['departements'] != comparaison['metropole']).sum())
+    if ecarts:
+        print(f"Attention: le total {METROPOLE} diffère de la somme des départements pour {ecarts} (fait, mois)")
+
+def _assemble(datas) -> pd.DataFrame:
+    """
+    _assemble(datas) -> DataFrame
+    ------
+    Concatène les tables des départements en DataFrame global typé.
+    """
+    # Champ pour notre DataFrame final
+    output_data = pd.concat(datas, ignore_index=True).astype(TYPES)
+    # Catégories triées pour que les regroupements gardent l'ordre lexical des anciennes colonnes texte
+    for column, dtype in TYPES.items():
+        if dtype == 'category':
+            output_data[column] = output_data[column].cat.reorder_categories(
+                sorted(output_data[column].cat.categories))
+    return output_data
+
+def _save(output_data, sheet_hashes, national=None) -> pd.DataFrame:
+    """
+    _save(output_data, sheet_hashes, national=None) -> DataFrame
+    ------
+    Sauvegarde le DataFrame global et les totaux nationaux (CSV et cache Parquet) puis le manifeste des fichiers sources.
+    """
+    # Sauvegarder le DataFrame dans un fichier CSV
+    print("Sauvegarde du fichier CSV...")
+    try:
+        output_data.to_csv(EXPORT_PATH, index=False,sep=";")
+        print(f"Le fichier CSV a été créé avec succès : {EXPORT_PATH}")    
+        if national is not None:
+            _check_national(output_data, national)
+            national.to_csv(NATIONAL_EXPORT_PATH, index=False, sep=";")
+        if pq is not None:
+            # Les totaux nationaux d'abord: ils ne sont lus qu'avec la version du cache principal
+            if national is not None:
+                write_cache(national, _compute_version(), NATIONAL_CACHE_PATH, NATIONAL_TYPES)
+            write_cache(output_data, _compute_version())
+            print(f"Le cache a été créé avec succès : {CACHE_PATH}")
+    except Exception as e:
+        print(f"Erreur lors de la sauvegarde du fichier CSV : {e}")
+        exit(1)
+    _write_manifest(sheet_hashes)
+    return output_data
 
-            # On récupère le numéro du département et on garde aussi la France entière
-            # pour permettre de consulter les données au niveau national sans avoir à les calculer nous-même
+def _sheet_hashes(path) -> dict:
+    """
+    _sheet_hashes(path) -> dict
+    ------
+    Calcule l'empreinte de chaque feuille du classeur à partir de son XML (sans le lire avec openpyxl).
+    Les textes des cellules sont partagés entre les feuilles (sharedStrings.xml): dans le XML de chaque
+    feuille, les indices des textes qu'elle utilise sont remplacés par ces textes avant le calcul. Un texte
+    ajouté ailleurs dans le classeur (un nouveau mois, par exemple) ne change donc pas l'empreinte des
+    autres feuilles.
+
+    Returns:
+    ------
+        - dict: l'empreinte SHA-256 de chaque feuille, par nom de feuille.
+    """
+    namespace = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+    main = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+    with zipfile.ZipFile(path) as archive:
+        relations = {relation.get('Id'): relation.get('Target')
+                     for relation in ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))}
+        textes = []
+        if 'xl/sharedStrings.xml' in archive.namelist():
+            textes = [''.join(t.text or '' for t in si.iter(main + 't')).encode('utf-8')
+                      for si in ElementTree.fromstring(archive.read('xl/sharedStrings.xml')).iter(main + 'si')]
+
+        def resoudre(cellule):
+            return cellule.group(1) + b'<v>' + textes[int(cellule.group(2))] + b'</v>'
+
+        hashes = {}
+        for sheet in ElementTree.fromstring(archive.read('xl/workbook.xml')).iter(main + 'sheet'):
+            target = relations[sheet.get(namespace)]
+            member = target.lstrip('/') if target.startswith('/') else 'xl/' + target
+            contenu = _CELLULE_TEXTE.sub(resoudre, archive.read(member))
+            hashes[sheet.get('name')] = hashlib.sha256(contenu).hexdigest()
+    return hashes
+
+def _read_manifest() -> dict:
+    """
+    _read_manifest() -> dict
+    ------
+    Lit le manifeste des fichiers sources (vide s'il n'existe pas).
+    """
+    if not os.path.isfile(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, encoding='utf-8') as file:
+        return json.load(file)
+
+def _write_manifest(sheet_hashes):
+    """
+    _write_manifest(sheet_hashes)
+    ------
+    Enregistre les en-têtes et empreintes des fichiers sources téléchargés ainsi que celles des feuilles.
+    """
+    manifest = {
+        'urls': {url: {'sha256': _source_hashes.get(url), **_source_headers.get(url, {})}
+                 for url in (DATA_URL, DATA_URL2)},
+        'sheets': sheet_hashes,
+        'data_version': _compute_version(),
+    }
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+
+def _open_workbook(path):
+    """
+    _open_workbook(path) -> Workbook
+    ------
+    Ouvre un classeur en lecture seule: openpyxl ne lit alors les feuilles qu'au fil de leur parcours.
+    """
+    # Import différé: le dashboard n'en a pas besoin quand les données sont déjà préparées
+    import openpyxl
 
-            # Pour l'instant on veut seulement des données par département métropolitains
-            if(sheet_name == 'France_Métro' or sheet_name == 'France_Entière' or sheet_name > '95'):
-                continue
+    return openpyxl.load_workbook(path, read_only=True, data_only=True)
 
-            bar()    
-            num_departement = sheet_name
-            population = population_data[population_data['Code département'] == num_departement]['Population totale'].values[0]
-            nom_departement = population_data[population_data['Code département'] == num_departement]['Nom du département'].values[0]
+_worker_workbook = None
+"""
+    Fichier principal ouvert dans chaque processus de _parse_sheets_parallel
+"""
 
-            for index, row in df.iterrows():
-                # On extrait le mois et l'année à partir des noms de colonnes
+def _init_worker(path):
+    """
+    _init_worker(path)
+    ------
+    Ouvre le fichier principal une seule fois par processus.
+    """
+    global _worker_workbook
+    _worker_workbook = _open_workbook(path)
 
-                for col_name in df.columns[2:]:
-                    _,annee, mois = col_name.split('_') # Le mois et l'année sont sous forme '_mois_annee'
-                    fait = row['libellé index']
-                    nombre = row[col_name]
+def _parse_sheet_worker(sheet_name, num_departement, population, nom_departement) -> pd.DataFrame:
+    """
+    _parse_sheet_worker(sheet_name, num_departement, population, nom_departement) -> DataFrame
+    ------
+    Lit et transforme une feuille dans un processus de _parse_sheets_parallel.
+    """
+    rows = _worker_workbook[sheet_name].iter_rows(values_only=True)
+    return parse_sheet_rows(rows, num_departement, population, nom_departement)
 
-                    datas.append([num_departement, mois, annee, fait, nombre, population, nom_departement])
-            
+def _parse_sheets_parallel(path, sheets, workers, bar) -> list:
+    """
+    _parse_sheets_parallel(path, sheets, workers, bar) -> list
+    ------
+    Lit et transforme les feuilles dans un pool de processus.
+    Args:
+    ------
+        - path (str): le chemin du fichier principal.
+        - sheets (list): les feuilles à traiter, retournées par _departement_sheets.
+        - workers (int): le nombre de processus.
+        - bar: la barre de progression, avancée à chaque feuille terminée.
 
+    Returns:
+    ------
+        - list: les DataFrames des feuilles, dans l'ordre de sheets quel que soit l'ordre de fin des processus.
+    """
+    datas = [None] * len(sheets)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as executor:
+        futures = {executor.submit(_parse_sheet_worker, *sheet): position for position, sheet in enumerate(sheets)}
+        for future in as_completed(futures):
+            datas[futures[future]] = future.result()
+            bar()
+    return datas
+
+def _compute_version() -> str:
+    """
+    _compute_version() -> str
+    ------
+    Calcule la version des données à partir des empreintes des fichiers sources téléchargés.
+    """
+    empreinte = hashlib.sha256()
+    for url in (DATA_URL, DATA_URL2):
+        empreinte.update(_source_hashes.get(url, '').encode())
+    return empreinte.hexdigest()[:16]
 
-    # Champ pour notre DataFrame final
-    output_data = pd.DataFrame(datas, columns=['num_departement', 'mois', 'annee', 'fait', 'nombre','population','nom_departement'])
+def check_parity():
+    """
+    check_parity() -> bool
+    ------
+    Compare, feuille par feuille, les tables produites par parse_sheet et par la lecture en flux
+    (parse_sheet_rows) avec celle de l'ancienne implémentation (_parse_sheet_iterrows)
+    et affiche le gain de temps obtenu.
 
-    if to_csv:
-    # Sauvegarder le DataFrame dans un fichier CSV
-        print("Sauvegarde du fichier CSV...")
-        try:
-            output_data.to_csv(EXPORT_PATH, index=False,sep=";")
-            print(f"Le fichier CSV a été créé avec succès : {EXPORT_PATH}")    
-        except Exception as e:
-            print(f"Erreur lors de la sauvegarde du fichier CSV : {e}")
-            exit(1)
-    
-    return output_data
+    Returns:
+    ------
+        - bool: True si les deux implémentations produisent exactement les mêmes données.
+    """
+    xls = get_main_data()
+    population_data = get_data_population()
+    temps_vectorise = temps_iterrows = 0
+    identique = True
+    sheets = _departement_sheets(xls.sheet_names, population_data)
+    workbook = _open_workbook(SOURCE_PATHS[DATA_URL])
+    with alive_bar(len(sheets)) as bar:
+        for sheet_name, *departement in sheets:
+            sheet = (pd.read_excel(xls, sheet_name), *departement)
+            debut = time.perf_counter()
+            vectorise = parse_sheet(*sheet)
+            temps_vectorise += time.perf_counter() - debut
+
+            debut = time.perf_counter()
+            reference = _parse_sheet_iterrows(*sheet)
+            temps_iterrows += time.perf_counter() - debut
+
+            flux = parse_sheet_rows(workbook[sheet_name].iter_rows(values_only=True), *departement)
+
+            # On compare via le CSV pour vérifier le schéma réellement écrit dans output.csv
+            attendu = reference.to_csv(index=False, sep=';')
+            if vectorise.to_csv(index=False, sep=';') != attendu or flux.to_csv(index=False, sep=';') != attendu:
+                print(f"Différence détectée pour le département {sheet[1]}")
+                identique = False
+            bar()
+    workbook.close()
+
+    print(f"Ancienne implémentation : {temps_iterrows:.2f}s, implémentation vectorisée : {temps_vectorise:.2f}s "
+          f"(x{temps_iterrows / max(temps_vectorise, 1e-9):.0f})")
+    return identique
 
 if __name__ == '__main__':
-    parse_datas(to_csv=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Récupère et prépare les données du dashboard.")
+    parser.add_argument('--check', action='store_true',
+                        help="Vérifie que le traitement vectorisé produit les mêmes données que l'ancien traitement")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Met à jour les données de façon incrémentale (seulement si les fichiers sources ont changé)")
+    parser.add_argument('--geojson', action='store_true',
+                        help="Télécharge à nouveau le GeoJSON des départements dans le dossier data/ et le simplifie "
+                             "(tolérance et précision: variables GEOJSON_TOLERANCE et GEOJSON_PRECISION)")
+    parser.add_argument('--figures', action='store_true',
+                        help="Construit à nouveau les figures par défaut du dashboard (data/figures.json)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Nombre de processus utilisés pour lire les feuilles du fichier principal (par défaut 1)")
+    args = parser.parse_args()
+
+    if args.check:
+        exit(0 if check_parity() else 1)
+    if args.geojson:
+        gain = Geometrie.refresh_geojson()
+        for mesure, unite in (('octets', 'octets'), ('sommets', 'sommets'), ('serialisation', 's')):
+            avant, apres = gain[mesure]
+            print(f"{mesure:<14}: {avant:>12,.6g} {unite} -> {apres:>12,.6g} {unite} "
+                  f"(-{100 * (1 - apres / max(avant, 1e-9)):.0f} %)")
+        exit(0)
+    if args.figures:
+        build_figures()
+        exit(0)
+    if args.refresh:
+        refresh_datas(workers=args.workers)
+    else:
+        parse_datas(to_csv=True, workers=args.workers)
+    if pq is not None:
+        build_figures()
@@ -0,0 +1,54 @@
+"""
+Configuration de gunicorn (lue automatiquement par `gunicorn main:server`).
+
+L'application est importée une seule fois dans le processus maître avant la création des workers
+(preload_app): les données, projetées en mémoire depuis data/dataset/, sont partagées par tous les workers
+au lieu d'être chargées par chacun d'eux.
+
+Auteur
+---------
+Léon E.
+"""
+
+import os
+import shutil
+
+# Métriques des workers écrites dans un dossier commun, additionnées par /metrics (voir src/Metriques.py)
+os.environ.setdefault('METRICS_DIR', '/tmp/dashboard-metrics')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', '8'))
+preload_app = True
+
+
+def post_fork(server, worker):
+    """
+    Lance le chargement des données dans chaque worker: l'import de l'application ne charge rien,
+    et un thread démarré dans le processus maître ne survivrait pas au fork.
+    """
+    import main
+    main.demarrer_chargement()
+
+
+def post_worker_init(worker):
+    """
+    Installe le signal de rechargement des données dans chaque worker (`kill -USR2 <pid du worker>`),
+    après l'initialisation des signaux par gunicorn.
+    """
+    import main
+    main.installer_signal()
+
+
+def on_starting(server):
+    """
+    Vide le dossier des métriques laissé par une exécution précédente.
+    """
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
+
+
+def child_exit(server, worker):
+    """
+    Retire les jauges d'un worker terminé des métriques.
+    """
+    import src.Metriques as Metriques
+    Metriques.processus_termine(worker.pid)
@@ -15,6 +15,7 @@ Imports
 - dash.dcc
 - dash.html
 - datetime.datetime
+- os, threading
 - Graphs.Carte
 - get_data
 - Graphs.CamembertFaits
@@ -24,16 +25,47 @@ Imports
 
 Fonctions
 ---------
-- layout(annees, mois, departements, faits, default_annee, default_mois, default_departement, default_fait)
-    Initialise le layout du tableau de bord avec les paramètres spécifiés.
+- create_app() -> Dash
+    Crée l'application Dash, sans charger les données: `server` est disponible dès l'import du module.
+
+- demarrer_chargement()
+    Lance le chargement des données et des figures par défaut en arrière-plan (une fois par processus).
+
+- recharger() -> bool
+    Charge les nouvelles données si leur version a changé et les substitue aux précédentes d'un seul coup.
+
+- demander_rechargement(), installer_signal()
+    Demande une vérification immédiate de la version des données (signal SIGUSR2).
+
+- donnees_courantes() -> tuple
+    Retourne les données chargées et leur version.
+
+- layout(annees, mois, departements, faits, default_annee, default_mois, default_departement, default_fait, figures=None, cube=None)
+    Retourne le layout du tableau de bord avec les paramètres spécifiés.
+
+- serve_layout()
+    Retourne le layout du tableau de bord une fois les données chargées, une page d'attente sinon.
+
+- ready()
+    Point d'accès /ready: 200 quand les données et les figures par défaut sont prêtes, 503 sinon.
+
+- metrics()
+    Point d'accès /metrics: durées, tailles des réponses et cache des callbacks au format de Prometheus.
+
+- get_figure(version, cle, build) -> dict
+    Retourne la figure d'un callback depuis le cache (ou la construit) et mesure l'appel.
 
 - main()
     Fonction principale pour exécuter le tableau de bord.
 
 Callback Functions
 ------------------
-- update_map_graph(year, month, fait, display)
+- update_map_graph(year, month, fait, display, traces=True)
     Met à jour le graphique de la carte de la France et de l'Île-de-France en fonction des paramètres sélectionnés.
+    traces indique si les cartes affichées ont une trace à modifier (sinon les figures complètes sont renvoyées).
+
+- patch_carte(graph_id, valeurs) -> dash.Patch
+    Retourne la mise à jour partielle d'une carte, sans sa géométrie.
 
 - update_most_common_crimes_pie_graph(month, year, departement, tri, limit)
     Met à jour le graphique du camembert des faits les plus/moins communs en fonction des paramètres sélectionnés.
@@ -41,12 +73,31 @@ Callback Functions
 - update_histogramme_par_mois_graph(year, departements, fait)
     Met à jour le graphique de l'histogramme par mois en fonction des paramètres sélectionnés.
 
-- update_delits_crimes_par_annees_graph(fait, departement)
-    Met à jour le graphique des délits et crimes par années en fonction des paramètres sélectionnés.
+- update_delits_crimes_par_annees_graph(faits, departements)
+    Met à jour le graphique des délits et crimes par années en fonction des paramètres sélectionnés
+    (une courbe par département et par fait choisis).
+
+Les figures des callbacks sont mises en cache (figure_cache) à partir de la version des données et de leurs
+paramètres normalisés.
+Les figures initiales sont celles de src/Figures.py: les callbacks ne sont pas appelés au premier affichage.
+La géométrie des cartes n'est envoyée qu'avec ces figures initiales: update_map_graph ne renvoie ensuite que
+des mises à jour partielles (dash.Patch) des valeurs, de la légende et du titre, sauf si les cartes initiales
+n'ont pas de trace ou si les filtres ne donnent aucune donnée (figures complètes).
+Avec DASHBOARD_CLIENTSIDE=1, les callbacks du camembert, de l'histogramme et de l'évolution par années sont
+exécutés dans le navigateur à partir du cube des données (voir src/Clientside.py et assets/clientside.js).
+Les agrégats calculés sur le serveur passent par le moteur de requêtes choisi avec DASHBOARD_BACKEND
+(voir src/Requetes.py).
 """
 
 # Imports locaux
 import src.Utils as Utils
+import src.Api as Api
+import src.Cache as Cache
+import src.Clientside as Clientside
+import src.Compression as Compression
+import src.Figures as Figures
+import src.Metriques as Metriques
+import src.Profilage as Profilage
 import src.Graphs.Carte as Carte
 import get_data
 import src.Graphs.CamembertFaits as CamembertFaits
@@ -54,14 +105,20 @@ import src.Graphs.HistogrammeParMois as HistogrammeParMois
 import src.Graphs.DelitsCrimesParAnnees as DelitsCrimesParAnnees
 
 # Imports standards
+import collections
+import json
+import os
+import signal
+import threading
 from datetime import datetime
 
 # Imports tiers
 try:
-    from dash.dependencies import Input, Output
+    from dash.dependencies import ClientsideFunction, Input, Output, State
     import dash
     from dash import dcc
     from dash import html
+    from dash.exceptions import PreventUpdate
     
     import numpy as np
 except ModuleNotFoundError as e:
@@ -74,15 +131,158 @@ except ModuleNotFoundError as e:
 
 
 debug = True
-time = datetime.now()
-data = get_data.get_global_dataframe()
-app = dash.Dash(__name__)
+TITRE = 'Dashboard des crimes et délits en France entre 1996 et le premier trimestre 2022'
+figure_cache = Cache.FigureCache(max_bytes=128 * 1024 * 1024)
 
+RELOAD_INTERVAL = float(os.environ.get('DASHBOARD_RELOAD_INTERVAL', '60'))
+"""
+    Intervalle (en secondes) entre deux vérifications de la version des données sur le disque, 0 pour ne vérifier
+    qu'à la demande (signal SIGUSR2)
+"""
+
+MOTEUR = os.environ.get('DASHBOARD_BACKEND')
+"""
+    Moteur de requêtes des graphiques: 'cube' (par défaut), 'pandas' ou 'duckdb' (voir src/Requetes.py)
+"""
+
+Etat = collections.namedtuple('Etat', ['dataset', 'version', 'page'])
+"""
+    Données chargées, leur version et la page construite avec elles
+"""
+
+# Chargé en arrière-plan par demarrer_chargement(): rien n'est lu à l'import du module.
+# Un rechargement remplace etat d'un seul coup: les callbacks le lisent une seule fois par appel
+# et ne voient jamais des données à moitié construites.
+etat = None
+erreur_chargement = None
+donnees_pretes = threading.Event()
+_demande_rechargement = threading.Event()
+_chargement = None
+_verrou_chargement = threading.Lock()
+
+
+def demarrer_chargement():
+    """
+    Lance le chargement des données et des figures par défaut dans un thread, une seule fois par processus.
+    Le même thread recharge ensuite les données quand leur version change (voir recharger()).
+    Sous gunicorn elle est appelée après la création de chaque worker (voir gunicorn.conf.py): les threads ne
+    survivent pas à un fork, le chargement ne peut donc pas être lancé dans le processus maître.
+    """
+    global _chargement
+    with _verrou_chargement:
+        if _chargement != os.getpid():
+            _chargement = os.getpid()
+            threading.Thread(target=_surveiller, name='chargement-donnees', daemon=True).start()
+
+
+def demander_rechargement(*args):
+    """
+    Demande une vérification immédiate de la version des données (gestionnaire du signal SIGUSR2).
+    """
+    _demande_rechargement.set()
+
+
+def installer_signal():
+    """
+    Installe demander_rechargement() comme gestionnaire du signal SIGUSR2 (à appeler depuis le thread principal).
+    """
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, demander_rechargement)
+
+
+def _surveiller():
+    """
+    Charge les données, puis vérifie leur version toutes les RELOAD_INTERVAL secondes ou à la demande.
+    """
+    while True:
+        try:
+            recharger()
+        except Exception as e:
+            print(f"{Utils.Colors.FAIL}Le chargement des données a échoué: {e}{Utils.Colors.ENDC}")
+        _demande_rechargement.wait(RELOAD_INTERVAL if RELOAD_INTERVAL > 0 else None)
+        _demande_rechargement.clear()
+
+
+def recharger():
+    """
+    Charge les données si leur version sur le disque a changé (ou si elles ne sont pas encore chargées).
+
+    Les données (projetées en mémoire depuis data/dataset/: une seule copie partagée par tous les workers
+    gunicorn), les figures par défaut et la page sont construites en dehors des requêtes, puis remplacent
+    les précédentes d'un seul coup. Les figures du cache, construites avec l'ancienne version, sont supprimées.
+    Les requêtes en cours terminent avec les données qu'elles ont déjà lues.
+
+    Returns
+    -------
+    bool
+        True si de nouvelles données ont été chargées.
+    """
+    global etat, erreur_chargement
+    courant = etat
+    if courant is not None and (get_data.get_data_version() or 'local') == courant.version:
+        return False
+
+    debut = datetime.now()
+    try:
+        dataset = get_data.get_dataset(mmap=True, moteur=MOTEUR)
+        debug and print("Données récupérées en " + str(datetime.now() - debut))
+        version = dataset.version or 'local'
+        etat = Etat(dataset, version, construire_page(dataset, version))
+    except Exception as e:
+        if courant is None:
+            erreur_chargement = e
+        raise
+    erreur_chargement = None
+    figure_cache.clear()
+    donnees_pretes.set()
+    debug and print(f"Dashboard prêt en {datetime.now() - debut} (version {version})")
+    return True
+
+
+def donnees_courantes():
+    """
+    Retourne les données chargées et leur version, None tant qu'elles ne sont pas chargées.
+
+    Returns
+    -------
+    tuple
+        (dataset, version)
+    """
+    courant = etat
+    return None if courant is None else (courant.dataset, courant.version)
+
+
+def attendre_donnees(timeout=60):
+    """
+    Attend la fin du chargement des données avant de répondre à un callback.
+
+    Returns
+    -------
+    Etat
+        Les données courantes, à utiliser pendant tout le callback.
+
+    Raises
+    ------
+    PreventUpdate
+        Si les données ne sont pas prêtes à temps (la figure affichée n'est alors pas modifiée).
+    """
+    demarrer_chargement()
+    if not donnees_pretes.wait(timeout):
+        raise PreventUpdate
+    return etat
+
+
+def layout(annees, mois, departements, faits, default_annee, default_mois, default_departement, default_fait,
+           figures=None, cube=None):
+    figures = figures or {}
+    return html.Div(children=[
+        # Description du cube des données pour le mode clientside (voir src/Clientside.py)
+        dcc.Store(id='cube-meta', data=cube),
+        # True si les cartes initiales ont leur trace: update_map_graph peut alors ne renvoyer que des Patch
+        dcc.Store(id='map-traces', data=all(figures.get(graph_id) is not None and len(figures[graph_id]['data']) > 0
+                                             for graph_id in ('map_france', 'map_idf'))),
+        html.Div(id='cube-etat', hidden=True),
 
-def layout(annees, mois, departements, faits, default_annee, default_mois, default_departement, default_fait):
-    map_france,map_idf = Carte.get_map_graph(data, default_annee, default_departement,default_fait,-1)
-    app.title = 'Dashboard des crimes et délits en France entre 1996 et le premier trimestre 2022'
-    app.layout = html.Div(children=[
         # Header de la page
         html.Header(children=[
             html.H1(children='Dashboard des crimes et délits en France entre 1996 et le premier trimestre 2022'),
@@ -129,7 +329,7 @@ def layout(annees, mois, departements, faits, default_annee, default_mois, defau
                         children=[
                             dcc.Graph(
                                 id='map_france',
-                                figure=map_france
+                                figure=figures.get('map_france')
                             ),
                         ]
                     ),
@@ -139,7 +339,7 @@ def layout(annees, mois, departements, faits, default_annee, default_mois, defau
                         children=[
                             dcc.Graph(
                                 id='map_idf',
-                                figure=map_idf
+                                figure=figures.get('map_idf')
                             ),
                         ]
                     ),
@@ -190,8 +390,7 @@ def layout(annees, mois, departements, faits, default_annee, default_mois, defau
                         children=[
                             dcc.Graph(
                                 id='most_common_crimes',
-                                figure=CamembertFaits.get_common_crimes_pie_graph(data, default_annee, default_mois,
-                                                                                default_departement, ascending=False),
+                                figure=figures.get('most_common_crimes'),
                             ),
                         ]
                     ),
@@ -230,8 +429,7 @@ def layout(annees, mois, departements, faits, default_annee, default_mois, defau
                         children=[
                             dcc.Graph(
                                 id='histogramme_par_mois',
-                                figure=HistogrammeParMois.get_histogramme_graph(data, default_annee, default_departement,
-                                                                                default_fait),
+                                figure=figures.get('histogramme_par_mois'),
                             ),
                         ]
                     ),
@@ -246,13 +444,15 @@ def layout(annees, mois, departements, faits, default_annee, default_mois, defau
                     dcc.Dropdown(
                         id='dcpa-fait-dropdown',
                         options=[{'label': fait, 'value': fait} for fait in faits],
-                        value=default_fait
+                        value=default_fait,
+                        multi=True
                     ),
                     html.Label('Département'),
                     dcc.Dropdown(
                         id='dcpa-departement-dropdown',
                         options=[{'label': departement, 'value': departement} for departement in departements],
-                        value=default_departement
+                        value=default_departement,
+                        multi=True
                     )
                 ]),
                 # Débits et crimes par années
@@ -263,8 +463,7 @@ def layout(annees, mois, departements, faits, default_annee, default_mois, defau
                         children=[
                             dcc.Graph(
                                 id='delits_crimes_par_annees',
-                                figure=DelitsCrimesParAnnees.get_delits_crimes_annees_graph(data, default_fait,
-                                                                                            default_departement),
+                                figure=figures.get('delits_crimes_par_annees'),
                             ),
                         ]
                     ),
@@ -275,12 +474,17 @@ def layout(annees, mois, departements, faits, default_annee, default_mois, defau
 
 
 
-   
-def main():
-    debug and print("Lancement du main")
+def construire_page(dataset, version):
+    """
+    Construit le layout du tableau de bord à partir des données, avec les figures par défaut.
 
-    debug and print("Données récupérées en " + str(datetime.now() - time))
-    
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    version : str
+        La version des données ('local' si elle est inconnue).
+    """
     # Paramètres par défaut des dropdowns
     default_annee = 'Tout'
     default_departement = 'Tout'
@@ -288,70 +492,258 @@ def main():
     default_fait = 'Tout'
 
 
-    departements = np.append(data['num_departement'].unique(), default_departement)
-    annees = np.append(data['annee'].unique(), default_annee)
-    mois = np.append(data['mois'].unique(), default_mois)
-    faits = np.append(data['fait'].unique(), 'Tout')
+    departements = np.append(dataset.liste_departements(), default_departement)
+    annees = np.append(dataset.liste_annees(), default_annee)
+    mois = np.append(dataset.liste_mois(), default_mois)
+    faits = np.append(dataset.liste_faits(), 'Tout')
     departements.sort()
     annees.sort()
     mois.sort()
-    
-
-    layout(annees, mois, departements, faits, default_annee, default_mois, default_departement, default_fait)
-
-
-    
-
-
-
+    # Les régions se choisissent dans les mêmes listes que les départements (voir Dataset.REGIONS)
+    departements = np.append(departements, dataset.liste_regions())
+
+    # Figures des valeurs initiales des dropdowns, lues depuis data/figures.json quand elles y sont à jour
+    figures = Figures.get_figures_defaut(dataset, dataset.version)
+    cube = Clientside.metadonnees(dataset, version) if Clientside.ACTIF else None
+    return layout(annees, mois, departements, faits, default_annee, default_mois, default_departement, default_fait,
+                  figures, cube)
+
+
+def page_chargement():
+    """
+    Retourne la page affichée pendant le chargement des données: elle se recharge dès que /ready répond 200.
+    """
+    return html.Div(children=[
+        html.Header(children=[html.H1(children=TITRE)]),
+        html.Main(children=[html.P(id='chargement-message', children='Chargement des données en cours ...')]),
+        dcc.Interval(id='chargement-interval', interval=1000),
+    ])
 
 
-@app.callback(
+def serve_layout():
+    """
+    Retourne le layout du tableau de bord, ou la page d'attente si les données ne sont pas encore chargées.
+    """
+    demarrer_chargement()
+    courant = etat
+    return courant.page if courant is not None else page_chargement()
+
+
+def ready():
+    """
+    Point d'accès /ready pour les vérifications de disponibilité (readiness): 200 quand les données
+    et les figures par défaut sont prêtes, 503 tant qu'elles sont en cours de chargement.
+    """
+    demarrer_chargement()
+    if donnees_pretes.is_set():
+        return {'status': 'ready'}, 200
+    if erreur_chargement is not None:
+        return {'status': 'error', 'error': str(erreur_chargement)}, 503
+    return {'status': 'loading'}, 503
+
+
+def metrics():
+    """
+    Point d'accès /metrics: métriques des callbacks (durée totale, agrégation, construction de la figure,
+    taille de la réponse) et du cache des figures, au format texte de Prometheus.
+    """
+    return Metriques.exporter(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+def get_figure(version, cle, build):
+    """
+    Retourne la figure d'un callback depuis figure_cache, en la construisant si nécessaire, et mesure l'appel
+    (le premier élément de la clé est le nom du callback).
+
+    Parameters
+    ----------
+    version : str
+        La version des données utilisées, ajoutée à la clé du cache.
+    cle : tuple
+        La clé de la figure: nom du callback puis entrées normalisées.
+    build : callable
+        Fonction sans argument construisant la figure.
+
+    Returns
+    -------
+    dict or list
+        La figure (une liste pour un tuple de figures).
+    """
+    with Metriques.mesurer_callback(cle[0]) as mesure:
+        contenu, mesure['hit'] = figure_cache.get_or_build_json((version,) + cle, build)
+        mesure['taille'] = len(contenu)
+        stats = figure_cache.stats()
+        Metriques.definir('dashboard_figure_cache_bytes', stats['bytes'])
+        Metriques.definir('dashboard_figure_cache_entries', stats['entries'])
+    return json.loads(contenu)
+
+
+def create_app():
+    """
+    Crée l'application Dash. Les données ne sont pas chargées ici: le layout est servi par serve_layout()
+    et les callbacks (enregistrés avec dash.callback) attendent la fin du chargement.
+
+    Returns
+    -------
+    dash.Dash
+        L'application, dont le serveur Flask expose aussi /ready, /metrics et l'API des agrégats (/api/...).
+    """
+    app = dash.Dash(__name__)
+    app.title = TITRE
+    # Layout complet (sans données) pour valider les callbacks, le vrai layout dépendant du chargement
+    app.validation_layout = html.Div(children=[layout([], [], [], [], 'Tout', 'Tout', 'Tout', 'Tout'),
+                                               page_chargement()])
+    app.layout = serve_layout
+    app.server.add_url_rule('/ready', 'ready', ready)
+    app.server.add_url_rule('/metrics', 'metrics', metrics)
+    # API en lecture seule des agrégats (/api/aggregate et /api/aggregate/batch)
+    Api.installer(app.server, donnees_courantes)
+    if Clientside.ACTIF:
+        Clientside.installer(app.server, donnees_courantes)
+    # Profilage des callbacks à la demande (désactivé sans DASHBOARD_PROFILE ni en-tête signé)
+    Profilage.installer(app.server)
+    # Compression gzip / brotli des réponses, mises en cache une fois compressées
+    Compression.installer(app.server)
+    return app
+
+
+dash.clientside_callback(
+    """
+    function(n_intervals) {
+        fetch('ready').then(function(response) { if (response.ok) { window.location.reload(); } });
+        return window.dash_clientside.no_update;
+    }
+    """,
+    Output('chargement-message', 'title'),
+    Input('chargement-interval', 'n_intervals'))
+
+
+@dash.callback(
     Output('map_france', 'figure'),
     Output('map_idf', 'figure'),
     Input('map_year_dropdown', 'value'),
     Input('map_month_dropdown', 'value'),
     Input('map_fait_dropdown', 'value'),
-    Input('map_display_dropdown', 'value'))
-def update_map_graph(year, month,fait,display):
+    Input('map_display_dropdown', 'value'),
+    State('map-traces', 'data'),
+    # La figure initiale est déjà dans le layout (figures par défaut)
+    prevent_initial_call=True)
+def update_map_graph(year, month,fait,display, traces=True):
+    donnees = attendre_donnees()
+    valeurs = get_figure(donnees.version, ('map', year, month, fait, display),
+                         lambda: Carte.get_map_valeurs(donnees.dataset, year, month,fait,display))
+    if not traces or len(valeurs['locations']) == 0:
+        # Carte initiale sans trace à modifier, ou aucune donnée pour ces filtres: figures complètes
+        return get_figure(donnees.version, ('map_complete', year, month, fait, display),
+                          lambda: Carte.get_map_graph(donnees.dataset, year, month, fait, display))
+    return patch_carte('map_france', valeurs), patch_carte('map_idf', valeurs)
+
+
+def patch_carte(graph_id, valeurs):
+    """
+    Retourne la mise à jour partielle d'une carte: la géométrie (GeoJSON), envoyée avec la figure initiale
+    du layout, n'est pas renvoyée, seules les valeurs, la légende et le titre sont remplacés.
+
+    Parameters
+    ----------
+    graph_id : str
+        L'id du dcc.Graph de la carte ('map_france' ou 'map_idf').
+    valeurs : dict
+        Les parties de la carte qui dépendent des paramètres (voir Carte.get_map_valeurs).
+
+    Returns
+    -------
+    dash.Patch
+        La mise à jour de la propriété figure.
+    """
+    patch = dash.Patch()
+    patch['data'][0]['locations'] = valeurs['locations']
+    patch['data'][0]['z'] = valeurs['z']
+    patch['data'][0]['hovertemplate'] = valeurs['hovertemplate']
+    patch['layout']['coloraxis']['colorbar']['title']['text'] = valeurs['legende']
+    patch['layout']['title']['text'] = Carte.TITRES[graph_id]
+    return patch
 
 
-    return Carte.get_map_graph(data, year, month,fait,display)
-
-
-@app.callback(
-    Output('most_common_crimes', 'figure'),
-    Input('mcc-month-dropdown', 'value'),
-    Input('mcc-year-dropdown', 'value'),
-    Input('mcc-departement-dropdown', 'value'),
-    Input('mcc-tri-dropdown', 'value'),
-    Input('mcc-limit-dropdown', 'value'))
 def update_most_common_crimes_pie_graph(month, year, departement, tri, limit):
-    return CamembertFaits.get_common_crimes_pie_graph(data, year, month, departement, ascending= (tri == 'Ascendant'),limit=limit)
+    donnees = attendre_donnees()
+    ascending = (tri == 'Ascendant')
+    return get_figure(donnees.version, ('most_common_crimes', year, month, departement, ascending, limit),
+                      lambda: CamembertFaits.get_common_crimes_pie_graph(donnees.dataset, year, month, departement, ascending=ascending,limit=limit))
 
 
 
-@app.callback(
-    Output('histogramme_par_mois', 'figure'),
-    Input('hpm-year-dropdown', 'value'),
-    Input('hpm-departement-dropdown', 'value'),
-    Input('hpm-fait-dropdown', 'value'))
 def update_histogramme_par_mois_graph(year, departements, fait):
+    donnees = attendre_donnees()
     if(departements == [] or departements == ['Tout'] or departements == 'Tout'):
         departements = 'Tout'
     elif(type(departements) == str):
         departements = [departements]
-    return HistogrammeParMois.get_histogramme_graph(data, year, departements, fait)
+    else:
+        # L'ordre de sélection n'a pas d'influence sur la figure: '93' et ['93'] partagent la même entrée
+        departements = sorted(set(departements))
+    cle_departements = departements if departements == 'Tout' else tuple(departements)
+    return get_figure(donnees.version, ('histogramme_par_mois', year, cle_departements, fait),
+                      lambda: HistogrammeParMois.get_histogramme_graph(donnees.dataset, year, departements, fait))
+
+
+def update_delits_crimes_par_annees_graph(faits, departements):
+    donnees = attendre_donnees()
+    # L'ordre de sélection donne l'ordre des courbes (et leurs couleurs): il fait partie de la clé
+    faits = tuple(dict.fromkeys([faits] if isinstance(faits, str) else faits or ['Tout']))
+    departements = tuple(dict.fromkeys([departements] if isinstance(departements, str) else departements or ['Tout']))
+    return get_figure(donnees.version, ('delits_crimes_par_annees', faits, departements),
+                      lambda: DelitsCrimesParAnnees.get_delits_crimes_annees_graph(donnees.dataset, faits, departements))
+
+
+# Callbacks calculables à partir du cube: nom de la fonction de assets/clientside.js, callback serveur,
+# sorties et entrées. En mode clientside ils sont exécutés dans le navigateur, sans requête au serveur.
+CALLBACKS_CUBE = {
+    'camembert': (update_most_common_crimes_pie_graph, [
+        Output('most_common_crimes', 'figure'),
+        Input('mcc-month-dropdown', 'value'),
+        Input('mcc-year-dropdown', 'value'),
+        Input('mcc-departement-dropdown', 'value'),
+        Input('mcc-tri-dropdown', 'value'),
+        Input('mcc-limit-dropdown', 'value')]),
+    'histogramme': (update_histogramme_par_mois_graph, [
+        Output('histogramme_par_mois', 'figure'),
+        Input('hpm-year-dropdown', 'value'),
+        Input('hpm-departement-dropdown', 'value'),
+        Input('hpm-fait-dropdown', 'value')]),
+    'annees': (update_delits_crimes_par_annees_graph, [
+        Output('delits_crimes_par_annees', 'figure'),
+        Input('dcpa-fait-dropdown', 'value'),
+        Input('dcpa-departement-dropdown', 'value')]),
+}
+
+for nom, (callback, dependances) in CALLBACKS_CUBE.items():
+    # La figure initiale est déjà dans le layout (figures par défaut)
+    if Clientside.ACTIF:
+        dash.clientside_callback(ClientsideFunction('cube', nom), *dependances, State('cube-meta', 'data'),
+                                 prevent_initial_call=True)
+    else:
+        dash.callback(*dependances, prevent_initial_call=True)(callback)
+
+if Clientside.ACTIF:
+    dash.clientside_callback(ClientsideFunction('cube', 'precharger'),
+                             Output('cube-etat', 'children'),
+                             Input('cube-meta', 'data'))
+
 
 
-@app.callback(
-    Output('delits_crimes_par_annees', 'figure'),
-    Input('dcpa-fait-dropdown', 'value'),
-    Input('dcpa-departement-dropdown', 'value'))
-def update_delits_crimes_par_annees_graph(fait, departement):
-    return DelitsCrimesParAnnees.get_delits_crimes_annees_graph(data, fait, departement)
+def main():
+    """
+    Fonction principale pour exécuter le tableau de bord avec le serveur de développement.
+    """
+    debug and print("Lancement du main")
+    installer_signal()
+    demarrer_chargement()
+    app.run(debug=False, host='0.0.0.0', port=8050)
 
 
+app = create_app()
+server = app.server
 
-main()
-server = app.server
\ No newline at end of file
+if __name__ == '__main__':
+    main()
\ No newline at end of file
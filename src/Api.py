@@ -0,0 +1,270 @@
+"""
+Module Api.py
+----------
+API HTTP en lecture seule des agrégats du dashboard, pour les traitements qui ont besoin des nombres sans les figures.
+Les agrégats sont calculés par Dataset.agreger, comme ceux des graphiques.
+
+- GET /api/aggregate?group_by=annee&fait=...&departement=...&annee=...&mois=...
+    Les axes conservés (group_by) et les filtres peuvent être répétés ou absents (aucun axe conservé: le total;
+    filtre absent ou "Tout": pas de filtre). La réponse est en JSON, ou au format Arrow (flux IPC) avec
+    format=arrow ou l'en-tête Accept: application/vnd.apache.arrow.stream (pyarrow nécessaire).
+
+- POST /api/aggregate/batch
+    Corps JSON {"queries": [{"group_by": [...], "fait": ..., ...}, ...]}: répond à plusieurs requêtes
+    (au plus BATCH_MAX) en une seule fois, en JSON.
+
+Les réponses portent un ETag dépendant de la version des données et de la requête (If-None-Match: 304).
+Les requêtes contenant v=<version des données> sont mises en cache définitivement par les navigateurs et les
+proxys, les autres pendant CACHE_MAX_AGE secondes. Les résultats sont aussi gardés dans un cache LRU en mémoire.
+
+Exemple de réponse JSON:
+    {"version": "...", "group_by": ["annee"], "filtres": {"departement": ["93"], "fait": "Tout", ...},
+     "data": {"annee": ["2020", "2021"], "nombre": [1234, 1302]}}
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- installer(server, get_donnees)
+    Ajoute les routes de l'API au serveur Flask.
+
+- agreger(dataset, requete) -> dict
+    Calcule l'agrégat d'une requête (axes conservés et filtres) sous forme de colonnes.
+"""
+
+import hashlib
+import json
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+import src.Cache as Cache
+import src.Dataset as Dataset
+import src.Metriques as Metriques
+
+FILTRES = ('departement', 'fait', 'annee', 'mois')
+"""
+    Filtres acceptés par l'API (axes du Dataset)
+"""
+
+BATCH_MAX = 1000
+"""
+    Nombre maximal de requêtes dans un appel à /api/aggregate/batch
+"""
+
+CACHE_MAX_AGE = 60
+"""
+    Durée de mise en cache HTTP des réponses sans version des données, en secondes
+"""
+
+TYPE_ARROW = 'application/vnd.apache.arrow.stream'
+"""
+    Type de contenu des réponses au format Arrow
+"""
+
+_cache = Cache.FigureCache(max_bytes=32 * 1024 * 1024)
+"""
+    Réponses déjà calculées, indexées par (version, format, requête normalisée)
+"""
+
+
+class RequeteInvalide(ValueError):
+    """
+    Requête de l'API invalide (axe ou valeur de filtre inconnus): réponse 400.
+    """
+
+
+def installer(server, get_donnees):
+    """
+    Ajoute les routes /api/aggregate et /api/aggregate/batch au serveur Flask.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Le serveur du dashboard.
+    get_donnees : callable
+        Fonction sans argument retournant les données chargées et leur version (dataset, version),
+        None tant qu'elles ne sont pas chargées. Elle est appelée une seule fois par requête.
+    """
+    import flask
+
+    def repondre(contenu, mimetype, version, cle):
+        etag = f'{version}-{hashlib.blake2b(repr(cle).encode(), digest_size=8).hexdigest()}'
+        if flask.request.if_none_match.contains(etag):
+            reponse = flask.Response(status=304)
+        else:
+            reponse = flask.Response(contenu, mimetype=mimetype)
+        reponse.set_etag(etag)
+        if flask.request.args.get('v') == version:
+            # L'url contient la version des données: la réponse ne change jamais pour une url donnée
+            reponse.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            reponse.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+        return reponse
+
+    def erreur(message, status):
+        return flask.jsonify({'error': message}), status
+
+    @server.route('/api/aggregate')
+    def api_aggregate():
+        donnees = get_donnees()
+        if donnees is None:
+            return erreur('Données en cours de chargement', 503)
+        dataset, version = donnees
+        arrow = (flask.request.args.get('format') == 'arrow'
+                 or flask.request.accept_mimetypes.best == TYPE_ARROW)
+        if arrow and pa is None:
+            return erreur("Le format Arrow nécessite le module pyarrow", 406)
+
+        try:
+            requete = _normaliser({cle: flask.request.args.getlist(cle) for cle in ('group_by',) + FILTRES}, dataset)
+        except RequeteInvalide as e:
+            return erreur(str(e), 400)
+
+        cle = (version, 'arrow' if arrow else 'json', requete)
+        with Metriques.mesurer_api('api_aggregate') as mesure:
+            contenu, mesure['hit'] = _cache.get_or_build_bytes(
+                cle, lambda: _arrow(agreger(dataset, requete)) if arrow else _json(version, requete, dataset))
+            mesure['taille'] = len(contenu)
+        return repondre(contenu, TYPE_ARROW if arrow else 'application/json', version, cle[1:])
+
+    @server.route('/api/aggregate/batch', methods=['POST'])
+    def api_aggregate_batch():
+        donnees = get_donnees()
+        if donnees is None:
+            return erreur('Données en cours de chargement', 503)
+        dataset, version = donnees
+        corps = flask.request.get_json(silent=True)
+        requetes = corps.get('queries') if isinstance(corps, dict) else None
+        if not isinstance(requetes, list) or not all(isinstance(requete, dict) for requete in requetes):
+            return erreur('Le corps doit être un objet JSON {"queries": [{...}, ...]}', 400)
+        if len(requetes) > BATCH_MAX:
+            return erreur(f'Au plus {BATCH_MAX} requêtes par appel', 400)
+
+        try:
+            requetes = tuple(_normaliser(requete, dataset) for requete in requetes)
+        except RequeteInvalide as e:
+            return erreur(str(e), 400)
+
+        resultats = []
+        with Metriques.mesurer_api('api_aggregate_batch') as mesure:
+            for requete in requetes:
+                contenu, _ = _cache.get_or_build_bytes((version, 'json', requete),
+                                                     lambda: _json(version, requete, dataset))
+                resultats.append(contenu)
+            contenu = b'{"version":' + json.dumps(version).encode() + b',"results":[' + b','.join(resultats) + b']}'
+            mesure['taille'] = len(contenu)
+        return repondre(contenu, 'application/json', version, ('batch', requetes))
+
+
+def agreger(dataset, requete):
+    """
+    Calcule l'agrégat d'une requête normalisée avec Dataset.agreger.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    requete : tuple
+        Les axes conservés puis les filtres ("Tout" ou tuple de valeurs), voir _normaliser().
+
+    Returns
+    -------
+    dict
+        Une liste par axe conservé (numéros des départements, libellés des faits, années et mois tels
+        qu'ils apparaissent dans les listes du dashboard) et la liste des nombres, sous la clé 'nombre'.
+    """
+    par, filtres = requete[0], dict(zip(FILTRES, requete[1:]))
+    filtres = {axe: valeur if valeur == 'Tout' else list(valeur) for axe, valeur in filtres.items()}
+    if not par:
+        # Total: on conserve un axe puis on somme
+        nombres = dataset.agreger(['annee'], **filtres)
+        return {'nombre': [int(nombres.sum())] if len(nombres) else []}
+
+    nombres = dataset.agreger(list(par), **filtres)
+    colonnes = {}
+    for axe in (axe for axe in Dataset.AXES if axe in par):
+        codes = nombres.index.get_level_values(axe).to_numpy()
+        if axe == 'departement':
+            valeurs = dataset.num_departement(codes)
+        elif axe == 'fait':
+            valeurs = dataset.libelle_fait(codes)
+        elif axe == 'annee':
+            valeurs = dataset.libelle_annee(codes)
+        else:
+            valeurs = dataset.libelle_mois(codes)
+        colonnes[axe] = valeurs.tolist()
+    colonnes['nombre'] = nombres.to_numpy().tolist()
+    return colonnes
+
+
+def _normaliser(requete, dataset):
+    """
+    Normalise une requête (paramètres de l'url ou objet JSON du batch) en un tuple utilisable comme clé:
+    les axes conservés (tuple trié dans l'ordre de Dataset.AXES), puis chaque filtre ("Tout" ou tuple trié).
+
+    Raises
+    ------
+    RequeteInvalide
+        Si un axe, un filtre ou une valeur de filtre est inconnu.
+    """
+    inconnus = set(requete) - {'group_by'} - set(FILTRES)
+    if inconnus:
+        raise RequeteInvalide(f'Paramètres inconnus: {", ".join(sorted(inconnus))}')
+
+    par = _liste(requete.get('group_by'))
+    if any(axe not in Dataset.AXES for axe in par):
+        raise RequeteInvalide(f'group_by doit être choisi parmi: {", ".join(Dataset.AXES)}')
+    par = tuple(axe for axe in Dataset.AXES if axe in par)
+
+    connues = {
+        'departement': set(dataset.liste_departements()) | set(dataset.liste_regions()),
+        'fait': set(dataset.liste_faits()),
+        'annee': set(dataset.liste_annees()),
+        'mois': set(dataset.liste_mois()),
+    }
+    filtres = []
+    for axe in FILTRES:
+        valeurs = _liste(requete.get(axe))
+        if not valeurs or 'Tout' in valeurs:
+            filtres.append('Tout')
+            continue
+        inconnues = [valeur for valeur in valeurs if valeur not in connues[axe]]
+        if inconnues:
+            raise RequeteInvalide(f'Valeurs inconnues pour {axe}: {", ".join(inconnues)}')
+        filtres.append(tuple(sorted(set(valeurs))))
+    return (par,) + tuple(filtres)
+
+
+def _liste(valeur):
+    """
+    Retourne les valeurs d'un paramètre sous forme de liste de textes (absent: liste vide).
+    """
+    if valeur is None:
+        return []
+    valeurs = valeur if isinstance(valeur, list) else [valeur]
+    return [str(v) for v in valeurs]
+
+
+def _json(version, requete, dataset):
+    """
+    Retourne la réponse JSON d'une requête normalisée.
+    """
+    filtres = {axe: valeur if valeur == 'Tout' else list(valeur) for axe, valeur in zip(FILTRES, requete[1:])}
+    return json.dumps({'version': version, 'group_by': list(requete[0]), 'filtres': filtres,
+                       'data': agreger(dataset, requete)}, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def _arrow(colonnes):
+    """
+    Retourne les colonnes d'un agrégat au format Arrow (flux IPC).
+    """
+    table = pa.table(colonnes)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,142 @@
+"""
+Module Cache.py
+----------
+Gère le cache des figures renvoyées par les callbacks du dashboard.
+
+Auteur
+---------
+Léon E.
+
+Classes
+---------
+- FigureCache
+    Cache LRU des figures sérialisées en JSON, borné en nombre d'octets.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from plotly.io.json import to_json_plotly
+
+
+class FigureCache:
+    """
+    Cache LRU des figures sérialisées en JSON, borné en nombre d'octets.
+
+    Les figures (ou tuples de figures) sont stockées sous forme de JSON encodé en UTF-8: la taille occupée
+    est connue exactement et les valeurs retournées sont de nouveaux objets, qui peuvent être modifiés
+    sans risque pour le cache.
+
+    Champs
+    -------
+    max_bytes : int
+        Taille maximale du cache (somme des tailles des JSON stockés).
+    hits : int
+        Nombre de figures servies depuis le cache.
+    misses : int
+        Nombre de figures construites faute d'être dans le cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """
+        Retourne la figure associée à la clé, en la construisant avec build() si elle n'est pas en cache.
+
+        Parameters
+        ----------
+        key : tuple
+            La clé, construite à partir des entrées normalisées du callback.
+        build : callable
+            Fonction sans argument construisant la figure (ou un tuple de figures).
+
+        Returns
+        -------
+        dict or list
+            La figure sous forme de dictionnaire (une liste pour un tuple de figures).
+        """
+        return json.loads(self.get_or_build_json(key, build)[0])
+
+    def get_or_build_json(self, key, build):
+        """
+        Comme get_or_build(), mais retourne la figure sérialisée sans la décoder.
+
+        Returns
+        -------
+        tuple
+            (JSON encodé en UTF-8, True si la figure venait du cache)
+        """
+        return self.get_or_build_bytes(key, lambda: to_json_plotly(build()).encode())
+
+    def get_or_build_bytes(self, key, build):
+        """
+        Comme get_or_build_json(), pour une valeur déjà sérialisée: build() retourne directement des octets.
+
+        Returns
+        -------
+        tuple
+            (octets, True si la valeur venait du cache)
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        cached = build()
+        self.put(key, cached)
+        return cached, False
+
+    def get(self, key):
+        """
+        Retourne le JSON associé à la clé (None s'il n'est pas en cache) et met à jour les compteurs.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Ajoute un JSON au cache, en évinçant les entrées les moins récemment utilisées si nécessaire.
+        Une valeur plus grande que le cache entier n'est pas conservée.
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        """
+        Vide le cache (les compteurs sont conservés).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Retourne les statistiques du cache.
+
+        Returns
+        -------
+        dict
+            hits, misses, entries (nombre de figures) et bytes (taille occupée).
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self._size}
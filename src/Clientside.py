@@ -0,0 +1,150 @@
+"""
+Module Clientside.py
+----------
+Gère le mode clientside du dashboard (variable d'environnement DASHBOARD_CLIENTSIDE=1): le cube des données
+(département × fait × année × mois) est envoyé une seule fois au navigateur, et les figures du camembert,
+de l'histogramme et de l'évolution par années sont recalculées dans le navigateur (assets/clientside.js),
+sans aucune requête au serveur.
+
+Le cube est envoyé en binaire compressé (gzip) sur /cube.bin: des entiers 16 bits (32 bits si nécessaire)
+petit-boutistes dans l'ordre C, -1 marquant les combinaisons absentes des données sources. Il est suivi des
+tables pré-agrégées du Dataset (régions puis France métropolitaine, voir TABLES), que le navigateur utilise
+pour "Tout" et les régions entières comme Dataset.agreger: les deux modes donnent les mêmes nombres.
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- metadonnees(dataset, version) -> dict
+    Retourne la description du cube (axes, libellés, type) utilisée par le navigateur.
+
+- installer(server, get_donnees)
+    Ajoute la route /cube.bin au serveur Flask.
+"""
+
+import gzip
+import os
+import threading
+
+import numpy as np
+import plotly.io as pio
+
+ACTIF = os.environ.get('DASHBOARD_CLIENTSIDE') == '1'
+"""
+    True si le mode clientside est activé
+"""
+
+TABLES = (('regions', 'cube_regions', 'presence_regions'), ('national', 'cube_national', 'presence_national'))
+"""
+    Tables pré-agrégées envoyées après le cube: (nom dans les métadonnées, cube, présence)
+"""
+
+_cube = (None, None)
+"""
+    Version des données et cube compressé correspondant, calculé une seule fois par processus
+"""
+
+_verrou = threading.Lock()
+
+
+def metadonnees(dataset, version):
+    """
+    Retourne la description du cube utilisée par les callbacks du navigateur.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    version : str
+        La version des données, ajoutée à l'url du cube pour que le navigateur puisse le garder en cache.
+
+    Returns
+    -------
+    dict
+        url, shape, dtype, libellés des départements, des faits, des années et des mois (par position sur
+        chaque axe), départements de chaque région, région de chaque département (-1 hors région), position
+        (en nombre de valeurs) et forme de chaque table pré-agrégée dans le binaire, et le modèle (template)
+        plotly des figures. La table nationale a un axe des départements de taille 1.
+    """
+    tables, decalage = {}, int(np.prod(dataset.shape))
+    for nom, attribut, _ in TABLES:
+        forme = getattr(dataset, attribut).shape
+        forme = forme if len(forme) == len(dataset.shape) else (1,) + forme
+        tables[nom] = {'offset': decalage, 'shape': list(forme)}
+        decalage += int(np.prod(forme))
+    annees = {int(libelle): libelle for libelle in dataset.liste_annees()}
+    mois = {int(libelle): libelle for libelle in dataset.liste_mois()}
+    return {
+        'url': f'cube.bin?v={version}',
+        'shape': list(dataset.shape),
+        'dtype': _type(dataset),
+        'annee_min': dataset.annee_min,
+        'departements': dataset.liste_departements().tolist(),
+        'regions': {nom: dataset.num_departement(dataset.departements_region(nom)).tolist()
+                    for nom in dataset.liste_regions()},
+        'region_departement': dataset.region_departement(np.arange(dataset.shape[0])).tolist(),
+        'tables': tables,
+        'faits': dataset.liste_faits().tolist(),
+        'annees': [annees.get(dataset.annee_min + position) for position in range(dataset.shape[2])],
+        'mois': [mois.get(position + 1) for position in range(dataset.shape[3])],
+        'template': pio.templates[pio.templates.default].to_plotly_json(),
+    }
+
+
+def installer(server, get_donnees):
+    """
+    Ajoute la route /cube.bin au serveur Flask.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Le serveur du dashboard.
+    get_donnees : callable
+        Fonction sans argument retournant les données chargées et leur version (dataset, version),
+        None tant qu'elles ne sont pas chargées.
+    """
+    import flask
+
+    @server.route('/cube.bin')
+    def cube():
+        donnees = get_donnees()
+        if donnees is None:
+            return 'Données en cours de chargement', 503
+        dataset, version = donnees
+        if flask.request.args.get('v', version) != version:
+            # Page construite avec des données qui ont été rechargées depuis: le cube ne lui correspond plus
+            return 'Version des données obsolète, la page doit être rechargée', 409
+        reponse = flask.Response(_cube_compresse(dataset, version), mimetype='application/octet-stream')
+        reponse.headers['Content-Encoding'] = 'gzip'
+        reponse.headers['ETag'] = f'"{version}"'
+        # L'url contient la version des données: le contenu ne change jamais pour une url donnée
+        reponse.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return reponse
+
+
+def _type(dataset):
+    """
+    Retourne le type des valeurs envoyées: int16 si toutes les valeurs (tables pré-agrégées comprises)
+    y tiennent, int32 sinon.
+    """
+    cube = dataset.cube if dataset.cube is not None else dataset._build_cube()[0]
+    maximum = max(int(tableau.max(initial=0)) for tableau in [cube] + [getattr(dataset, t[1]) for t in TABLES])
+    return 'int16' if maximum <= np.iinfo(np.int16).max else 'int32'
+
+
+def _cube_compresse(dataset, version):
+    """
+    Retourne le cube suivi des tables pré-agrégées, compressé, calculé une seule fois par version des données.
+    """
+    global _cube
+    with _verrou:
+        if _cube[0] != version:
+            cube, presence = (dataset.cube, dataset.presence) if dataset.cube is not None else dataset._build_cube()
+            tableaux = [(cube, presence)] + [(getattr(dataset, t[1]), getattr(dataset, t[2])) for t in TABLES]
+            type_valeurs = '<i2' if _type(dataset) == 'int16' else '<i4'
+            valeurs = b''.join(np.where(presents, nombres, -1).astype(type_valeurs).tobytes()
+                               for nombres, presents in tableaux)
+            _cube = (version, gzip.compress(valeurs, compresslevel=6))
+        return _cube[1]
@@ -0,0 +1,119 @@
+"""
+Module Compression.py
+----------
+Compresse les réponses du serveur Flask du dashboard (layout, réponses des callbacks, scripts) en gzip ou en brotli,
+selon l'en-tête Accept-Encoding du navigateur. Les réponses plus petites que DASHBOARD_COMPRESSION_MIN_SIZE octets
+(1000 par défaut) ne sont pas compressées, et DASHBOARD_COMPRESSION=0 désactive la compression (par exemple
+derrière un proxy qui compresse déjà).
+
+Les réponses compressées sont gardées dans un cache LRU indexé par l'empreinte de leur contenu: une figure servie
+depuis figure_cache produit toujours la même réponse, qui n'est donc compressée qu'une seule fois par processus.
+
+Brotli n'est proposé que si le module brotli est installé.
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- installer(server, cache=None)
+    Installe la compression des réponses sur le serveur Flask.
+
+- compresser(contenu, encodage, cache=None) -> bytes
+    Compresse un contenu en gzip ou en brotli, depuis le cache s'il y est déjà.
+"""
+
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import src.Cache as Cache
+
+ENCODAGES = ('br', 'gzip') if brotli is not None else ('gzip',)
+"""
+    Encodages proposés, par ordre de préférence à qualité égale dans Accept-Encoding
+"""
+
+TYPES_COMPRESSIBLES = ('text/', 'application/json', 'application/javascript', 'application/x-javascript',
+                       'image/svg+xml')
+"""
+    Types de contenu compressés (les autres, comme les images ou le cube binaire, le sont déjà ou n'y gagnent rien)
+"""
+
+NIVEAUX = {'gzip': 6, 'br': 5}
+"""
+    Niveaux de compression: un bon compromis entre taille et temps pour des réponses construites à la demande
+"""
+
+
+def installer(server, cache=None):
+    """
+    Installe la compression des réponses sur le serveur Flask (sauf avec DASHBOARD_COMPRESSION=0).
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Le serveur du dashboard (app.server).
+    cache : Cache.FigureCache, optional
+        Le cache des réponses compressées (par défaut 32 Mo).
+    """
+    if os.environ.get('DASHBOARD_COMPRESSION') == '0':
+        return
+    import flask
+
+    taille_minimale = int(os.environ.get('DASHBOARD_COMPRESSION_MIN_SIZE', '1000'))
+    cache = cache if cache is not None else Cache.FigureCache(max_bytes=32 * 1024 * 1024)
+
+    @server.after_request
+    def _compresser(response):
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(TYPES_COMPRESSIBLES)):
+            return response
+        encodage = flask.request.accept_encodings.best_match(ENCODAGES)
+        if encodage is None:
+            return response
+        contenu = response.get_data()
+        if len(contenu) < taille_minimale:
+            return response
+
+        response.set_data(compresser(contenu, encodage, cache))
+        response.headers['Content-Encoding'] = encodage
+        return response
+
+
+def compresser(contenu, encodage, cache=None):
+    """
+    Compresse un contenu, depuis le cache s'il a déjà été compressé avec le même encodage.
+
+    Parameters
+    ----------
+    contenu : bytes
+        Le contenu à compresser.
+    encodage : str
+        'gzip' ou 'br'.
+    cache : Cache.FigureCache, optional
+        Le cache des contenus compressés, indexé par (empreinte du contenu, encodage).
+
+    Returns
+    -------
+    bytes
+        Le contenu compressé.
+    """
+    cle = (hashlib.blake2b(contenu, digest_size=16).digest(), encodage)
+    compresse = cache.get(cle) if cache is not None else None
+    if compresse is None:
+        if encodage == 'br':
+            compresse = brotli.compress(contenu, quality=NIVEAUX['br'])
+        else:
+            # mtime fixe: le même contenu donne toujours les mêmes octets compressés
+            compresse = gzip.compress(contenu, compresslevel=NIVEAUX['gzip'], mtime=0)
+        if cache is not None:
+            cache.put(cle, compresse)
+    return compresse
@@ -0,0 +1,658 @@
+"""
+Module Dataset.py
+----------
+Gère le modèle en mémoire des données du dashboard: une table de mesures ne contenant que des
+codes entiers, de petites tables de dimensions (départements et faits), et un cube dense
+(département × fait × année × mois) pré-agrégé au chargement qui répond aux requêtes des graphiques.
+Les requêtes peuvent aussi être calculées par un autre moteur (voir Requetes): la table de mesures en mémoire
+ou une base DuckDB.
+
+Des agrégats sont aussi pré-calculés par région (région × fait × année × mois) et pour la France métropolitaine
+(fait × année × mois, à partir des totaux nationaux des fichiers sources quand ils sont fournis): les requêtes
+sur tous les départements ou sur des régions entières y sont lues directement, quel que soit le moteur.
+
+Les tableaux du modèle peuvent être sauvegardés dans un dossier (save) puis projetés en mémoire en lecture
+seule (load): tous les processus qui chargent le même dossier partagent alors les mêmes pages mémoire.
+
+Auteur
+---------
+Léon E.
+
+Classes
+---------
+- Dataset
+    Modèle en étoile des données (table de mesures + dimensions)
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import src.Metriques as Metriques
+import src.Requetes as Requetes
+
+AXES = ('departement', 'fait', 'annee', 'mois')
+"""
+    Axes du cube, dans l'ordre
+"""
+
+INDEX = ('fait', 'departement', 'annee', 'mois')
+"""
+    Ordre de tri de la table de mesures (index multi-niveaux)
+"""
+
+COLONNES_MESURES = ('departement', 'fait', 'annee', 'mois', 'nombre')
+"""
+    Colonnes de la table de mesures
+"""
+
+REGIONS = {
+    'Auvergne-Rhône-Alpes': ('01', '03', '07', '15', '26', '38', '42', '43', '63', '69', '73', '74'),
+    'Bourgogne-Franche-Comté': ('21', '25', '39', '58', '70', '71', '89', '90'),
+    'Bretagne': ('22', '29', '35', '56'),
+    'Centre-Val de Loire': ('18', '28', '36', '37', '41', '45'),
+    'Corse': ('2A', '2B'),
+    'Grand Est': ('08', '10', '51', '52', '54', '55', '57', '67', '68', '88'),
+    'Hauts-de-France': ('02', '59', '60', '62', '80'),
+    'Île-de-France': ('75', '77', '78', '91', '92', '93', '94', '95'),
+    'Normandie': ('14', '27', '50', '61', '76'),
+    'Nouvelle-Aquitaine': ('16', '17', '19', '23', '24', '33', '40', '47', '64', '79', '86', '87'),
+    'Occitanie': ('09', '11', '12', '30', '31', '32', '34', '46', '48', '65', '66', '81', '82'),
+    'Pays de la Loire': ('44', '49', '53', '72', '85'),
+    "Provence-Alpes-Côte d'Azur": ('04', '05', '06', '13', '83', '84'),
+}
+"""
+    Numéros des départements de chaque région métropolitaine
+"""
+
+ROLLUPS = ('cube_regions', 'presence_regions', 'cube_national', 'presence_national')
+"""
+    Tables pré-agrégées sauvegardées avec le modèle
+"""
+
+FORMAT = '2'
+"""
+    Version du format des dossiers écrits par save(), à incrémenter à chaque changement de leur contenu
+"""
+
+
+class Dataset:
+    """
+    Modèle en étoile des données du dashboard.
+
+    Les filtres des graphiques se font sur les codes entiers de la table de mesures,
+    les libellés ne sont retrouvés dans les dimensions qu'une fois les données agrégées.
+
+    Champs
+    -------
+    mesures : pandas.DataFrame
+        Table de mesures: departement (int16, code), fait (int16, code), annee (int16),
+        mois (int8) et nombre (int32), triée selon INDEX (voir selectionner()).
+    departements : pandas.DataFrame
+        Dimension des départements, indexée par code: num_departement, nom_departement, population.
+    faits : pandas.DataFrame
+        Dimension des faits, indexée par code: fait (libellé).
+    cube : numpy.ndarray
+        Nombre de délits et crimes par (code département, code fait, année - annee_min, mois - 1),
+        None si le modèle a été construit sans cube.
+    presence : numpy.ndarray
+        Même forme que cube, True si la combinaison existe dans les données sources.
+    regions : pandas.DataFrame
+        Dimension des régions ayant au moins un département dans les données, indexée par code: region (nom).
+    cube_regions, presence_regions : numpy.ndarray
+        Nombres (int64) et combinaisons présentes par (code région, code fait, année - annee_min, mois - 1).
+    cube_national, presence_national : numpy.ndarray
+        Nombres (int64) et combinaisons présentes de la France métropolitaine par (code fait,
+        année - annee_min, mois - 1).
+    shape : tuple
+        Nombre de positions sur chacun des axes de AXES.
+    annee_min : int
+        Première année des données.
+    version : str
+        Version des données chargées par load() (voir get_data.get_data_version()), None pour un modèle
+        construit en mémoire.
+    moteur : Requetes.MoteurCube, Requetes.MoteurPandas ou Requetes.MoteurDuckDB
+        Moteur de requêtes de agreger() (voir utiliser()).
+    """
+
+    def __init__(self, mesures, departements, faits, libelles_annees, libelles_mois, cube=True, moteur=None,
+                 national=None):
+        self._set_dimensions(departements, faits, libelles_annees, libelles_mois)
+        self.annee_min = int(mesures['annee'].min())
+        self.shape = (len(departements), len(faits), int(mesures['annee'].max()) - self.annee_min + 1,
+                      int(mesures['mois'].max()))
+        self.mesures, self._cles = self._build_index(mesures)
+        self.cube, self.presence = self._build_cube() if cube else (None, None)
+        self._build_rollups(national)
+        self.version = None
+        self.utiliser(moteur or ('cube' if cube else 'pandas'))
+
+    def _set_dimensions(self, departements, faits, libelles_annees, libelles_mois):
+        """
+        Initialise les dimensions et les tables de correspondance des libellés vers les codes.
+        """
+        self.departements = departements
+        self.faits = faits
+        self._libelles_annees = libelles_annees
+        self._libelles_mois = libelles_mois
+        self._codes_departements = {num: code for code, num in enumerate(departements['num_departement'])}
+        self._codes_faits = {libelle: code for code, libelle in enumerate(faits['fait'])}
+
+        # Régions ayant au moins un département dans les données, et code région de chaque département
+        self._departements_regions = {}
+        for nom, nums in REGIONS.items():
+            codes = [self._codes_departements[num] for num in nums if num in self._codes_departements]
+            if codes:
+                self._departements_regions[nom] = codes
+        self.regions = pd.DataFrame({'region': list(self._departements_regions)})
+        self.regions.index.name = 'code'
+        self._region_departements = np.full(len(departements), -1, dtype=np.intp)
+        for code, codes in enumerate(self._departements_regions.values()):
+            self._region_departements[codes] = code
+        self._tailles_regions = np.array([len(codes) for codes in self._departements_regions.values()], dtype=np.intp)
+
+    def _positions(self, mesures, axes):
+        """
+        Retourne, pour chaque ligne de la table de mesures, sa position sur chacun des axes demandés.
+        """
+        decalages = {'departement': 0, 'fait': 0, 'annee': self.annee_min, 'mois': 1}
+        return tuple((mesures[axe].to_numpy() - decalages[axe]).astype(np.intp) for axe in axes)
+
+    def _build_index(self, mesures):
+        """
+        Trie la table de mesures selon INDEX et calcule la clé composite (croissante) de chaque ligne.
+
+        Returns
+        -------
+        tuple
+            (mesures triées, clés)
+        """
+        shape = tuple(self.shape[AXES.index(axe)] for axe in INDEX)
+        cles = np.ravel_multi_index(self._positions(mesures, INDEX), shape)
+        ordre = np.argsort(cles, kind='stable')
+        cles = cles[ordre].astype(np.int32 if np.prod(shape) < 2**31 else np.int64)
+        return mesures.take(ordre).reset_index(drop=True), cles
+
+    def _build_cube(self):
+        """
+        Construit le cube dense des nombres, et celui des combinaisons présentes dans les données.
+
+        Returns
+        -------
+        tuple
+            (cube, presence)
+        """
+        positions = np.ravel_multi_index(self._positions(self.mesures, AXES), self.shape)
+        taille = int(np.prod(self.shape))
+        # Les poids sont des flottants: exact tant que les sommes restent sous 2**53
+        cube = np.bincount(positions, weights=self.mesures['nombre'].to_numpy(), minlength=taille)
+        presence = np.bincount(positions, minlength=taille) > 0
+        return cube.astype(np.int32).reshape(self.shape), presence.reshape(self.shape)
+
+    def _build_rollups(self, national=None):
+        """
+        Pré-agrège les tables des régions et de la France métropolitaine à partir du cube (construit pour
+        l'occasion si le modèle n'en a pas).
+
+        Parameters
+        ----------
+        national : pandas.DataFrame, optional
+            Totaux de la France métropolitaine (fait en code, annee, mois, nombre) : la table nationale en est
+            construite. Sans eux, elle est la somme des départements.
+        """
+        cube, presence = (self.cube, self.presence) if self.cube is not None else self._build_cube()
+        forme = (len(self.regions),) + self.shape[1:]
+        self.cube_regions = np.zeros(forme, dtype=np.int64)
+        self.presence_regions = np.zeros(forme, dtype=bool)
+        for code, codes in enumerate(self._departements_regions.values()):
+            self.cube_regions[code] = cube[codes].sum(axis=0, dtype=np.int64)
+            self.presence_regions[code] = presence[codes].any(axis=0)
+
+        if national is None:
+            self.cube_national, self.presence_national = cube.sum(axis=0, dtype=np.int64), presence.any(axis=0)
+            return
+        # Les faits, années et mois absents des données des départements sont ignorés
+        positions = self._positions(national, AXES[1:])
+        valides = np.logical_and.reduce([(p >= 0) & (p < taille) for p, taille in zip(positions, self.shape[1:])])
+        index = np.ravel_multi_index(tuple(p[valides] for p in positions), self.shape[1:])
+        taille = int(np.prod(self.shape[1:]))
+        nombres = np.bincount(index, weights=national['nombre'].to_numpy()[valides], minlength=taille)
+        self.cube_national = nombres.astype(np.int64).reshape(self.shape[1:])
+        self.presence_national = (np.bincount(index, minlength=taille) > 0).reshape(self.shape[1:])
+
+    @Metriques.agregation
+    def agreger(self, par, departement='Tout', fait='Tout', annee='Tout', mois='Tout'):
+        """
+        Somme le nombre de délits et crimes sur les axes du cube qui ne sont pas conservés.
+        Le calcul est fait par le moteur de requêtes du modèle (voir Requetes): sur le cube, sur les lignes
+        retournées par selectionner() ou par une base DuckDB, avec le même résultat. Quand les départements ne
+        sont pas conservés, les requêtes sur tous les départements et sur des régions entières sont lues dans
+        les tables pré-agrégées (cube_national et cube_regions).
+
+        Les filtres prennent les valeurs des listes déroulantes du dashboard ("Tout" pour ne pas filtrer),
+        le filtre departement accepte aussi une liste de départements et des noms de régions.
+
+        Parameters
+        ----------
+        par : list of str
+            Les axes conservés, parmi AXES.
+        departement, fait, annee, mois : str or list
+            Les filtres à appliquer.
+
+        Returns
+        -------
+        pandas.Series
+            Les nombres indexés par les axes conservés (codes des départements et des faits, années et mois
+            en entiers), dans l'ordre de AXES. Comme pour un groupby, seules les combinaisons présentes
+            dans les données sont retournées.
+        """
+        selections = {axe: self._selection(axe, valeur)
+                      for axe, valeur in zip(AXES, (departement, fait, annee, mois))}
+        gardes = [axe for axe in AXES if axe in par]
+        rollup = self._agreger_rollup(gardes, selections)
+        positions, nombres = rollup if rollup is not None else self.moteur.agreger(gardes, selections)
+
+        niveaux = [self._valeurs(axe, np.asarray(p, dtype=np.intp)) for axe, p in zip(gardes, positions)]
+        if len(gardes) == 1:
+            index = pd.Index(niveaux[0], name=gardes[0])
+        else:
+            index = pd.MultiIndex.from_arrays(niveaux, names=gardes)
+        return pd.Series(nombres, index=index, name='nombre')
+
+    def _agreger_rollup(self, par, selections):
+        """
+        Calcule un agrégat à partir des tables pré-agrégées quand c'est possible: départements non conservés,
+        et tous les départements (table nationale) ou des régions entières (table des régions).
+
+        Returns
+        -------
+        tuple
+            Comme Requetes.sommer(), None si la requête doit être calculée par le moteur.
+        """
+        if 'departement' in par:
+            return None
+        autres = {axe: selections[axe] for axe in AXES[1:]}
+        departements = selections['departement']
+        if departements is None:
+            return Requetes.sommer(self.cube_national, self.presence_national, autres, par)
+
+        regions = np.unique(self._region_departements[departements])
+        if len(regions) == 0 or regions[0] < 0 or self._tailles_regions[regions].sum() != len(departements):
+            # Départements hors région, ou régions incomplètes
+            return None
+        return Requetes.sommer(self.cube_regions, self.presence_regions, {'region': regions, **autres}, par)
+
+    def utiliser(self, moteur, path=None):
+        """
+        Choisit le moteur de requêtes utilisé par agreger().
+
+        Parameters
+        ----------
+        moteur : str
+            Le nom du moteur, parmi Requetes.MOTEURS.
+        path : str, optional
+            Le dossier où le modèle est sauvegardé, pour les moteurs qui y écrivent leurs fichiers.
+
+        Raises
+        ------
+        ValueError
+            Si le moteur est inconnu ou ne peut pas être utilisé.
+        """
+        self.moteur = Requetes.creer(moteur, self, path)
+
+    @Metriques.agregation
+    def selectionner(self, departement='Tout', fait='Tout', annee='Tout', mois='Tout'):
+        """
+        Retourne les lignes de la table de mesures correspondant aux filtres.
+
+        La table étant triée selon INDEX, les filtres sont traduits en intervalles de clés recherchés par
+        dichotomie: le coût dépend du nombre de lignes retournées et non de la taille de la table.
+        Un niveau "Tout" placé avant un niveau filtré est énuméré (un intervalle par valeur).
+
+        Parameters
+        ----------
+        departement, fait, annee, mois : str or list
+            Les filtres à appliquer, avec les valeurs des listes déroulantes du dashboard.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Les lignes de la table de mesures correspondantes, dans l'ordre de INDEX.
+        """
+        filtres = {'departement': departement, 'fait': fait, 'annee': annee, 'mois': mois}
+        return self._lignes({axe: self._selection(axe, filtres[axe]) for axe in INDEX})
+
+    def _lignes(self, selections):
+        """
+        Retourne les lignes de la table de mesures correspondant aux positions retenues sur chaque axe
+        (None pour ne pas filtrer), voir selectionner().
+        """
+        selections = [selections[axe] for axe in INDEX]
+        filtres_actifs = [niveau for niveau, selection in enumerate(selections) if selection is not None]
+        if not filtres_actifs:
+            return self.mesures
+
+        # Les niveaux après le dernier filtre sont tous à "Tout": ils sont couverts par les intervalles
+        profondeur = filtres_actifs[-1] + 1
+        tailles = [self.shape[AXES.index(axe)] for axe in INDEX]
+        grilles = [np.arange(tailles[niveau]) if selections[niveau] is None else selections[niveau]
+                   for niveau in range(profondeur)]
+        if np.prod([len(grille) for grille in grilles]) > len(self.mesures) // 8:
+            # Trop d'intervalles: un masque sur toute la table est alors moins coûteux
+            masque = np.ones(len(self.mesures), dtype=bool)
+            for niveau, positions in zip(filtres_actifs, self._positions(self.mesures, [INDEX[n] for n in filtres_actifs])):
+                masque &= np.isin(positions, selections[niveau])
+            return self.mesures[masque]
+
+        pas = np.cumprod([1] + tailles[:0:-1])[::-1]
+        prefixes = np.stack(np.meshgrid(*grilles, indexing='ij'), axis=-1).reshape(-1, profondeur)
+        # Les bornes sont du même type que les clés, sinon numpy convertit toute la table à chaque recherche
+        debuts = (prefixes @ pas[:profondeur]).astype(self._cles.dtype)
+        fins = debuts + self._cles.dtype.type(pas[profondeur - 1])
+        debuts, fins = np.searchsorted(self._cles, debuts), np.searchsorted(self._cles, fins)
+
+        longueurs = fins - debuts
+        lignes = np.repeat(debuts - np.cumsum(longueurs) + longueurs, longueurs) + np.arange(longueurs.sum())
+        return self.mesures.take(lignes)
+
+    def _selection(self, axe, valeur):
+        """
+        Traduit un filtre du dashboard en positions sur un axe du cube (None pour "Tout").
+        """
+        if isinstance(valeur, str) and valeur == 'Tout':
+            return None
+        valeurs = [valeur] if isinstance(valeur, str) else valeur
+        if axe == 'departement':
+            # Une région est remplacée par ses départements
+            positions = [code for v in valeurs
+                         for code in self._departements_regions.get(v, [self.code_departement(v)])]
+        elif axe == 'fait':
+            positions = [self.code_fait(v) for v in valeurs]
+        elif axe == 'annee':
+            positions = [self.code_annee(v) - self.annee_min if self.code_annee(v) != -1 else -1 for v in valeurs]
+        else:
+            positions = [self.code_mois(v) - 1 if self.code_mois(v) != -1 else -1 for v in valeurs]
+        taille = self.shape[AXES.index(axe)]
+        return np.unique([p for p in positions if 0 <= p < taille]).astype(np.intp)
+
+    def _valeurs(self, axe, positions):
+        """
+        Traduit des positions sur un axe du cube en valeurs de la table de mesures.
+        """
+        if axe == 'annee':
+            return positions + self.annee_min
+        if axe == 'mois':
+            return positions + 1
+        return positions
+
+    @classmethod
+    def from_dataframe(cls, dataframe, cube=True, moteur=None, national=None):
+        """
+        Construit le modèle à partir du DataFrame global (une ligne par département, fait et mois).
+
+        Parameters
+        ----------
+        dataframe : pandas.DataFrame
+            Le DataFrame global retourné par get_data.get_global_dataframe().
+        cube : bool, optional
+            False pour ne pas construire le cube: les requêtes passent alors par l'index trié (par défaut True).
+        moteur : str, optional
+            Le moteur de requêtes (voir utiliser()), par défaut 'cube', ou 'pandas' sans cube.
+        national : pandas.DataFrame, optional
+            Les totaux de la France métropolitaine (colonnes fait, annee, mois et nombre, avec les mêmes valeurs
+            que dans le DataFrame global), voir get_data.get_national_dataframe(). Sans eux, la table nationale
+            est la somme des départements.
+
+        Returns
+        -------
+        Dataset
+            Le modèle en étoile correspondant.
+        """
+        num_departement = dataframe['num_departement'].astype('category')
+        fait = dataframe['fait'].astype('category')
+        annee = dataframe['annee'].astype('category')
+        mois = dataframe['mois'].astype('category')
+
+        # Les années et les mois sont convertis une seule fois, au niveau des catégories
+        annees = annee.cat.categories.astype(int).to_numpy(dtype=np.int16)
+        mois_valeurs = mois.cat.categories.astype(int).to_numpy(dtype=np.int8)
+
+        mesures = pd.DataFrame({
+            'departement': num_departement.cat.codes.to_numpy(dtype=np.int16),
+            'fait': fait.cat.codes.to_numpy(dtype=np.int16),
+            'annee': annees[annee.cat.codes.to_numpy()],
+            'mois': mois_valeurs[mois.cat.codes.to_numpy()],
+            'nombre': dataframe['nombre'].to_numpy(dtype=np.int32),
+        })
+
+        departements = dataframe.groupby(num_departement.cat.codes.rename('code'), observed=True)[
+            ['nom_departement', 'population']].first()
+        departements.insert(0, 'num_departement', num_departement.cat.categories.astype(str)[departements.index])
+        departements['nom_departement'] = departements['nom_departement'].astype(str)
+        departements['population'] = departements['population'].astype(np.int32)
+
+        faits = pd.DataFrame({'fait': fait.cat.categories.astype(str)})
+
+        if national is not None:
+            # Mêmes codes que la table de mesures (-1 pour un fait absent des départements)
+            national = pd.DataFrame({
+                'fait': fait.cat.categories.get_indexer(national['fait'].astype(str)),
+                'annee': national['annee'].astype(str).astype(int).to_numpy(),
+                'mois': national['mois'].astype(str).astype(int).to_numpy(),
+                'nombre': national['nombre'].to_numpy(dtype=np.int64),
+            })
+
+        return cls(mesures, departements, faits,
+                   dict(zip(annees.tolist(), annee.cat.categories.astype(str))),
+                   dict(zip(mois_valeurs.tolist(), mois.cat.categories.astype(str))), cube=cube, moteur=moteur,
+                   national=national)
+
+    def save(self, path, version):
+        """
+        Sauvegarde le modèle dans un dossier: un fichier .npy par tableau et les dimensions en JSON.
+        Le cube est toujours sauvegardé (il est construit s'il ne l'a pas été), avec les tables pré-agrégées.
+
+        Le dossier est d'abord écrit à côté puis renommé: un processus qui lit le dossier ne voit jamais
+        une sauvegarde incomplète. Si un autre processus a déjà sauvegardé la même version, rien n'est écrit.
+
+        Parameters
+        ----------
+        path : str
+            Le dossier de destination.
+        version : str
+            La version des données (voir get_data.get_data_version()), relue par stored_version().
+        """
+        cube, presence = (self.cube, self.presence) if self.cube is not None else self._build_cube()
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for colonne in COLONNES_MESURES:
+            np.save(os.path.join(tmp_path, f'{colonne}.npy'), self.mesures[colonne].to_numpy())
+        np.save(os.path.join(tmp_path, 'cles.npy'), self._cles)
+        np.save(os.path.join(tmp_path, 'cube.npy'), cube)
+        np.save(os.path.join(tmp_path, 'presence.npy'), presence)
+        for nom in ROLLUPS:
+            np.save(os.path.join(tmp_path, f'{nom}.npy'), getattr(self, nom))
+        with open(os.path.join(tmp_path, 'dimensions.json'), 'w', encoding='utf-8') as file:
+            json.dump({
+                'format': FORMAT,
+                'version': version,
+                'annee_min': self.annee_min,
+                'shape': list(self.shape),
+                'departements': self.departements.to_dict(orient='list'),
+                'faits': self.faits['fait'].tolist(),
+                'libelles_annees': list(self._libelles_annees.items()),
+                'libelles_mois': list(self._libelles_mois.items()),
+            }, file, ensure_ascii=False)
+
+        if Dataset.stored_version(path) == version:
+            shutil.rmtree(tmp_path)
+            return
+        ancien_path = f'{path}.{os.getpid()}.old'
+        if os.path.isdir(path):
+            os.replace(path, ancien_path)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Un autre processus vient d'écrire le dossier
+            shutil.rmtree(tmp_path)
+        # Les processus qui utilisent encore l'ancienne version gardent leurs fichiers ouverts
+        shutil.rmtree(ancien_path, ignore_errors=True)
+
+    @staticmethod
+    def stored_version(path):
+        """
+        Retourne la version des données sauvegardées dans un dossier (None s'il n'y en a pas, ou si elles
+        ont été sauvegardées dans un autre format).
+        """
+        try:
+            with open(os.path.join(path, 'dimensions.json'), encoding='utf-8') as file:
+                dimensions = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return dimensions.get('version') if dimensions.get('format') == FORMAT else None
+
+    @classmethod
+    def load(cls, path, cube=True, moteur=None):
+        """
+        Charge un modèle sauvegardé par save(). Les tableaux sont projetés en mémoire en lecture seule
+        (numpy.memmap): rien n'est copié, et les processus qui chargent le même dossier partagent les
+        mêmes pages du cache du système.
+
+        Parameters
+        ----------
+        path : str
+            Le dossier écrit par save().
+        cube : bool, optional
+            False pour ne pas utiliser le cube (les requêtes utilisent alors l'index trié).
+        moteur : str, optional
+            Le moteur de requêtes (voir utiliser()), par défaut 'cube', ou 'pandas' sans cube. La base du
+            moteur 'duckdb' est écrite dans le dossier si elle n'y est pas encore pour cette version.
+
+        Returns
+        -------
+        Dataset
+            Le modèle en étoile, en lecture seule.
+        """
+        with open(os.path.join(path, 'dimensions.json'), encoding='utf-8') as file:
+            dimensions = json.load(file)
+
+        def projeter(nom):
+            return np.load(os.path.join(path, f'{nom}.npy'), mmap_mode='r')
+
+        dataset = cls.__new__(cls)
+        departements = pd.DataFrame(dimensions['departements'])
+        departements.index.name = 'code'
+        departements['population'] = departements['population'].astype(np.int32)
+        dataset._set_dimensions(departements, pd.DataFrame({'fait': dimensions['faits']}),
+                                dict(dimensions['libelles_annees']), dict(dimensions['libelles_mois']))
+        dataset.annee_min = dimensions['annee_min']
+        dataset.shape = tuple(dimensions['shape'])
+        dataset.version = dimensions['version']
+        # copy=False: les colonnes restent des vues sur les fichiers projetés
+        dataset.mesures = pd.DataFrame({colonne: projeter(colonne) for colonne in COLONNES_MESURES}, copy=False)
+        dataset._cles = projeter('cles')
+        dataset.cube, dataset.presence = (projeter('cube'), projeter('presence')) if cube else (None, None)
+        for nom in ROLLUPS:
+            setattr(dataset, nom, projeter(nom))
+        dataset.utiliser(moteur or ('cube' if cube else 'pandas'), path)
+        return dataset
+
+    def code_departement(self, num_departement):
+        """
+        Retourne le code entier d'un département (-1 s'il est inconnu).
+        """
+        return self._codes_departements.get(num_departement, -1)
+
+    def code_fait(self, fait):
+        """
+        Retourne le code entier d'un fait (-1 s'il est inconnu).
+        """
+        return self._codes_faits.get(fait, -1)
+
+    def code_annee(self, annee):
+        """
+        Retourne l'année sous forme d'entier (-1 si elle n'est pas valide).
+        """
+        return int(annee) if str(annee).isdigit() else -1
+
+    def code_mois(self, mois):
+        """
+        Retourne le mois sous forme d'entier (-1 s'il n'est pas valide).
+        """
+        return int(mois) if str(mois).isdigit() else -1
+
+    def num_departement(self, codes):
+        """
+        Retourne les numéros de départements correspondant à des codes.
+        """
+        return self.departements['num_departement'].to_numpy()[np.asarray(codes)]
+
+    def departements_region(self, nom):
+        """
+        Retourne les codes des départements d'une région (nom de liste_regions()).
+        """
+        return np.asarray(self._departements_regions[nom], dtype=np.intp)
+
+    def region_departement(self, codes):
+        """
+        Retourne les codes des régions (positions dans liste_regions()) de départements, -1 hors région.
+        """
+        return self._region_departements[np.asarray(codes)]
+
+    def population(self, codes):
+        """
+        Retourne la population des départements correspondant à des codes.
+        """
+        return self.departements['population'].to_numpy()[np.asarray(codes)]
+
+    def libelle_fait(self, codes):
+        """
+        Retourne les libellés des faits correspondant à des codes.
+        """
+        return self.faits['fait'].to_numpy()[np.asarray(codes)]
+
+    def libelle_annee(self, annees):
+        """
+        Retourne les années sous forme de texte, telles qu'elles apparaissent dans les fichiers sources.
+        """
+        return np.array([self._libelles_annees[annee] for annee in annees], dtype=object)
+
+    def libelle_mois(self, mois):
+        """
+        Retourne les mois sous forme de texte, tels qu'ils apparaissent dans les fichiers sources.
+        """
+        return np.array([self._libelles_mois[m] for m in mois], dtype=object)
+
+    def liste_departements(self):
+        """
+        Retourne la liste des numéros de départements.
+        """
+        return self.departements['num_departement'].to_numpy()
+
+    def liste_regions(self):
+        """
+        Retourne la liste des noms des régions.
+        """
+        return self.regions['region'].to_numpy()
+
+    def liste_faits(self):
+        """
+        Retourne la liste des libellés des faits.
+        """
+        return self.faits['fait'].to_numpy()
+
+    def liste_annees(self):
+        """
+        Retourne la liste des années sous forme de texte.
+        """
+        return np.array(sorted(self._libelles_annees.values()), dtype=object)
+
+    def liste_mois(self):
+        """
+        Retourne la liste des mois sous forme de texte.
+        """
+        return np.array(sorted(self._libelles_mois.values()), dtype=object)
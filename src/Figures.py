@@ -0,0 +1,116 @@
+"""
+Module Figures.py
+----------
+Gère les figures par défaut du layout (sélections initiales des dropdowns): elles sont construites une seule fois,
+sérialisées en JSON à côté du cache des données (data/figures.json) avec la version des données et les paramètres
+de la géométrie des cartes, puis relues telles quelles par chaque processus.
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- get_figures_defaut(dataset, version) -> dict
+    Retourne les figures par défaut, depuis data/figures.json si elles correspondent à la version des données.
+
+- construire_figures(dataset) -> dict
+    Construit les figures par défaut.
+
+- sauvegarder_figures(figures, version)
+    Sérialise les figures par défaut dans data/figures.json.
+"""
+
+import json
+import os
+
+from plotly.io.json import to_json_plotly
+
+import src.Geometrie as Geometrie
+import src.Graphs.Carte as Carte
+import src.Graphs.CamembertFaits as CamembertFaits
+import src.Graphs.HistogrammeParMois as HistogrammeParMois
+import src.Graphs.DelitsCrimesParAnnees as DelitsCrimesParAnnees
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+FIGURES_PATH = os.path.join(DATA_FOLDER, 'figures.json')
+"""
+    Figures par défaut sérialisées, avec la version des données utilisées
+"""
+
+
+def get_figures_defaut(dataset, version):
+    """
+    Retourne les figures par défaut. Elles sont lues depuis data/figures.json si elles ont été construites
+    avec la même version des données et la même simplification de la géométrie, sinon elles sont construites
+    puis sauvegardées.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    version : str
+        La version des données (voir get_data.get_data_version()), None si elle est inconnue:
+        les figures sont alors construites sans être sauvegardées.
+
+    Returns
+    -------
+    dict
+        Les figures (dictionnaires plotly), indexées par l'id de leur dcc.Graph.
+    """
+    if version is not None:
+        try:
+            with open(FIGURES_PATH, encoding='utf-8') as file:
+                sauvegarde = json.load(file)
+            if sauvegarde.get('version') == version and sauvegarde.get('geometrie') == Geometrie.parametres():
+                return sauvegarde['figures']
+        except (OSError, ValueError):
+            pass
+
+    figures = construire_figures(dataset)
+    if version is not None:
+        sauvegarder_figures(figures, version)
+    return json.loads(to_json_plotly(figures))
+
+
+def construire_figures(dataset):
+    """
+    Construit les figures par défaut, avec les valeurs initiales des dropdowns du layout (main.layout).
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+
+    Returns
+    -------
+    dict
+        Les figures plotly, indexées par l'id de leur dcc.Graph.
+    """
+    map_france, map_idf = Carte.get_map_graph(dataset, '2022', 'Tout', 'Tout', -1)
+    return {
+        'map_france': map_france,
+        'map_idf': map_idf,
+        'most_common_crimes': CamembertFaits.get_common_crimes_pie_graph(dataset, 'Tout', 'Tout', 'Tout',
+                                                                         limit=5, ascending=False),
+        'histogramme_par_mois': HistogrammeParMois.get_histogramme_graph(dataset, 'Tout', ['93'], 'Tout'),
+        'delits_crimes_par_annees': DelitsCrimesParAnnees.get_delits_crimes_annees_graph(dataset, 'Tout', 'Tout'),
+    }
+
+
+def sauvegarder_figures(figures, version):
+    """
+    Sérialise les figures par défaut dans data/figures.json (écriture atomique).
+
+    Parameters
+    ----------
+    figures : dict
+        Les figures, indexées par l'id de leur dcc.Graph.
+    version : str
+        La version des données utilisées pour construire les figures.
+    """
+    tmp_path = f'{FIGURES_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(to_json_plotly({'version': version, 'geometrie': Geometrie.parametres(), 'figures': figures}))
+    os.replace(tmp_path, FIGURES_PATH)
@@ -0,0 +1,410 @@
+"""
+Module Geometrie.py
+----------
+Gère la géométrie des cartes: le GeoJSON des départements est téléchargé une seule fois dans le dossier data/,
+puis simplifié une seule fois (data/departements-simplifie.geojson), et enfin lu une seule fois par processus
+et servi depuis la mémoire. La carte de l'Île-de-France est extraite de la même géométrie simplifiée.
+
+La simplification préserve la topologie: les frontières communes à deux départements sont découpées aux mêmes
+points (jonctions) puis simplifiées une seule fois (Douglas-Peucker), elles restent donc identiques des deux côtés,
+sans trou ni chevauchement. Les coordonnées sont arrondies (quantifiées) et seules les propriétés utilisées
+par les cartes sont conservées. La tolérance et la précision sont réglables avec les variables d'environnement
+GEOJSON_TOLERANCE (en degrés, 0 pour ne pas simplifier) et GEOJSON_PRECISION (nombre de décimales).
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- get_geojson(nom) -> dict
+    Retourne le GeoJSON simplifié demandé ('france' ou 'idf'), depuis la mémoire.
+
+- refresh_geojson() -> dict
+    Télécharge à nouveau le GeoJSON des départements, le simplifie et vide le cache en mémoire.
+
+- preparer_geojson() -> dict
+    Simplifie le GeoJSON des départements et retourne le gain obtenu.
+
+- simplifier(geojson, tolerance, precision, proprietes=PROPRIETES) -> dict
+    Retourne une copie simplifiée d'un GeoJSON de polygones.
+
+- parametres() -> dict
+    Retourne les paramètres courants de la simplification.
+"""
+
+import functools
+import json
+import os
+import time
+
+import numpy as np
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+GEOJSON = {
+    'france': ('https://raw.githubusercontent.com/gregoiredavid/france-geojson/master/departements.geojson',
+               os.path.join(DATA_FOLDER, 'departements.geojson')),
+}
+"""
+    Url source et chemin local de chaque GeoJSON téléchargé
+"""
+
+SIMPLIFIE_PATH = os.path.join(DATA_FOLDER, 'departements-simplifie.geojson')
+"""
+    GeoJSON simplifié des départements, avec les paramètres de la simplification
+"""
+
+CODES_IDF = ('75', '77', '78', '91', '92', '93', '94', '95')
+"""
+    Codes des départements de l'Île-de-France
+"""
+
+PROPRIETES = ('code',)
+"""
+    Propriétés conservées (featureidkey des cartes: properties.code)
+"""
+
+TOLERANCE = 0.002
+"""
+    Tolérance par défaut de la simplification, en degrés (environ 150 mètres, moins d'un pixel sur la carte de l'Île-de-France)
+"""
+
+PRECISION = 3
+"""
+    Nombre de décimales conservées par défaut pour les coordonnées
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def get_geojson(nom):
+    """
+    Retourne le GeoJSON simplifié demandé. Le fichier source n'est téléchargé que s'il n'existe pas encore
+    dans le dossier data/, n'est simplifié que si data/departements-simplifie.geojson n'existe pas ou a été
+    construit avec d'autres paramètres, et n'est lu qu'une seule fois par processus.
+
+    Le dictionnaire retourné est partagé entre tous les appels et ne doit pas être modifié.
+
+    Parameters
+    ----------
+    nom : str
+        'france' ou 'idf'.
+
+    Returns
+    -------
+    dict
+        Les données GeoJSON.
+    """
+    if nom == 'idf':
+        france = get_geojson('france')
+        return {'type': 'FeatureCollection',
+                'features': [feature for feature in france['features'] if feature['properties']['code'] in CODES_IDF]}
+    if nom != 'france':
+        raise KeyError(nom)
+
+    try:
+        with open(SIMPLIFIE_PATH, encoding='utf-8') as file:
+            geojson = json.load(file)
+        if geojson.get('simplification') == parametres():
+            return geojson
+    except (OSError, ValueError):
+        pass
+    preparer_geojson()
+    with open(SIMPLIFIE_PATH, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def refresh_geojson():
+    """
+    Télécharge à nouveau le GeoJSON des départements, le simplifie et vide le cache en mémoire.
+
+    Returns
+    -------
+    dict
+        Le gain de la simplification (voir preparer_geojson()).
+    """
+    for url, path in GEOJSON.values():
+        _download_geojson(url, path)
+    return preparer_geojson()
+
+
+def preparer_geojson():
+    """
+    Simplifie le GeoJSON des départements (téléchargé si nécessaire) avec les paramètres courants,
+    l'écrit dans data/departements-simplifie.geojson et vide le cache en mémoire.
+
+    Le temps de sérialisation mesuré est celui que paie le serveur pour chaque figure des cartes;
+    le nombre de sommets est celui que le navigateur doit projeter et dessiner à chaque rendu.
+
+    Returns
+    -------
+    dict
+        Pour 'octets' (taille du JSON), 'sommets' et 'serialisation' (secondes): un tuple (avant, après).
+    """
+    from plotly.io.json import to_json_plotly
+
+    url, path = GEOJSON['france']
+    if not os.path.isfile(path):
+        _download_geojson(url, path)
+    with open(path, encoding='utf-8') as file:
+        source = json.load(file)
+
+    simplification = parametres()
+    geojson = simplifier(source, simplification['tolerance'], simplification['precision'])
+    geojson['simplification'] = simplification
+
+    contenu = json.dumps(geojson, separators=(',', ':'))
+    tmp_path = f'{SIMPLIFIE_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(contenu)
+    os.replace(tmp_path, SIMPLIFIE_PATH)
+    get_geojson.cache_clear()
+
+    def serialisation(donnees):
+        debut = time.perf_counter()
+        to_json_plotly(donnees)
+        return time.perf_counter() - debut
+
+    return {
+        'octets': (len(json.dumps(source, separators=(',', ':'))), len(contenu)),
+        'sommets': (_sommets(source), _sommets(geojson)),
+        'serialisation': (serialisation(source), serialisation(geojson)),
+    }
+
+
+def simplifier(geojson, tolerance, precision, proprietes=PROPRIETES):
+    """
+    Retourne une copie simplifiée d'un GeoJSON de polygones (Polygon et MultiPolygon).
+
+    Les coordonnées sont d'abord arrondies à la précision demandée. Les anneaux sont ensuite découpés en arcs
+    aux jonctions (points où plusieurs frontières se rejoignent, plus trois points fixés par anneau qui n'en
+    a pas assez pour rester un polygone) et chaque arc est simplifié une seule fois, quel que soit le nombre
+    d'anneaux qui le partagent. Les îlots plus petits que la tolérance sont supprimés s'ils ne touchent
+    aucun autre département.
+
+    Parameters
+    ----------
+    geojson : dict
+        Une FeatureCollection de polygones.
+    tolerance : float
+        Distance maximale entre la géométrie simplifiée et la géométrie d'origine, en degrés (0: pas de simplification).
+    precision : int
+        Nombre de décimales conservées pour les coordonnées.
+    proprietes : tuple of str
+        Propriétés conservées dans chaque feature.
+
+    Returns
+    -------
+    dict
+        La FeatureCollection simplifiée.
+    """
+    facteur = 10 ** precision
+    polygones = [_polygones(feature['geometry'], facteur) for feature in geojson['features']]
+    anneaux = [anneau for feature in polygones for polygone in feature for anneau in polygone]
+
+    # Voisins de chaque point et nombre d'anneaux qui l'utilisent
+    voisins, utilisations = {}, {}
+    for anneau in anneaux:
+        for position, point in enumerate(anneau):
+            voisins.setdefault(point, set()).update((anneau[position - 1], anneau[(position + 1) % len(anneau)]))
+        for point in set(anneau):
+            utilisations[point] = utilisations.get(point, 0) + 1
+    jonctions = {point for point, autres in voisins.items() if len(autres) > 2}
+    for anneau in anneaux:
+        _fixer_points(anneau, jonctions)
+
+    arcs = {}
+    features = []
+    for feature, feature_polygones in zip(geojson['features'], polygones):
+        simplifies = []
+        for polygone in feature_polygones:
+            exterieur = polygone[0]
+            ilot = all(utilisations[point] == 1 for point in exterieur)
+            if ilot and len(feature_polygones) > 1 and _etendue(exterieur) < tolerance * facteur:
+                continue
+            simplifies.append([_simplifier_anneau(anneau, jonctions, arcs, tolerance * facteur, facteur)
+                               for anneau in polygone])
+        if not simplifies:
+            # Département composé uniquement d'îlots minuscules: le plus grand est conservé
+            polygone = max(feature_polygones, key=lambda p: _etendue(p[0]))
+            simplifies = [[_simplifier_anneau(anneau, jonctions, arcs, tolerance * facteur, facteur)
+                           for anneau in polygone]]
+
+        if feature['geometry']['type'] == 'Polygon' and len(simplifies) == 1:
+            geometrie = {'type': 'Polygon', 'coordinates': simplifies[0]}
+        else:
+            geometrie = {'type': 'MultiPolygon', 'coordinates': simplifies}
+        features.append({
+            'type': 'Feature',
+            'geometry': geometrie,
+            'properties': {nom: feature['properties'][nom] for nom in proprietes if nom in feature['properties']},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def parametres():
+    """
+    Retourne les paramètres courants de la simplification (variables d'environnement ou valeurs par défaut).
+
+    Returns
+    -------
+    dict
+        tolerance (en degrés) et precision (nombre de décimales).
+    """
+    return {'tolerance': float(os.environ.get('GEOJSON_TOLERANCE', TOLERANCE)),
+            'precision': int(os.environ.get('GEOJSON_PRECISION', PRECISION))}
+
+
+def _polygones(geometrie, facteur):
+    """
+    Retourne les polygones d'une géométrie, chacun étant une liste d'anneaux ouverts (sans le point de fermeture)
+    de points en coordonnées entières (coordonnées multipliées par facteur puis arrondies).
+    """
+    polygones = [geometrie['coordinates']] if geometrie['type'] == 'Polygon' else geometrie['coordinates']
+    resultat = []
+    for polygone in polygones:
+        anneaux = []
+        for coordonnees in polygone:
+            anneau = []
+            for x, y in (point[:2] for point in coordonnees):
+                point = (round(x * facteur), round(y * facteur))
+                if not anneau or anneau[-1] != point:
+                    anneau.append(point)
+            while len(anneau) > 1 and anneau[-1] == anneau[0]:
+                anneau.pop()
+            if len(anneau) >= 3:
+                anneaux.append(anneau)
+            elif not anneaux:
+                # Anneau extérieur plus petit que la précision: le polygone est supprimé
+                break
+        if anneaux:
+            resultat.append(anneaux)
+    return resultat
+
+
+def _fixer_points(anneau, jonctions):
+    """
+    Ajoute aux jonctions des points de l'anneau jusqu'à ce qu'il en ait au moins trois: le premier point
+    dans l'ordre des coordonnées, le point le plus éloigné de celui-ci, puis le point le plus éloigné de la
+    droite qui les relie. Ces points ne dépendent ni du sens ni du point de départ de l'anneau.
+    """
+    if sum(point in jonctions for point in set(anneau)) >= 3:
+        return
+    points = np.array(anneau, dtype=float)
+    premier = min(anneau)
+    oppose = anneau[int(np.argmax(((points - premier) ** 2).sum(axis=1)))]
+    troisieme = anneau[int(np.argmax(_distances(points, np.array(premier, dtype=float),
+                                                np.array(oppose, dtype=float))))]
+    jonctions.update((premier, oppose, troisieme))
+
+
+def _simplifier_anneau(anneau, jonctions, arcs, tolerance, facteur):
+    """
+    Simplifie un anneau arc par arc et le retourne fermé, en coordonnées décimales.
+    """
+    depart = next(position for position, point in enumerate(anneau) if point in jonctions)
+    tourne = anneau[depart:] + anneau[:depart] + [anneau[depart]]
+
+    resultat = [tourne[0]]
+    debut = 0
+    for position in range(1, len(tourne)):
+        if tourne[position] in jonctions:
+            resultat.extend(_simplifier_arc(tuple(tourne[debut:position + 1]), arcs, tolerance)[1:])
+            debut = position
+    return [[x / facteur, y / facteur] for x, y in resultat]
+
+
+def _simplifier_arc(arc, arcs, tolerance):
+    """
+    Simplifie un arc (extrémités conservées) une seule fois quel que soit son sens de parcours:
+    les deux anneaux qui partagent une frontière obtiennent exactement les mêmes points.
+    """
+    inverse = arc[::-1]
+    canonique = min(arc, inverse)
+    if canonique not in arcs:
+        arcs[canonique] = _douglas_peucker(canonique, tolerance) if tolerance > 0 else canonique
+    simplifie = arcs[canonique]
+    return simplifie if canonique == arc else simplifie[::-1]
+
+
+def _douglas_peucker(arc, tolerance):
+    """
+    Simplifie un arc avec l'algorithme de Douglas-Peucker (version itérative).
+    """
+    if len(arc) <= 2:
+        return arc
+    points = np.array(arc, dtype=float)
+    gardes = np.zeros(len(arc), dtype=bool)
+    gardes[[0, -1]] = True
+    pile = [(0, len(arc) - 1)]
+    while pile:
+        debut, fin = pile.pop()
+        if fin - debut < 2:
+            continue
+        distances = _distances(points[debut + 1:fin], points[debut], points[fin])
+        position = int(np.argmax(distances))
+        if distances[position] > tolerance:
+            milieu = debut + 1 + position
+            gardes[milieu] = True
+            pile.extend(((debut, milieu), (milieu, fin)))
+    return tuple(point for point, garde in zip(arc, gardes) if garde)
+
+
+def _distances(points, a, b):
+    """
+    Retourne la distance de chaque point au segment [a, b].
+    """
+    ab = b - a
+    longueur = float(ab @ ab)
+    if longueur == 0:
+        return np.sqrt(((points - a) ** 2).sum(axis=1))
+    t = np.clip((points - a) @ ab / longueur, 0, 1)
+    return np.sqrt(((points - (a + t[:, None] * ab)) ** 2).sum(axis=1))
+
+
+def _etendue(anneau):
+    """
+    Retourne la plus grande dimension de la boîte englobante d'un anneau.
+    """
+    points = np.array(anneau)
+    return float((points.max(axis=0) - points.min(axis=0)).max())
+
+
+def _sommets(geojson):
+    """
+    Retourne le nombre de sommets d'un GeoJSON de polygones.
+    """
+    def compter(coordonnees):
+        return 1 if isinstance(coordonnees[0], (int, float)) else sum(compter(c) for c in coordonnees)
+    return sum(compter(feature['geometry']['coordinates']) for feature in geojson['features'])
+
+
+def _download_geojson(url, path):
+    """
+    Télécharge un fichier GeoJSON dans le dossier data/.
+
+    Parameters
+    ----------
+    url : str
+        L'url du fichier.
+    path : str
+        Le chemin local du fichier.
+
+    Raises
+    ------
+    Exception
+        Si le fichier n'a pas pu être téléchargé.
+    """
+    # Import différé: le dashboard n'en a pas besoin quand les fichiers sont déjà présents
+    import requests
+
+    print(f'Obtention du fichier {os.path.basename(path)} ...')
+    r = requests.get(url)
+    if r.status_code != 200:
+        raise Exception(f'La requête pour télécharger le fichier a échoué \n Code erreur: {r.status_code}')
+
+    # Écriture dans un fichier temporaire pour ne jamais laisser un fichier incomplet
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(r.content)
+    os.replace(tmp_path, path)
@@ -9,28 +9,29 @@ Léon E.
 
 Fonctions
 ----------
-- `get_common_crimes_pie_graph(dataframe, annee, mois, departement, limit=10, ascending=False)`
+- `get_common_crimes_pie_graph(dataset, annee, mois, departement, limit=10, ascending=False)`
     Retourne un graphique camembert des faits les plus/moins communs.
 
-- `get_crimes(dataframe, limit=10, ascending=False)`
+- `get_crimes(dataset, limit=10, ascending=False)`
     Retourne un dataframe des faits les plus/moins communs.
 
-- `get_crimes_byDate_departement(dataframe, annee, mois, departement, limit=10, ascending=False)`
+- `get_crimes_byDate_departement(dataset, annee, mois, departement, limit=10, ascending=False)`
     Retourne un dataframe des faits les plus/moins communs en fonction de la date et du département.
 """
 
 
 import plotly.express as px
+import pandas as pd
 
 
-def get_common_crimes_pie_graph(dataframe, annee, mois, departement, limit=10, ascending=False):
+def get_common_crimes_pie_graph(dataset, annee, mois, departement, limit=10, ascending=False):
     """
     Retourne un graphique camembert des faits les plus/moins communs.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le dataframe contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     annee : str
         L'année à considérer ou "Tout" pour toutes les années.
     mois : str
@@ -48,10 +49,10 @@ def get_common_crimes_pie_graph(dataframe, annee, mois, departement, limit=10, a
         Un graphique camembert de la répartition des faits.
     """
     if any(arg != 'Tout' for arg in (annee, mois, departement)):
-        reduced_data_frame = get_crimes_byDate_departement(dataframe, annee, mois, departement, limit=limit,
+        reduced_data_frame = get_crimes_byDate_departement(dataset, annee, mois, departement, limit=limit,
                                                            ascending=ascending)
     else:
-        reduced_data_frame = get_crimes(dataframe, limit=limit, ascending=ascending)
+        reduced_data_frame = get_crimes(dataset, limit=limit, ascending=ascending)
 
     title = f"Camembert de la répartition des {limit} faits les {'moins' if ascending else 'plus'} communs"
     graph = px.pie(
@@ -64,14 +65,14 @@ def get_common_crimes_pie_graph(dataframe, annee, mois, departement, limit=10, a
     return graph
 
 
-def get_crimes(dataframe, limit=10, ascending=False):
+def get_crimes(dataset, limit=10, ascending=False):
     """
     Retourne un dataframe des faits les plus/moins communs.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le dataframe contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     limit : int, optional
         Le nombre de faits à afficher (par défaut 10).
     ascending : bool, optional
@@ -82,19 +83,20 @@ def get_crimes(dataframe, limit=10, ascending=False):
     pandas.DataFrame
         Un dataframe avec les faits les plus/moins communs.
     """
-    df = dataframe.groupby("fait")[["nombre"]].sum().reset_index()
+    nombres = dataset.agreger(["fait"])
+    df = _to_faits_dataframe(dataset, nombres)
     df = df.sort_values(by="nombre", ascending=ascending)
     return df.head(limit)
 
 
-def get_crimes_byDate_departement(dataframe, annee, mois, departement, limit=10, ascending=False):
+def get_crimes_byDate_departement(dataset, annee, mois, departement, limit=10, ascending=False):
     """
     Retourne un dataframe des faits les plus/moins communs en fonction de la date et du département.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le dataframe contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     annee : str
         L'année à considérer ou "Tout" pour toutes les années.
     mois : str
@@ -112,11 +114,27 @@ def get_crimes_byDate_departement(dataframe, annee, mois, departement, limit=10,
         Un dataframe avec les faits les plus/moins communs en fonction de la date et du département.
     """
 
-    annee_condition = True if annee == "Tout" else (dataframe['annee'] == annee)
-    mois_condition = True if mois == "Tout" else (dataframe['mois'] == mois)
-    departement_condition = True if departement == "Tout" else (dataframe['num_departement'] == departement)
-
-    new_df = dataframe[annee_condition & mois_condition & departement_condition].groupby("fait")[["nombre"]].sum().reset_index()
+    nombres = dataset.agreger(["fait"], annee=annee, mois=mois, departement=departement)
+    new_df = _to_faits_dataframe(dataset, nombres)
     new_df = new_df.sort_values(by="nombre", ascending=ascending)
     
     return new_df.head(limit)
+
+
+def _to_faits_dataframe(dataset, nombres):
+    """
+    Construit le dataframe des faits à partir des nombres agrégés par code de fait.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    nombres : pandas.Series
+        Le nombre de délits et crimes, indexé par code de fait.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Un dataframe avec les colonnes fait et nombre.
+    """
+    return pd.DataFrame({'fait': dataset.libelle_fait(nombres.index), 'nombre': nombres.to_numpy()})
@@ -10,25 +10,43 @@ Léon E.
 Fonctions
 ---------
 - get_france_geojson()
-    Récupère les données GeoJSON pour la carte de la France.
+    Récupère les données GeoJSON pour la carte de la France (depuis le cache local).
 
 - get_idf_geojson()
-    Récupère les données GeoJSON pour la carte de l'Île-de-France.
+    Récupère les données GeoJSON pour la carte de l'Île-de-France (depuis le cache local).
 
-- get_map_dataframe_with_params(dataframe, annee, mois, fait, display)
+- get_map_dataframe_with_params(dataset, annee, mois, fait, display)
     Obtient un DataFrame adapté pour la carte avec des paramètres spécifiques.
 
-- get_map_dataframe(dataframe, display)
+- get_map_dataframe(dataset, display)
     Obtient un DataFrame adapté pour la carte avec des paramètres par défaut.
 
-- get_map_graph(dataframe, annee, mois, fait, display)
+- get_map_graph(dataset, annee, mois, fait, display)
     Obtient les graphiques choroplèthes de la carte de la France et de l'Île-de-France.
 
+- get_map_valeurs(dataset, annee, mois, fait, display)
+    Obtient les seules parties des cartes qui dépendent des paramètres (valeurs, légende), sans la géométrie.
+
 - get_graph(geojson, dataframe, title, affichage)
     Obtient un graphique choroplèthe basé sur un GeoJSON et un DataFrame.
 """
 import plotly.express as px
-import requests
+import pandas as pd
+
+import src.Geometrie as Geometrie
+
+TITRES = {
+    'map_france': "Carte des délits et crimes en France (métropolitaine) par départements ",
+    'map_idf': "Carte des délits et crimes en Île-de-France par départements ",
+}
+"""
+    Titres des cartes, par id de leur dcc.Graph
+"""
+
+LABELS = {"nom_departement": "Département", "num_departement": "Code département"}
+"""
+    Libellés des colonnes affichés au survol (celui de la colonne nombre dépend de l'affichage, voir _legende)
+"""
 
 def get_france_geojson():
     """
@@ -39,9 +57,7 @@ def get_france_geojson():
     dict
         Les données GeoJSON pour la carte de la France.
     """
-    return requests.get(
-        "https://raw.githubusercontent.com/gregoiredavid/france-geojson/master/departements.geojson"
-    ).json()
+    return Geometrie.get_geojson('france')
 
 def get_idf_geojson():
     """
@@ -52,18 +68,16 @@ def get_idf_geojson():
     dict
         Les données GeoJSON pour la carte de l'Île-de-France.
     """
-    return requests.get(
-        "https://raw.githubusercontent.com/gregoiredavid/france-geojson/master/regions/ile-de-france/departements-ile-de-france.geojson"
-    ).json()
+    return Geometrie.get_geojson('idf')
 
-def get_map_dataframe_with_params(dataframe, annee, mois, fait, display):
+def get_map_dataframe_with_params(dataset, annee, mois, fait, display):
     """
     Obtient un DataFrame adapté pour la carte avec des paramètres spécifiques.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     annee : str
         L'année à considérer ou "Tout" pour toutes les années.
     mois : str
@@ -78,35 +92,18 @@ def get_map_dataframe_with_params(dataframe, annee, mois, fait, display):
     pandas.DataFrame
         Un DataFrame adapté pour la carte avec les paramètres spécifiés.
     """
-    if mois == "Tout":
-        mois_condition = True
-    else:
-        mois_condition = (dataframe['mois'] == mois)
-    if annee == "Tout":
-        annee_condition = True
-    else:
-        annee_condition = (dataframe['annee'] == annee)
-    if fait == "Tout":
-        fait_condition = True
-    else:
-        fait_condition = (dataframe['fait'] == fait)
-    new_df = dataframe[mois_condition & annee_condition & fait_condition].groupby("num_departement").agg(
-        nombre=("nombre", "sum"),
-        population=("population", "first")
-    ).reset_index()
-    if display != -1:
-        new_df['nombre'] = new_df['nombre'] / new_df['population'] * display
+    nombres = dataset.agreger(["departement"], annee=annee, mois=mois, fait=fait)
 
-    return new_df
+    return _to_map_dataframe(dataset, nombres, display)
 
-def get_map_dataframe(dataframe, display):
+def get_map_dataframe(dataset, display):
     """
     Obtient un DataFrame adapté pour la carte avec des paramètres par défaut.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     display : int
         Le paramètre d'affichage, -1 pour le nombre brut ou un nombre pour l'affichage par habitant.
 
@@ -115,23 +112,46 @@ def get_map_dataframe(dataframe, display):
     pandas.DataFrame
         Un DataFrame adapté pour la carte avec des paramètres par défaut.
     """
-    df = dataframe.groupby("num_departement").agg(
-        nombre=("nombre", "sum"),
-        population=("population", "first")
-    ).reset_index()
+    nombres = dataset.agreger(["departement"])
+
+    return _to_map_dataframe(dataset, nombres, display)
+
+def _to_map_dataframe(dataset, nombres, display):
+    """
+    Construit le DataFrame de la carte à partir des nombres agrégés par code de département.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    nombres : pandas.Series
+        Le nombre de délits et crimes, indexé par code de département.
+    display : int
+        Le paramètre d'affichage, -1 pour le nombre brut ou un nombre pour l'affichage par habitant.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Un DataFrame avec les colonnes num_departement, nombre et population.
+    """
+    df = pd.DataFrame({
+        'num_departement': dataset.num_departement(nombres.index),
+        'nombre': nombres.to_numpy(),
+        'population': dataset.population(nombres.index),
+    })
     if display != -1:
         df['nombre'] = df['nombre'] / df['population'] * display
 
     return df
 
-def get_map_graph(dataframe, annee, mois, fait, display):
+def get_map_graph(dataset, annee, mois, fait, display):
     """
     Obtient les graphiques choroplèthes de la carte de la France et de l'Île-de-France.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     annee : str
         L'année à considérer ou "Tout" pour toutes les années.
     mois : str
@@ -146,20 +166,69 @@ def get_map_graph(dataframe, annee, mois, fait, display):
     tuple of plotly.graph_objects.Figure
         Les graphiques choroplèthes de la carte de la France et de l'Île-de-France.
     """
-    if any(arg != 'Tout' for arg in (annee, mois, fait)):
-        reduced_data_frame = get_map_dataframe_with_params(dataframe, annee, mois, fait, display)
-    else:
-        reduced_data_frame = get_map_dataframe(dataframe, display)
+    reduced_data_frame = _get_dataframe(dataset, annee, mois, fait, display)
+    affichage = _affichage(display)
 
-    affichage = f"pour {display} habitants" if display != -1 else "(en nombre commis)"
-
-    graph_france = get_graph(get_france_geojson(), reduced_data_frame,
-                             "Carte des délits et crimes en France (métropolitaine) par départements ", affichage)
-    graph_idf = get_graph(get_idf_geojson(), reduced_data_frame,
-                          "Carte des délits et crimes en Île-de-France par départements ", affichage)
+    graph_france = get_graph(get_france_geojson(), reduced_data_frame, TITRES['map_france'], affichage)
+    graph_idf = get_graph(get_idf_geojson(), reduced_data_frame, TITRES['map_idf'], affichage)
 
     return graph_france, graph_idf
 
+def get_map_valeurs(dataset, annee, mois, fait, display):
+    """
+    Obtient les parties des cartes qui dépendent des paramètres: les départements et leurs valeurs,
+    la légende de l'échelle de couleurs et le texte du survol. Elles sont communes aux deux cartes
+    et permettent de les mettre à jour sans renvoyer la géométrie (voir main.update_map_graph).
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    annee : str
+        L'année à considérer ou "Tout" pour toutes les années.
+    mois : str
+        Le mois à considérer ou "Tout" pour tous les mois.
+    fait : str
+        Le type de fait à considérer ou "Tout" pour tous les faits.
+    display : int
+        Le paramètre d'affichage, -1 pour le nombre brut ou un nombre pour l'affichage par habitant.
+
+    Returns
+    -------
+    dict
+        locations et z (valeurs de la trace choroplèthe), legende (titre de l'échelle de couleurs)
+        et hovertemplate, identiques à ceux des figures de get_map_graph.
+    """
+    reduced_data_frame = _get_dataframe(dataset, annee, mois, fait, display)
+    legende = _legende(_affichage(display))
+
+    return {
+        'locations': reduced_data_frame['num_departement'].to_numpy(),
+        'z': reduced_data_frame['nombre'].to_numpy(),
+        'legende': legende,
+        'hovertemplate': f"{LABELS['num_departement']}=%{{location}}<br>{legende}=%{{z}}<extra></extra>",
+    }
+
+def _get_dataframe(dataset, annee, mois, fait, display):
+    """
+    Obtient le DataFrame de la carte, avec les paramètres par défaut si aucun filtre n'est sélectionné.
+    """
+    if any(arg != 'Tout' for arg in (annee, mois, fait)):
+        return get_map_dataframe_with_params(dataset, annee, mois, fait, display)
+    return get_map_dataframe(dataset, display)
+
+def _affichage(display):
+    """
+    Retourne le type d'affichage des cartes, ajouté à leur légende.
+    """
+    return f"pour {display} habitants" if display != -1 else "(en nombre commis)"
+
+def _legende(affichage):
+    """
+    Retourne le libellé de la colonne nombre (titre de l'échelle de couleurs).
+    """
+    return "Délits et crimes " + affichage
+
 def get_graph(geojson, dataframe, title, affichage):
     """
     Obtient un graphique choroplèthe basé sur un GeoJSON et un DataFrame.
@@ -188,8 +257,7 @@ def get_graph(geojson, dataframe, title, affichage):
         featureidkey="properties.code",
         color="nombre",
         color_continuous_scale="Viridis_r",
-        labels={"nombre": "Délits et crimes " + affichage, "nom_departement": "Département",
-                "num_departement": "Code département"},
+        labels={"nombre": _legende(affichage), **LABELS},
         basemap_visible=False,
         locationmode="geojson-id",
         projection="mercator",
@@ -2,6 +2,7 @@
 Module DelitsCrimesParAnnees.py
 --------------------------------
 Gère les graphiques et les données relatifs à l'évolution du nombre de délits et crimes par années.
+Plusieurs départements (ou régions) et plusieurs faits peuvent être comparés: une série par combinaison.
 
 Auteur
 ------
@@ -9,69 +10,190 @@ Léon E.
 
 Fonctions
 ---------
-- get_delits_crimes_annees(dataframe, fait, departement)
+- get_delits_crimes_annees(dataset, fait, departement)
     Obtient un DataFrame regroupant le nombre de délits et crimes par année
-    en fonction du type de fait et du département spécifiés.
+    en fonction des types de faits et des départements spécifiés.
 
-- get_delits_crimes_annees_graph(dataframe, fait, departement)
+- get_delits_crimes_annees_graph(dataset, fait, departement)
     Obtient un graphique de l'évolution du nombre de délits et crimes par année
-    en fonction du type de fait et du département spécifiés.
+    en fonction des types de faits et des départements spécifiés.
 """
 
 
 
+import numpy as np
 import plotly.express as px
+import pandas as pd
 
-def get_delits_crimes_annees(dataframe, fait, departement):
+def get_delits_crimes_annees(dataset, fait, departement):
     """
     Obtient un DataFrame regroupant le nombre de délits et crimes par année
-    en fonction du type de fait et du département spécifiés.
+    en fonction des types de faits et des départements spécifiés.
+
+    Toutes les séries sont calculées à partir d'une seule requête groupée par (département, fait, année) sur
+    les départements choisis et ceux des régions choisies, et d'une seule lecture de la table nationale pour
+    "Tout": les régions et le fait "Tout" en sont des sommes. Le coût dépend du nombre de séries et non de la
+    taille des données.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
-    fait : str
-        Le type de fait à considérer ou "Tout" pour tous les faits.
-    departement : str
-        Le département à considérer ou "Tout" pour tous les départements.
+    dataset : Dataset
+        Les données du dashboard.
+    fait : str or list
+        Le ou les types de faits à considérer, "Tout" pour tous les faits.
+    departement : str or list
+        Le ou les départements (ou régions) à considérer, "Tout" pour tous les départements.
 
     Returns
     -------
     pandas.DataFrame
-        Un DataFrame regroupant le nombre de délits et crimes par année.
+        Un DataFrame regroupant le nombre de délits et crimes par année (colonnes departement, fait, annee et
+        nombre), une série par (departement, fait) dans l'ordre des listes.
     """
-    departement_condition = (departement == "Tout") | (dataframe['num_departement'] == departement)
-    fait_condition = (fait == "Tout") | (dataframe['fait'] == fait)
-    
-    new_df = dataframe[fait_condition & departement_condition].groupby("annee")[["nombre"]].sum().reset_index()
+    faits = _liste(fait)
+    departements = _liste(departement)
+    # Avec "Tout", la requête porte sur tous les faits: les faits choisis en sont extraits
+    filtre_fait = 'Tout' if 'Tout' in faits else faits
+
+    # (série, code du département) pour chaque département d'une série (une région: ses départements)
+    codes_departements = {numero: code for code, numero in enumerate(dataset.liste_departements())}
+    regions = set(dataset.liste_regions())
+    membres = np.array([(serie, code) for serie, valeur in enumerate(departements) if valeur != 'Tout'
+                        for code in (dataset.departements_region(valeur) if valeur in regions
+                                     else [codes_departements[valeur]] if valeur in codes_departements else [])],
+                       dtype=np.intp).reshape(-1, 2)
+
+    colonnes = []
+    if len(membres):
+        nombres = dataset.agreger(['departement', 'fait', 'annee'], fait=filtre_fait,
+                                  departement=dataset.num_departement(np.unique(membres[:, 1])).tolist())
+        colonnes.append(_repeter(nombres, membres, len(codes_departements)))
+    if 'Tout' in departements:
+        # Tous les départements: table nationale (totaux France_Métro quand ils existent)
+        nombres = dataset.agreger(['fait', 'annee'], departement='Tout', fait=filtre_fait)
+        colonnes.append((np.full(len(nombres), departements.index('Tout'), dtype=np.intp),
+                         nombres.index.get_level_values('fait').to_numpy(),
+                         nombres.index.get_level_values('annee').to_numpy(), nombres.to_numpy()))
+    if not colonnes:
+        return pd.DataFrame({'departement': [], 'fait': [], 'annee': [], 'nombre': []})
+    series, codes_faits, annees, nombres = (np.concatenate(valeurs) for valeurs in zip(*colonnes))
+
+    # Position de chaque ligne dans la liste des faits choisis, et une copie de toutes les lignes pour "Tout"
+    positions_faits = np.full(len(dataset.liste_faits()), -1, dtype=np.intp)
+    codes = {libelle: code for code, libelle in enumerate(dataset.liste_faits())}
+    for position, valeur in enumerate(faits):
+        if valeur in codes:
+            positions_faits[codes[valeur]] = position
+    positions = positions_faits[codes_faits]
+    choisis = positions >= 0
+    if 'Tout' in faits:
+        series = np.concatenate([series[choisis], series])
+        positions = np.concatenate([positions[choisis], np.full(len(annees), faits.index('Tout'), dtype=np.intp)])
+        annees = np.concatenate([annees[choisis], annees])
+        nombres = np.concatenate([nombres[choisis], nombres])
+    else:
+        series, positions, annees, nombres = series[choisis], positions[choisis], annees[choisis], nombres[choisis]
+    if len(annees) == 0:
+        return pd.DataFrame({'departement': [], 'fait': [], 'annee': [], 'nombre': []})
+
+    # Somme par (série, fait, année): les clés triées donnent l'ordre de sélection puis les années croissantes
+    annee_min = int(annees.min())
+    etendue = int(annees.max()) - annee_min + 1
+    cles, inverse = np.unique((series * len(faits) + positions) * etendue + (annees - annee_min), return_inverse=True)
+    sommes = np.zeros(len(cles), dtype=np.int64)
+    np.add.at(sommes, inverse, nombres)
+    cles, annees = np.divmod(cles, etendue)
+    series, positions = np.divmod(cles, len(faits))
+    new_df = pd.DataFrame({
+        'departement': np.array(departements, dtype=object)[series],
+        'fait': np.array(faits, dtype=object)[positions],
+        'annee': dataset.libelle_annee(annees + annee_min),
+        'nombre': sommes,
+    })
     return new_df
 
-def get_delits_crimes_annees_graph(dataframe, fait, departement):
+def get_delits_crimes_annees_graph(dataset, fait, departement):
     """
     Obtient un graphique de l'évolution du nombre de délits et crimes par année
-    en fonction du type de fait et du département spécifiés.
+    en fonction des types de faits et des départements spécifiés: une seule courbe, ou une courbe par
+    (département, fait) quand plusieurs sont choisis.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
-    fait : str
-        Le type de fait à considérer ou "Tout" pour tous les faits.
-    departement : str
-        Le département à considérer ou "Tout" pour tous les départements.
+    dataset : Dataset
+        Les données du dashboard.
+    fait : str or list
+        Le ou les types de faits à considérer, "Tout" pour tous les faits.
+    departement : str or list
+        Le ou les départements (ou régions) à considérer, "Tout" pour tous les départements.
 
     Returns
     -------
     plotly.graph_objects.Figure
         Le graphique de l'évolution du nombre de délits et crimes par année.
     """
-    new_df = get_delits_crimes_annees(dataframe, fait, departement)
-    precision = "dans le " + departement if departement != 'Tout' else 'de tous les départements en fonction des années'
+    faits = _liste(fait)
+    departements = _liste(departement)
+    new_df = get_delits_crimes_annees(dataset, faits, departements)
+
+    if len(faits) == 1 and len(departements) == 1:
+        departement = departements[0]
+        if departement == 'Tout':
+            precision = 'de tous les départements en fonction des années'
+        elif departement in dataset.liste_regions():
+            precision = "dans la région " + departement
+        else:
+            precision = "dans le " + departement
+        graph = px.line(
+            new_df,
+            x="annee",
+            y="nombre",
+            title=f"Évolution du nombre de délits et crimes {precision}"
+        )
+        return graph
+
+    # Légende: ce qui varie d'une série à l'autre
+    if len(faits) == 1:
+        legende, series = 'departement', new_df['departement']
+    elif len(departements) == 1:
+        legende, series = 'fait', new_df['fait']
+    else:
+        legende, series = 'departement, fait', new_df['departement'] + ' - ' + new_df['fait']
     graph = px.line(
-        new_df,
+        new_df.assign(serie=series),
         x="annee",
         y="nombre",
-        title=f"Évolution du nombre de délits et crimes {precision}"
+        color="serie",
+        labels={"serie": legende},
+        title="Évolution du nombre de délits et crimes en fonction des années"
     )
     return graph
+
+def _liste(valeur):
+    """
+    Retourne les valeurs d'un filtre sous forme de liste sans doublon, dans l'ordre (liste vide: ["Tout"]).
+    """
+    valeurs = [valeur] if isinstance(valeur, str) else list(valeur)
+    return list(dict.fromkeys(valeurs)) or ['Tout']
+
+def _repeter(nombres, membres, taille):
+    """
+    Répète chaque ligne d'un résultat groupé par (département, fait, année) pour chacune des séries de son
+    département (un département peut appartenir à plusieurs séries: choisi seul et dans sa région).
+
+    Returns
+    -------
+    tuple
+        (série, code du fait, année, nombre) de chaque ligne répétée.
+    """
+    membres = membres[np.argsort(membres[:, 1], kind='stable')]
+    comptes = np.bincount(membres[:, 1], minlength=taille)
+    debuts = np.cumsum(comptes) - comptes
+    departements = nombres.index.get_level_values('departement').to_numpy()
+    repetitions = comptes[departements]
+    lignes = np.repeat(np.arange(len(nombres)), repetitions)
+    rangs = np.arange(len(lignes)) - np.repeat(np.cumsum(repetitions) - repetitions, repetitions)
+    return (membres[debuts[departements[lignes]] + rangs, 0],
+            nombres.index.get_level_values('fait').to_numpy()[lignes],
+            nombres.index.get_level_values('annee').to_numpy()[lignes],
+            nombres.to_numpy()[lignes])
@@ -9,43 +9,44 @@ Léon E.
 
 Fonctions
 ---------
-- get_histogramme_dataframe(dataframe)
+- get_histogramme_dataframe(dataset)
     Obtient un DataFrame adapté pour l'histogramme.
 
-- get_histogramme_dataframe_byParams(dataframe, annee, departements:list, fait)
+- get_histogramme_dataframe_byParams(dataset, annee, departements:list, fait)
     Obtient un DataFrame adapté pour l'histogramme avec des paramètres spécifiques.
 
-- get_histogramme_graph(dataframe, annee, departement, fait)
+- get_histogramme_graph(dataset, annee, departement, fait)
     Obtient le graphique de l'histogramme du nombre de délits par mois et par département.
 """
 
 import plotly.express as px
 import pandas as pd
 
-def get_histogramme_dataframe(dataframe):
+def get_histogramme_dataframe(dataset):
     """
     Obtient un DataFrame adapté pour l'histogramme.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
 
     Returns
     -------
     pandas.DataFrame
         Un DataFrame adapté pour l'histogramme.
     """
-    return dataframe.groupby(["num_departement", "mois"])[["nombre"]].sum().reset_index()
+    nombres = dataset.agreger(["departement", "mois"])
+    return _to_histogramme_dataframe(dataset, nombres)
 
-def get_histogramme_dataframe_byParams(dataframe, annee, departements:list, fait):
+def get_histogramme_dataframe_byParams(dataset, annee, departements:list, fait):
     """
     Obtient un DataFrame adapté pour l'histogramme avec des paramètres spécifiques.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     annee : str
         L'année à considérer ou "Tout" pour toutes les années.
     departements : list
@@ -58,31 +59,40 @@ def get_histogramme_dataframe_byParams(dataframe, annee, departements:list, fait
     pandas.DataFrame
         Un DataFrame adapté pour l'histogramme avec les paramètres spécifiés.
     """
-    if annee == "Tout":
-        annee_condition = True
-    else:
-        annee_condition = (dataframe['annee'] == annee)
-    if departements == 'Tout':
-        departement_condition = True
-    else:
-        departement_condition = (dataframe['num_departement'].isin(departements))
-    if fait == "Tout":
-        fait_condition = True
-    else:
-        fait_condition = (dataframe['fait'] == fait)
-    
-    new_df = dataframe[annee_condition & departement_condition & fait_condition].groupby(["num_departement", "mois"])[["nombre"]].sum().reset_index()
-    return new_df
+    nombres = dataset.agreger(["departement", "mois"], annee=annee, departement=departements, fait=fait)
+    return _to_histogramme_dataframe(dataset, nombres)
+
+def _to_histogramme_dataframe(dataset, nombres):
+    """
+    Construit le DataFrame de l'histogramme à partir des nombres agrégés par code de département et mois.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        Les données du dashboard.
+    nombres : pandas.Series
+        Le nombre de délits, indexé par (code de département, mois).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Un DataFrame avec les colonnes num_departement, mois et nombre.
+    """
+    return pd.DataFrame({
+        'num_departement': dataset.num_departement(nombres.index.get_level_values('departement')),
+        'mois': dataset.libelle_mois(nombres.index.get_level_values('mois')),
+        'nombre': nombres.to_numpy(),
+    })
  
  
-def get_histogramme_graph(dataframe, annee, departement, fait):
+def get_histogramme_graph(dataset, annee, departement, fait):
     """
     Obtient le graphique de l'histogramme du nombre de délits par mois et par département.
 
     Parameters
     ----------
-    dataframe : pandas.DataFrame
-        Le DataFrame contenant les données.
+    dataset : Dataset
+        Les données du dashboard.
     annee : str
         L'année à considérer ou "Tout" pour toutes les années.
     departement : str
@@ -96,9 +106,9 @@ def get_histogramme_graph(dataframe, annee, departement, fait):
         Le graphique de l'histogramme.
     """
     if(any(arg != 'Tout' for arg in (annee, fait)) or departement != 'Tout'):
-        df = get_histogramme_dataframe_byParams(dataframe, annee, departement, fait)
+        df = get_histogramme_dataframe_byParams(dataset, annee, departement, fait)
     else:
-        df = get_histogramme_dataframe(dataframe)
+        df = get_histogramme_dataframe(dataset)
     
     graph = px.histogram(
         df,
@@ -0,0 +1,312 @@
+"""
+Module Metriques.py
+----------
+Mesure le temps et la taille des réponses des callbacks du dashboard et de l'API (src/Api.py), et les exporte au
+format texte de Prometheus. Les callbacks et les points d'accès de l'API ont chacun leurs métriques
+(dashboard_callback_* et dashboard_api_*); toutes portent le label status (ok, ou error si l'appel a échoué).
+
+Le temps d'un callback est séparé entre l'agrégation (temps passé dans les fonctions décorées par agregation,
+c'est-à-dire les requêtes sur le Dataset) et la construction de la figure (le reste, sérialisation comprise).
+
+Avec plusieurs processus (workers gunicorn), chaque processus écrit ses métriques dans un fichier du dossier
+indiqué par la variable d'environnement METRICS_DIR, et l'export additionne les fichiers de tous les processus.
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- agregation(fonction)
+    Décorateur comptant le temps passé dans une fonction comme temps d'agrégation.
+
+- mesurer_callback(callback)
+    Contexte mesurant un appel de callback.
+
+- mesurer_api(endpoint)
+    Contexte mesurant une requête à un point d'accès de l'API.
+
+- definir(nom, valeur)
+    Définit la valeur d'une jauge.
+
+- exporter() -> str
+    Retourne les métriques au format texte de Prometheus.
+
+- processus_termine(pid)
+    Retire les jauges d'un processus terminé.
+"""
+
+import contextlib
+import functools
+import glob
+import json
+import math
+import os
+import threading
+import time
+
+BUCKETS_SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+"""
+    Bornes des histogrammes de durées, en secondes
+"""
+
+BUCKETS_OCTETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+"""
+    Bornes des histogrammes de tailles, en octets
+"""
+
+METRIQUES = {
+    'dashboard_callback_duration_seconds': ('histogram', 'Durée totale des callbacks', BUCKETS_SECONDES),
+    'dashboard_callback_aggregation_seconds': (
+        'histogram', "Durée de l'agrégation des données des callbacks (figures absentes du cache)", BUCKETS_SECONDES),
+    'dashboard_callback_figure_seconds': (
+        'histogram', 'Durée de la construction des figures des callbacks (figures absentes du cache)', BUCKETS_SECONDES),
+    'dashboard_callback_response_bytes': ('histogram', 'Taille des figures sérialisées renvoyées', BUCKETS_OCTETS),
+    'dashboard_figure_cache_requests_total': ('counter', 'Requêtes au cache des figures, par résultat (hit, miss)', None),
+    'dashboard_api_duration_seconds': ('histogram', "Durée totale des requêtes à l'API", BUCKETS_SECONDES),
+    'dashboard_api_aggregation_seconds': (
+        'histogram', "Durée de l'agrégation des données des requêtes à l'API (réponses absentes du cache)",
+        BUCKETS_SECONDES),
+    'dashboard_api_serialization_seconds': (
+        'histogram', "Durée de la mise en forme des réponses de l'API (réponses absentes du cache)", BUCKETS_SECONDES),
+    'dashboard_api_response_bytes': ('histogram', "Taille des réponses de l'API", BUCKETS_OCTETS),
+    'dashboard_api_cache_requests_total': (
+        'counter', "Requêtes au cache des réponses de l'API, par résultat (hit, miss)", None),
+    'dashboard_figure_cache_bytes': ('gauge', 'Taille occupée par le cache des figures', None),
+    'dashboard_figure_cache_entries': ('gauge', 'Nombre de figures dans le cache', None),
+}
+"""
+    Métriques exportées: type, description et bornes (histogrammes)
+"""
+
+_CALLBACK = ('dashboard_callback_duration_seconds', 'dashboard_callback_response_bytes',
+             'dashboard_callback_aggregation_seconds', 'dashboard_callback_figure_seconds',
+             'dashboard_figure_cache_requests_total')
+_API = ('dashboard_api_duration_seconds', 'dashboard_api_response_bytes', 'dashboard_api_aggregation_seconds',
+        'dashboard_api_serialization_seconds', 'dashboard_api_cache_requests_total')
+"""
+    Métriques d'un appel mesuré: durée totale, taille, agrégation, construction de la réponse et cache
+"""
+
+_valeurs = {}
+"""
+    Valeurs des métriques de ce processus, par (nom, labels): liste [compte par borne..., somme, nombre]
+    pour un histogramme, nombre pour un compteur ou une jauge
+"""
+
+_verrou = threading.Lock()
+_local = threading.local()
+
+
+def agregation(fonction):
+    """
+    Décorateur comptant le temps passé dans la fonction comme temps d'agrégation du callback en cours.
+    Les appels imbriqués ne sont comptés qu'une fois.
+    """
+    @functools.wraps(fonction)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'profondeur', 0):
+            return fonction(*args, **kwargs)
+        _local.profondeur = 1
+        debut = time.perf_counter()
+        try:
+            return fonction(*args, **kwargs)
+        finally:
+            _local.profondeur = 0
+            _local.agregation = getattr(_local, 'agregation', 0.0) + time.perf_counter() - debut
+    return wrapper
+
+
+@contextlib.contextmanager
+def mesurer_callback(callback):
+    """
+    Mesure un appel de callback. Le dictionnaire fourni par le contexte doit être complété avec
+    'hit' (True si la figure venait du cache) et 'taille' (taille de la figure sérialisée, en octets).
+    Un appel qui lève une exception est aussi mesuré, avec le label status="error".
+
+    Parameters
+    ----------
+    callback : str
+        Le nom du callback (label des métriques).
+    """
+    with _mesurer(_CALLBACK, ('callback', callback)) as mesure:
+        yield mesure
+
+
+@contextlib.contextmanager
+def mesurer_api(endpoint):
+    """
+    Mesure une requête à l'API, comme mesurer_callback ('hit': réponse venant du cache, 'taille': taille de
+    la réponse en octets), dans les métriques dashboard_api_*.
+
+    Parameters
+    ----------
+    endpoint : str
+        Le nom du point d'accès (label des métriques).
+    """
+    with _mesurer(_API, ('endpoint', endpoint)) as mesure:
+        yield mesure
+
+
+@contextlib.contextmanager
+def _mesurer(noms, label):
+    """
+    Mesure un appel et l'enregistre dans les métriques noms (voir _CALLBACK), même s'il lève une exception.
+    """
+    duree_nom, taille_nom, agregation_nom, construction_nom, cache_nom = noms
+    mesure = {'hit': False, 'taille': 0}
+    _local.agregation = 0.0
+    debut = time.perf_counter()
+    statut = 'error'
+    try:
+        yield mesure
+        statut = 'ok'
+    finally:
+        duree = time.perf_counter() - debut
+        labels = (label, ('status', statut))
+        with _verrou:
+            _observer(duree_nom, labels, duree)
+            _observer(taille_nom, labels, mesure['taille'])
+            if not mesure['hit']:
+                _observer(agregation_nom, labels, _local.agregation)
+                _observer(construction_nom, labels, duree - _local.agregation)
+            cle = (cache_nom, labels + (('result', 'hit' if mesure['hit'] else 'miss'),))
+            _valeurs[cle] = _valeurs.get(cle, 0) + 1
+        _sauvegarder()
+
+
+def definir(nom, valeur):
+    """
+    Définit la valeur d'une jauge de ce processus.
+    """
+    with _verrou:
+        _valeurs[(nom, ())] = valeur
+
+
+def processus_termine(pid):
+    """
+    Retire les jauges d'un processus terminé du dossier METRICS_DIR (ses compteurs et histogrammes restent comptés).
+    """
+    dossier = os.environ.get('METRICS_DIR')
+    if not dossier:
+        return
+    path = os.path.join(dossier, f'{pid}.json')
+    try:
+        with open(path) as file:
+            valeurs = [valeur for valeur in json.load(file) if METRIQUES[valeur[0]][0] != 'gauge']
+    except (OSError, ValueError):
+        return
+    with open(path + '.tmp', 'w') as file:
+        json.dump(valeurs, file)
+    os.replace(path + '.tmp', path)
+
+
+def _observer(nom, labels, valeur):
+    """
+    Ajoute une observation à un histogramme (à appeler avec le verrou).
+    """
+    buckets = METRIQUES[nom][2]
+    compteurs = _valeurs.setdefault((nom, labels), [0] * (len(buckets) + 2))
+    for position, borne in enumerate(buckets):
+        if valeur <= borne:
+            compteurs[position] += 1
+    compteurs[-2] += valeur
+    compteurs[-1] += 1
+
+
+def _sauvegarder():
+    """
+    Écrit les métriques de ce processus dans le dossier METRICS_DIR, s'il est défini.
+    """
+    dossier = os.environ.get('METRICS_DIR')
+    if not dossier:
+        return
+    with _verrou:
+        contenu = json.dumps([[nom, labels, valeur] for (nom, labels), valeur in _valeurs.items()])
+    path = os.path.join(dossier, f'{os.getpid()}.json')
+    os.makedirs(dossier, exist_ok=True)
+    with open(path + '.tmp', 'w') as file:
+        file.write(contenu)
+    os.replace(path + '.tmp', path)
+
+
+def _valeurs_processus():
+    """
+    Retourne les valeurs de tous les processus: celles de ce processus et celles des fichiers de METRICS_DIR.
+    """
+    with _verrou:
+        courantes = {cle: list(valeur) if isinstance(valeur, list) else valeur for cle, valeur in _valeurs.items()}
+    dossier = os.environ.get('METRICS_DIR')
+    if not dossier:
+        return [courantes]
+
+    processus = [courantes]
+    for path in glob.glob(os.path.join(dossier, '*.json')):
+        if os.path.basename(path) == f'{os.getpid()}.json':
+            continue
+        try:
+            with open(path) as file:
+                processus.append({(nom, tuple(map(tuple, labels))): valeur for nom, labels, valeur in json.load(file)})
+        except (OSError, ValueError):
+            continue
+    return processus
+
+
+def exporter():
+    """
+    Retourne les métriques de tous les processus au format texte de Prometheus (version 0.0.4).
+
+    Returns
+    -------
+    str
+        Les métriques: histogrammes (_bucket, _sum, _count), compteurs et jauges.
+    """
+    totaux = {}
+    for valeurs in _valeurs_processus():
+        for cle, valeur in valeurs.items():
+            if isinstance(valeur, list):
+                total = totaux.setdefault(cle, [0] * len(valeur))
+                totaux[cle] = [a + b for a, b in zip(total, valeur)]
+            else:
+                totaux[cle] = totaux.get(cle, 0) + valeur
+
+    lignes = []
+    for nom, (type_metrique, aide, buckets) in METRIQUES.items():
+        lignes.append(f'# HELP {nom} {aide}')
+        lignes.append(f'# TYPE {nom} {type_metrique}')
+        for (nom_valeur, labels), valeur in sorted(totaux.items()):
+            if nom_valeur != nom:
+                continue
+            if type_metrique != 'histogram':
+                lignes.append(f'{nom}{_labels(labels)} {_nombre(valeur)}')
+                continue
+            for borne, compte in zip(buckets + (math.inf,), valeur[:-2] + [valeur[-1]]):
+                le = '+Inf' if borne == math.inf else _nombre(borne)
+                lignes.append(f'{nom}_bucket{_labels(labels + (("le", le),))} {compte}')
+            lignes.append(f'{nom}_sum{_labels(labels)} {_nombre(valeur[-2])}')
+            lignes.append(f'{nom}_count{_labels(labels)} {valeur[-1]}')
+    return '\n'.join(lignes) + '\n'
+
+
+def _labels(labels):
+    """
+    Formate des labels Prometheus ({nom="valeur",...}, rien s'il n'y en a pas).
+    """
+    if not labels:
+        return ''
+    valeurs = ','.join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in labels)
+    return '{' + valeurs + '}'
+
+
+def _echapper(valeur):
+    """
+    Échappe la valeur d'un label (antislash, guillemet et retour à la ligne).
+    """
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _nombre(valeur):
+    """
+    Formate un nombre pour Prometheus.
+    """
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
@@ -0,0 +1,223 @@
+"""
+Module Profilage.py
+----------
+Profilage à la demande des requêtes des callbacks du dashboard (route _dash-update-component).
+
+Le profilage est désactivé par défaut. Il est activé:
+- pour toutes les requêtes des callbacks avec la variable d'environnement DASHBOARD_PROFILE=1,
+- pour une seule requête avec l'en-tête X-Dashboard-Profile signé par le secret DASHBOARD_PROFILE_SECRET
+  (voir signer(), ou `python -m src.Profilage` pour obtenir la valeur de l'en-tête).
+
+Chaque requête profilée produit, dans le dossier DASHBOARD_PROFILE_DIR (/tmp/dashboard-profiles par défaut),
+un fichier .pstats (cProfile, lisible avec pstats ou snakeviz) et un fichier .collapsed (piles échantillonnées
+au format de flamegraph.pl / speedscope). Au plus un profil est écrit toutes les DASHBOARD_PROFILE_INTERVAL
+secondes par processus (60 par défaut) et seuls les DASHBOARD_PROFILE_MAX_FILES derniers profils sont conservés.
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- installer(server)
+    Installe le profilage sur le serveur Flask du dashboard.
+
+- signer(secret, horodatage=None) -> str
+    Retourne la valeur de l'en-tête X-Dashboard-Profile pour un secret.
+"""
+
+import cProfile
+import collections
+import glob
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+
+ENTETE = 'X-Dashboard-Profile'
+"""
+    En-tête HTTP demandant le profilage d'une requête
+"""
+
+VALIDITE_SIGNATURE = 300
+"""
+    Durée de validité d'une signature, en secondes
+"""
+
+PERIODE_ECHANTILLONNAGE = 0.002
+"""
+    Période d'échantillonnage des piles d'appels, en secondes
+"""
+
+_verrou = threading.Lock()
+_dernier_profil = 0.0
+_local = threading.local()
+
+
+def installer(server):
+    """
+    Installe le profilage sur le serveur Flask: les requêtes des callbacks sont profilées
+    si le profilage est demandé et que la limite de fréquence le permet.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Le serveur du dashboard (app.server).
+    """
+    import flask
+
+    @server.before_request
+    def _debut_profil():
+        if not flask.request.path.endswith('_dash-update-component') or not _demande(flask.request.headers):
+            return
+        reservation = _reserver()
+        if reservation is None:
+            return
+        profileur = cProfile.Profile()
+        try:
+            profileur.enable()
+        except ValueError:
+            # Un autre profileur est déjà actif (une autre requête profilée): aucun profil n'est écrit,
+            # la réservation est rendue pour ne pas bloquer les suivants pendant DASHBOARD_PROFILE_INTERVAL
+            _liberer(reservation)
+            return
+        _local.profil = (profileur, _Echantillonneur(threading.get_ident()), time.time())
+        _local.profil[1].start()
+
+    @server.teardown_request
+    def _fin_profil(exception):
+        profil = getattr(_local, 'profil', None)
+        if profil is None:
+            return
+        _local.profil = None
+        profileur, echantillonneur, debut = profil
+        profileur.disable()
+        echantillonneur.arreter()
+        corps = flask.request.get_json(silent=True) or {}
+        _ecrire(profileur, echantillonneur, debut, str(corps.get('output', 'callback')))
+
+
+def signer(secret, horodatage=None):
+    """
+    Retourne la valeur de l'en-tête X-Dashboard-Profile: un horodatage et sa signature HMAC-SHA256.
+
+    Parameters
+    ----------
+    secret : str
+        Le secret partagé (DASHBOARD_PROFILE_SECRET).
+    horodatage : int, optional
+        L'horodatage Unix de la signature (par défaut maintenant).
+
+    Returns
+    -------
+    str
+        "horodatage:signature"
+    """
+    horodatage = int(time.time()) if horodatage is None else horodatage
+    signature = hmac.new(secret.encode(), str(horodatage).encode(), hashlib.sha256).hexdigest()
+    return f'{horodatage}:{signature}'
+
+
+def _demande(headers):
+    """
+    Indique si le profilage est demandé pour une requête (variable d'environnement ou en-tête signé valide).
+    """
+    if os.environ.get('DASHBOARD_PROFILE') == '1':
+        return True
+    valeur, secret = headers.get(ENTETE), os.environ.get('DASHBOARD_PROFILE_SECRET')
+    if not valeur or not secret or ':' not in valeur:
+        return False
+    horodatage = valeur.split(':', 1)[0]
+    if not horodatage.isdigit() or abs(time.time() - int(horodatage)) > VALIDITE_SIGNATURE:
+        return False
+    return hmac.compare_digest(valeur, signer(secret, int(horodatage)))
+
+
+def _reserver():
+    """
+    Réserve le prochain profil si la limite de fréquence le permet.
+
+    Returns
+    -------
+    tuple
+        (instant du profil précédent, instant de la réservation), à rendre avec _liberer() si le profil n'est
+        finalement pas écrit. None si la limite de fréquence ne permet pas de profiler.
+    """
+    global _dernier_profil
+    intervalle = float(os.environ.get('DASHBOARD_PROFILE_INTERVAL', '60'))
+    with _verrou:
+        if _dernier_profil and time.monotonic() - _dernier_profil < intervalle:
+            return None
+        reservation = (_dernier_profil, time.monotonic())
+        _dernier_profil = reservation[1]
+        return reservation
+
+
+def _liberer(reservation):
+    """
+    Rend une réservation de _reserver() dont le profil n'a pas été écrit (si aucune autre n'a été faite depuis).
+    """
+    global _dernier_profil
+    with _verrou:
+        if _dernier_profil == reservation[1]:
+            _dernier_profil = reservation[0]
+
+
+def _ecrire(profileur, echantillonneur, debut, output):
+    """
+    Écrit le profil d'une requête (.pstats et .collapsed) et supprime les profils les plus anciens.
+    """
+    dossier = os.environ.get('DASHBOARD_PROFILE_DIR', '/tmp/dashboard-profiles')
+    os.makedirs(dossier, exist_ok=True)
+    nom = re.sub(r'[^A-Za-z0-9_-]+', '_', output).strip('_')[:80]
+    base = os.path.join(dossier, f'{time.strftime("%Y%m%d-%H%M%S", time.localtime(debut))}-{os.getpid()}-{nom}')
+
+    profileur.dump_stats(base + '.pstats')
+    with open(base + '.collapsed', 'w', encoding='utf-8') as file:
+        for pile, nombre in echantillonneur.piles.items():
+            file.write(f'{pile} {nombre}\n')
+
+    maximum = int(os.environ.get('DASHBOARD_PROFILE_MAX_FILES', '100'))
+    profils = sorted(glob.glob(os.path.join(dossier, '*.pstats')), key=os.path.getmtime)
+    for path in profils[:max(len(profils) - maximum, 0)]:
+        for fichier in (path, path[:-len('.pstats')] + '.collapsed'):
+            if os.path.isfile(fichier):
+                os.remove(fichier)
+
+
+class _Echantillonneur(threading.Thread):
+    """
+    Échantillonne régulièrement la pile d'appels d'un thread et compte les piles au format « collapsed »
+    (fonctions séparées par des points-virgules, de la racine vers la feuille).
+    """
+
+    def __init__(self, thread_id):
+        super().__init__(name='profilage', daemon=True)
+        self.thread_id = thread_id
+        self.piles = collections.Counter()
+        self._arret = threading.Event()
+
+    def run(self):
+        while not self._arret.wait(PERIODE_ECHANTILLONNAGE):
+            frame = sys._current_frames().get(self.thread_id)
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if pile:
+                self.piles[';'.join(reversed(pile))] += 1
+
+    def arreter(self):
+        self._arret.set()
+        self.join()
+
+
+if __name__ == '__main__':
+    secret = os.environ.get('DASHBOARD_PROFILE_SECRET')
+    if not secret:
+        sys.exit('La variable DASHBOARD_PROFILE_SECRET doit être définie')
+    print(f'{ENTETE}: {signer(secret)}')
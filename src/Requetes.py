@@ -0,0 +1,274 @@
+"""
+Module Requetes.py
+----------
+Moteurs de requêtes du Dataset: ils calculent les agrégats de Dataset.agreger(), que les modules des graphiques
+utilisent pour toutes leurs requêtes. Les filtres leur sont transmis déjà traduits en positions sur les axes,
+et tous les moteurs retournent les mêmes résultats.
+
+- cube: somme sur le cube dense pré-agrégé (par défaut, le plus rapide).
+- pandas: lignes de la table de mesures sélectionnées par l'index trié (Dataset.selectionner()) puis groupby.
+- duckdb: requête SQL sur une base DuckDB (stockage en colonnes) écrite à côté des tableaux sauvegardés
+  (data/dataset/mesures.duckdb). La table y est triée selon INDEX: les filtres et les sommes sont exécutés par
+  DuckDB, qui ne lit que les groupes de lignes dont les valeurs min/max (zone maps) correspondent aux filtres.
+  Les tableaux du modèle ne sont alors pas lus. Nécessite le module duckdb.
+
+Le moteur du dashboard est choisi avec la variable d'environnement DASHBOARD_BACKEND.
+
+Auteur
+---------
+Léon E.
+
+Fonctions
+---------
+- creer(nom, dataset, path=None)
+    Crée le moteur de requêtes d'un Dataset.
+
+- sommer(cube, presence, selections, par) -> tuple
+    Somme un cube dense sur les axes qui ne sont pas conservés.
+
+Classes
+---------
+- MoteurCube
+    Agrégats calculés sur le cube dense.
+- MoteurPandas
+    Agrégats calculés sur la table de mesures en mémoire.
+- MoteurDuckDB
+    Agrégats calculés par une base DuckDB.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+MOTEURS = ('cube', 'pandas', 'duckdb')
+"""
+    Noms des moteurs de requêtes
+"""
+
+
+def creer(nom, dataset, path=None):
+    """
+    Crée le moteur de requêtes d'un Dataset.
+
+    Parameters
+    ----------
+    nom : str
+        Le nom du moteur, parmi MOTEURS.
+    dataset : Dataset
+        Le modèle interrogé.
+    path : str, optional
+        Le dossier où le modèle est sauvegardé (voir Dataset.save()), None pour un modèle en mémoire.
+
+    Returns
+    -------
+    MoteurCube, MoteurPandas ou MoteurDuckDB
+        Le moteur.
+
+    Raises
+    ------
+    ValueError
+        Si le moteur est inconnu ou ne peut pas être utilisé (cube non construit, module duckdb absent).
+    """
+    if nom == 'cube':
+        if dataset.cube is None:
+            raise ValueError("Le moteur 'cube' nécessite un modèle construit avec son cube")
+        return MoteurCube(dataset)
+    if nom == 'pandas':
+        return MoteurPandas(dataset)
+    if nom == 'duckdb':
+        if duckdb is None:
+            raise ValueError("Le moteur 'duckdb' nécessite le module duckdb")
+        return MoteurDuckDB(dataset, path)
+    raise ValueError(f"Moteur de requêtes inconnu: {nom} (choisir parmi {', '.join(MOTEURS)})")
+
+
+def sommer(cube, presence, selections, par):
+    """
+    Somme un cube dense (le cube du Dataset ou l'un de ses agrégats pré-calculés) sur les axes qui ne sont
+    pas conservés.
+
+    Parameters
+    ----------
+    cube : numpy.ndarray
+        Les nombres, un axe par clé de selections.
+    presence : numpy.ndarray
+        Même forme que cube, True si la combinaison existe dans les données.
+    selections : dict
+        Positions retenues sur chaque axe du cube, dans l'ordre des axes (None pour ne pas filtrer).
+    par : list of str
+        Les axes conservés, dans l'ordre des axes du cube.
+
+    Returns
+    -------
+    tuple
+        (positions des combinaisons présentes sur chacun des axes conservés, nombres en int64), dans
+        l'ordre croissant des positions.
+    """
+    axes = list(selections)
+    for axis, axe in enumerate(axes):
+        if selections[axe] is not None:
+            cube = cube.take(selections[axe], axis=axis)
+            presence = presence.take(selections[axe], axis=axis)
+
+    autres = tuple(axis for axis, axe in enumerate(axes) if axe not in par)
+    nombres = cube.sum(axis=autres, dtype=np.int64)
+    presents = presence.any(axis=autres)
+
+    # Les indices dans le cube réduit sont ramenés aux positions sur les axes
+    indices = np.nonzero(presents)
+    positions = [indices[i] if selections[axe] is None else selections[axe][indices[i]]
+                 for i, axe in enumerate(par)]
+    return positions, nombres[indices]
+
+
+class MoteurCube:
+    """
+    Agrégats calculés sur le cube dense (département × fait × année × mois) du Dataset.
+    """
+
+    nom = 'cube'
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def agreger(self, par, selections):
+        """
+        Somme les nombres sur les axes qui ne sont pas conservés.
+
+        Parameters
+        ----------
+        par : list of str
+            Les axes conservés, dans l'ordre de Dataset.AXES.
+        selections : dict
+            Positions retenues sur chaque axe (numpy.ndarray), None pour ne pas filtrer.
+
+        Returns
+        -------
+        tuple
+            (positions des combinaisons présentes sur chacun des axes conservés, nombres en int64), dans
+            l'ordre croissant des positions (voir sommer()).
+        """
+        return sommer(self.dataset.cube, self.dataset.presence, selections, par)
+
+
+class MoteurPandas:
+    """
+    Agrégats calculés sur les lignes de la table de mesures retournées par l'index trié du Dataset.
+    """
+
+    nom = 'pandas'
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def agreger(self, par, selections):
+        """
+        Somme les nombres des lignes sélectionnées, groupées par les axes conservés (voir MoteurCube.agreger()).
+        """
+        dataset = self.dataset
+        lignes = dataset._lignes(selections)
+        nombres = lignes.groupby(par)['nombre'].sum()
+        positions = dataset._positions(nombres.index.to_frame(index=False), par)
+        return list(positions), nombres.to_numpy(dtype=np.int64)
+
+
+class MoteurDuckDB:
+    """
+    Agrégats calculés par une base DuckDB contenant la table de mesures, triée selon Dataset.INDEX.
+
+    Pour un modèle sauvegardé, la base est un fichier du dossier de sauvegarde, écrit au premier chargement de
+    cette version des données et ouvert en lecture seule (plusieurs processus peuvent l'ouvrir). Pour un modèle
+    en mémoire, la base est en mémoire.
+    """
+
+    nom = 'duckdb'
+
+    FICHIER = 'mesures.duckdb'
+    """
+        Nom du fichier de la base dans le dossier de sauvegarde du modèle
+    """
+
+    def __init__(self, dataset, path=None):
+        self.dataset = dataset
+        self._local = threading.local()
+        if path is None:
+            self._connexion = duckdb.connect()
+            self._remplir(self._connexion)
+            return
+
+        fichier = os.path.join(path, self.FICHIER)
+        if self._version(fichier) != dataset.version:
+            # Écrite à côté puis renommée: les processus qui ouvrent la base ne la voient jamais incomplète
+            tmp_fichier = f'{fichier}.{os.getpid()}.tmp'
+            if os.path.exists(tmp_fichier):
+                os.remove(tmp_fichier)
+            connexion = duckdb.connect(tmp_fichier)
+            try:
+                self._remplir(connexion)
+                connexion.execute('CREATE TABLE version AS SELECT ? AS version', [dataset.version])
+            finally:
+                connexion.close()
+            os.replace(tmp_fichier, fichier)
+        self._connexion = duckdb.connect(fichier, read_only=True)
+
+    def _remplir(self, connexion):
+        """
+        Crée la table de mesures dans une base, dans l'ordre de Dataset.INDEX.
+        """
+        connexion.register('source', self.dataset.mesures)
+        # L'ordre d'insertion donne les zone maps: triés selon INDEX, les groupes de lignes couvrent chacun
+        # peu de faits et de départements
+        connexion.execute('CREATE TABLE mesures AS SELECT departement, fait, annee, mois, nombre FROM source '
+                          'ORDER BY fait, departement, annee, mois')
+        connexion.unregister('source')
+
+    @staticmethod
+    def _version(fichier):
+        """
+        Retourne la version des données d'une base (None si elle n'existe pas ou est illisible).
+        """
+        if not os.path.exists(fichier):
+            return None
+        try:
+            with duckdb.connect(fichier, read_only=True) as connexion:
+                return connexion.execute('SELECT version FROM version').fetchone()[0]
+        except duckdb.Error:
+            return None
+
+    def _curseur(self):
+        """
+        Retourne le curseur du thread courant (une connexion DuckDB ne s'utilise que depuis un thread à la fois).
+        """
+        curseur = getattr(self._local, 'curseur', None)
+        if curseur is None:
+            curseur = self._local.curseur = self._connexion.cursor()
+        return curseur
+
+    def agreger(self, par, selections):
+        """
+        Somme les nombres avec une requête SQL GROUP BY sur les axes conservés (voir MoteurCube.agreger()).
+        """
+        dataset = self.dataset
+        conditions = []
+        for axe, positions in selections.items():
+            if positions is None:
+                continue
+            if len(positions) == 0:
+                return [np.empty(0, dtype=np.intp) for _ in par], np.empty(0, dtype=np.int64)
+            # Des entiers venant du Dataset: ils peuvent être écrits directement dans la requête
+            valeurs = ', '.join(str(int(valeur)) for valeur in dataset._valeurs(axe, positions))
+            conditions.append(f'{axe} IN ({valeurs})')
+
+        colonnes = ', '.join(par)
+        requete = (f'SELECT {colonnes}, CAST(SUM(nombre) AS BIGINT) AS nombre FROM mesures'
+                   f'{" WHERE " + " AND ".join(conditions) if conditions else ""}'
+                   f' GROUP BY {colonnes} ORDER BY {colonnes}')
+        resultat = self._curseur().execute(requete).df()
+        positions = dataset._positions(resultat, par)
+        return list(positions), resultat['nombre'].to_numpy(dtype=np.int64)